@@ -0,0 +1,161 @@
+"""
+Ingestion Admission Control
+Keeps the servers at capacity under a burst (e.g. a whole fleet reconnecting
+and draining its backlog) instead of letting latency and memory grow:
+- A global token bucket caps readings per second, a per-client bucket keeps
+  one node from starving the others
+- At most ADMISSION_MAX_IN_FLIGHT requests are processed at once; up to
+  ADMISSION_MAX_QUEUED more wait (ADMISSION_QUEUE_TIMEOUT at most) for a slot
+- Everything else is turned away at once with a Retry-After hint:
+  429 when the client is over its own rate, 503 when the server is saturated
+- A request costing more than a bucket can ever hold is refused with 413
+  (no Retry-After): the client has to split it
+- ADMISSION_EXEMPT_CLIENTS (e.g. a replay host or a NAT gateway in front
+  of a fleet) skip the per-client bucket; the global limits still apply
+Framework-neutral: app.py (Flask) and main.py (FastAPI) add the HTTP glue.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost=1, now=None):
+        """Seconds until `cost` tokens are available (0 if they are now; cost <= burst)"""
+        self._refill(now if now is not None else time.monotonic())
+        return 0.0 if self.tokens >= cost else (cost - self.tokens) / self.rate
+
+    def take(self, cost=1):
+        self.tokens -= cost
+
+
+class Rejected(Exception):
+    """
+    Request turned away; `status` is 429, 503 or 413 (too large to ever be
+    admitted), `retry_after` whole seconds (0 for 413)
+    """
+
+    def __init__(self, status, retry_after, reason):
+        super().__init__(reason)
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    """Token buckets plus a bounded set of in-flight slots (see module docstring)"""
+
+    def __init__(self,
+                 global_rate=config.ADMISSION_GLOBAL_RATE,
+                 global_burst=config.ADMISSION_GLOBAL_BURST,
+                 client_rate=config.ADMISSION_CLIENT_RATE,
+                 client_burst=config.ADMISSION_CLIENT_BURST,
+                 max_in_flight=config.ADMISSION_MAX_IN_FLIGHT,
+                 max_queued=config.ADMISSION_MAX_QUEUED,
+                 queue_timeout=config.ADMISSION_QUEUE_TIMEOUT,
+                 max_clients=config.ADMISSION_MAX_CLIENTS,
+                 exempt=config.ADMISSION_EXEMPT_CLIENTS):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.max_clients = max_clients
+        self.exempt = frozenset(exempt)
+
+        self._clients = OrderedDict()  # client -> TokenBucket, least recently seen first
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.queued = 0
+        self.counts = {'admitted': 0, 'client_limited': 0, 'rate_limited': 0,
+                       'saturated': 0, 'timed_out': 0, 'too_large': 0}
+
+    def _client_bucket(self, client):
+        bucket = self._clients.get(client)
+        if bucket is None:
+            bucket = self._clients[client] = TokenBucket(self.client_rate, self.client_burst)
+            if len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(client)
+        return bucket
+
+    def _retry_after(self, seconds):
+        return max(1, math.ceil(seconds))
+
+    def max_cost(self, client):
+        """Largest request `client` can ever be admitted with"""
+        if client in self.exempt:
+            return self.global_bucket.burst
+        return min(self.client_burst, self.global_bucket.burst)
+
+    def admit(self, client, cost=1, wait=True):
+        """
+        Take `cost` tokens and an in-flight slot for one request, or raise
+        Rejected. wait=False never blocks (for async servers).
+        Call release() when the request is done.
+        """
+        with self._cond:
+            limit = self.max_cost(client)
+            if cost > limit:
+                self.counts['too_large'] += 1
+                raise Rejected(413, 0, f'Request of {cost} readings is over the admission '
+                                       f'limit of {limit}; split it')
+            bucket = None if client in self.exempt else self._client_bucket(client)
+            now = time.monotonic()  # after a new bucket's creation time, or it starts short
+            client_wait = bucket.wait_time(cost, now) if bucket else 0.0
+            if client_wait:
+                self.counts['client_limited'] += 1
+                raise Rejected(429, self._retry_after(client_wait), 'Client rate limit exceeded')
+            global_wait = self.global_bucket.wait_time(cost, now)
+            if global_wait:
+                self.counts['rate_limited'] += 1
+                raise Rejected(503, self._retry_after(global_wait), 'Server at capacity')
+
+            if self.in_flight >= self.max_in_flight:
+                if not wait or self.queued >= self.max_queued:
+                    self.counts['saturated'] += 1
+                    raise Rejected(503, self._retry_after(self.queue_timeout), 'Server busy')
+                self.queued += 1
+                try:
+                    ready = self._cond.wait_for(lambda: self.in_flight < self.max_in_flight,
+                                                timeout=self.queue_timeout)
+                finally:
+                    self.queued -= 1
+                if not ready:
+                    self.counts['timed_out'] += 1
+                    raise Rejected(503, self._retry_after(self.queue_timeout), 'Server busy')
+
+            # Tokens are only spent once the request is actually let in
+            if bucket:
+                bucket.take(cost)
+            self.global_bucket.take(cost)
+            self.in_flight += 1
+            self.counts['admitted'] += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return dict(self.counts, in_flight=self.in_flight, queued=self.queued,
+                        clients=len(self._clients))
@@ -1,46 +1,304 @@
-import gspread
-import pandas as pd
+"""
+Agribot TFLite Model Training
+Trains a small neural network that reproduces the Isolation Forest's
+anomaly verdicts on [temperature, humidity, pH], for the Raspberry Pi:
+- Streams the local dataset (or the Google Sheet via its local mirror) through a
+  shuffled, batched, prefetched tf.data pipeline
+- Labels each batch with the trained anomaly model (anomaly_model.pkl)
+- Exports float32, float16 and int8 post-training-quantized TFLite models
+- Benchmarks interpreter latency, file size and accuracy of each variant
+
+Usage:
+    python agribot_train.py                    # train on lettuce_dataset_updated.csv
+    python agribot_train.py --source sheets    # train on the Google Sheet
+    python agribot_train.py --benchmark-only   # re-run the benchmark on existing files
+"""
+
+import argparse
+import csv
+import os
+import time
+
 import numpy as np
 import tensorflow as tf
-from oauth2client.service_account import ServiceAccountCredentials
-from sklearn.model_selection import train_test_split
 
-# 1. AUTHENTICATION & DATA FETCH
-scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
-client = gspread.authorize(creds)
+import config
+from forest_scorer import load_scorer
+from sheet_mirror import synced_mirror
+
+CSV_FILE = 'lettuce_dataset_updated.csv'
+CSV_ENCODING = 'latin-1'
+
+BATCH_SIZE = 64
+SHUFFLE_BUFFER = 2048
+EPOCHS = 50
+TEST_EVERY = 5            # every 5th row is held out (20% test split)
+# The forest can label any point, so each training batch is joined by jittered
+# copies of itself: more examples near the decision boundary at no data cost
+AUGMENT_COPIES = 4
+AUGMENT_NOISE = {'Temperature (°C)': 1.0, 'Humidity (%)': 3.0, 'pH Level': 0.15}
+REPRESENTATIVE_BATCHES = 50
+
+TFLITE_VARIANTS = {
+    'float32': 'model.tflite',
+    'float16': 'model_fp16.tflite',
+    'int8': 'model_int8.tflite',
+}
+
+
+# ============================================================================
+# 1. INPUT PIPELINE
+# ============================================================================
+
+def csv_rows(path=CSV_FILE):
+    """tf.data stream of raw feature rows (float32, shape (3,)) from the local CSV"""
+    with open(path, encoding=CSV_ENCODING, newline='') as f:
+        header = next(csv.reader(f))
+    columns = [header.index(name) for name in config.FEATURE_COLUMNS]
+
+    defaults = [tf.constant(np.nan, dtype=tf.float32)] * len(columns)
+    dataset = tf.data.experimental.CsvDataset(path, defaults, header=True, select_cols=columns)
+    return dataset.map(lambda *values: tf.stack(values), num_parallel_calls=tf.data.AUTOTUNE)
+
+
+def sheet_rows():
+    """tf.data stream of feature rows from the Google Sheet mirror (falls back to the CSV)"""
+    mirror = synced_mirror()
+    missing = [name for name in config.FEATURE_COLUMNS if mirror and name not in mirror.columns]
+    if mirror is None or missing:
+        if missing:
+            print(f"✗ Sheet has no column(s): {', '.join(missing)}")
+        print("  Falling back to CSV file...")
+        return csv_rows()
+
+    rows = mirror.array(config.FEATURE_COLUMNS, dtype=np.float32)
+    print(f"✓ {len(rows)} records from the sheet mirror")
+    return tf.data.Dataset.from_tensor_slices(rows)
+
+
+def load_teacher(model_path=config.MODEL_FILE, scaler_path=config.SCALER_FILE):
+    """The trained Isolation Forest, flattened so whole batches label in one NumPy pass"""
+    return load_scorer(model_path, scaler_path)
+
+
+def make_datasets(rows, teacher, batch_size=BATCH_SIZE, augment=AUGMENT_COPIES):
+    """
+    Split a row stream into (train, test) datasets of (features, label) batches.
+    Rows with missing values are dropped; the split is by row position so it
+    is the same on every run without materializing the data. Training batches
+    grow by `augment` jittered copies (test batches are left untouched).
+    """
+    noise = tf.constant([AUGMENT_NOISE[name] for name in config.FEATURE_COLUMNS], dtype=tf.float32)
+
+    def jitter(features):
+        copies = [features + tf.random.normal(tf.shape(features)) * noise for _ in range(augment)]
+        return tf.concat([features] + copies, axis=0)
+
+    def label_batch(features):
+        labels = (teacher.score(features, explain=False)['label'] == -1).astype(np.float32)
+        return labels.reshape(-1, 1)
+
+    def add_labels(features):
+        labels = tf.numpy_function(label_batch, [features], tf.float32)
+        labels.set_shape([None, 1])
+        return features, labels
+
+    clean = rows.filter(lambda x: tf.reduce_all(tf.math.is_finite(x))).enumerate()
+    train = clean.filter(lambda i, x: i % TEST_EVERY != 0).map(lambda i, x: x)
+    test = clean.filter(lambda i, x: i % TEST_EVERY == 0).map(lambda i, x: x)
+
+    train = train.shuffle(SHUFFLE_BUFFER, reshuffle_each_iteration=True).batch(batch_size)
+    if augment:
+        train = train.map(jitter, num_parallel_calls=tf.data.AUTOTUNE)
+    train = (train
+             .map(add_labels, num_parallel_calls=tf.data.AUTOTUNE)
+             .prefetch(tf.data.AUTOTUNE))
+    test = (test.batch(batch_size)
+            .map(add_labels, num_parallel_calls=tf.data.AUTOTUNE)
+            .prefetch(tf.data.AUTOTUNE))
+    return train, test
+
+
+def class_weights(train):
+    """Anomalies are ~5% of readings; weight them up so the network does not ignore them"""
+    positives = total = 0
+    for _, labels in train:
+        positives += int(labels.numpy().sum())
+        total += int(labels.shape[0])
+    if positives == 0 or positives == total:
+        return None, positives, total
+    return {0: total / (2.0 * (total - positives)), 1: total / (2.0 * positives)}, positives, total
+
+
+# ============================================================================
+# 2. MODEL
+# ============================================================================
+
+def build_model(train):
+    """Normalization is part of the model, so the TFLite files take raw sensor values"""
+    normalizer = tf.keras.layers.Normalization(axis=-1)
+    normalizer.adapt(train.map(lambda x, y: x))
+
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(len(config.FEATURE_COLUMNS),)),
+        normalizer,
+        tf.keras.layers.Dense(16, activation='relu'),
+        tf.keras.layers.Dense(8, activation='relu'),
+        tf.keras.layers.Dense(1, activation='sigmoid')  # P(anomaly)
+    ])
+    model.compile(optimizer='adam', loss='binary_crossentropy',
+                  metrics=['accuracy', tf.keras.metrics.Recall(name='recall')])
+    return model
+
+
+# ============================================================================
+# 3. TFLITE EXPORT
+# ============================================================================
+
+def export_tflite(model, train):
+    """Write the float32, float16 and int8 variants; returns {variant: path}"""
+    def representative_dataset():
+        for features, _ in train.take(REPRESENTATIVE_BATCHES):
+            for row in features.numpy():
+                yield [row.reshape(1, -1).astype(np.float32)]
+
+    paths = {}
+    for variant, path in TFLITE_VARIANTS.items():
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        if variant == 'float16':
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.target_spec.supported_types = [tf.float16]
+        elif variant == 'int8':
+            # Integer weights and activations; input/output stay float32 so the
+            # Pi can feed raw readings to every variant the same way
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = representative_dataset
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        with open(path, 'wb') as f:
+            f.write(converter.convert())
+        paths[variant] = path
+        print(f"✓ {variant:8s} TFLite model saved to {path} ({os.path.getsize(path) / 1024:.1f} KB)")
+    return paths
+
+
+# ============================================================================
+# 4. BENCHMARK
+# ============================================================================
+
+def _interpreter(path):
+    """LiteRT / tflite_runtime when installed (as on the Pi), else TensorFlow's own"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=path, num_threads=1)
+
+
+def benchmark(paths, test, runs=2000):
+    """
+    Single-reading CPU latency (one thread, as on the Pi), file size and
+    test-set accuracy / recall against the forest's labels for each variant
+    """
+    features = np.concatenate([x.numpy() for x, _ in test]).astype(np.float32)
+    labels = np.concatenate([y.numpy() for _, y in test]).ravel()
+
+    results = {}
+    for variant, path in paths.items():
+        interpreter = _interpreter(path)
+        interpreter.allocate_tensors()
+        input_index = interpreter.get_input_details()[0]['index']
+        output_index = interpreter.get_output_details()[0]['index']
+
+        predictions = np.empty(len(features), dtype=np.float32)
+        for i, row in enumerate(features):
+            interpreter.set_tensor(input_index, row.reshape(1, -1))
+            interpreter.invoke()
+            predictions[i] = interpreter.get_tensor(output_index)[0, 0]
+
+        sample = features[0].reshape(1, -1)
+        timings = np.empty(runs)
+        for i in range(runs):
+            started = time.perf_counter()
+            interpreter.set_tensor(input_index, sample)
+            interpreter.invoke()
+            interpreter.get_tensor(output_index)
+            timings[i] = time.perf_counter() - started
+
+        predicted = predictions >= 0.5
+        anomalies = labels == 1
+        results[variant] = {
+            'size_kb': os.path.getsize(path) / 1024,
+            'p50_us': np.percentile(timings, 50) * 1e6,
+            'p99_us': np.percentile(timings, 99) * 1e6,
+            'accuracy': float(np.mean(predicted == anomalies)),
+            'recall': float(predicted[anomalies].mean()) if anomalies.any() else float('nan'),
+        }
+
+    print("\n" + "=" * 70)
+    print(f"TFLITE BENCHMARK ({len(features)} test readings, 1 thread)")
+    print("=" * 70)
+    print(f"  {'Variant':10s} {'Size':>10s} {'p50':>10s} {'p99':>10s} {'Accuracy':>10s} {'Recall':>8s}")
+    for variant, r in results.items():
+        print(f"  {variant:10s} {r['size_kb']:8.1f}KB {r['p50_us']:8.1f}us {r['p99_us']:8.1f}us "
+              f"{r['accuracy'] * 100:9.2f}% {r['recall'] * 100:7.1f}%")
+    print("=" * 70)
+    return results
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
 
-# Open your Agribot datasheet
-sheet = client.open("Agribot-AI-datasheet").sheet1
-data = sheet.get_all_records()
+def main():
+    parser = argparse.ArgumentParser(description="Train and export the Agribot TFLite anomaly model")
+    parser.add_argument('--source', choices=['csv', 'sheets'], default='csv')
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--augment', type=int, default=AUGMENT_COPIES,
+                        help="Jittered copies added per training row (0 = none)")
+    parser.add_argument('--benchmark-only', action='store_true',
+                        help="Skip training and benchmark the existing .tflite files")
+    args = parser.parse_args()
 
-# 2. DATA PREPROCESSING
-df = pd.DataFrame(data)
+    print("=" * 70)
+    print("AGRIBOT TFLITE MODEL TRAINING")
+    print("=" * 70)
 
-# --- THESIS STEP: Define your Inputs (X) and Labels (y) ---
-# Example: If column 'A' and 'B' are sensors, and 'C' is the result
-X = df[['Sensor_A', 'Sensor_B']].values 
-y = df['Target_Label'].values
+    teacher = load_teacher()
+    rows = sheet_rows() if args.source == 'sheets' else csv_rows()
+    train, test = make_datasets(rows, teacher, args.batch_size, args.augment)
 
-# Split data: 80% for training, 20% for testing
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2)
+    if args.benchmark_only:
+        paths = {v: p for v, p in TFLITE_VARIANTS.items() if os.path.exists(p)}
+        if not paths:
+            print("✗ No TFLite models found; run without --benchmark-only first")
+            return
+        benchmark(paths, test)
+        return
 
-# 3. BUILD THE TENSORFLOW MODEL
-model = tf.keras.Sequential([
-    tf.keras.layers.Dense(16, activation='relu', input_shape=(X_train.shape[1],)),
-    tf.keras.layers.Dense(8, activation='relu'),
-    tf.keras.layers.Dense(1, activation='sigmoid') # Binary output (e.g., Yes/No)
-])
+    weights, positives, total = class_weights(train)
+    print(f"✓ Training rows: {total} ({positives} labelled anomalous by the forest)")
 
-model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
+    model = build_model(train)
+    model.fit(
+        train,
+        validation_data=test,
+        epochs=args.epochs,
+        class_weight=weights,
+        callbacks=[tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=8,
+                                                    restore_best_weights=True)],
+        verbose=2
+    )
+    loss, accuracy, recall = model.evaluate(test, verbose=0)
+    print(f"✓ Keras model: accuracy {accuracy * 100:.2f}%, recall {recall * 100:.1f}% on the test split")
 
-# 4. TRAIN
-model.fit(X_train, y_train, epochs=50, batch_size=4)
+    paths = export_tflite(model, train)
+    benchmark(paths, test)
+    print("\nAI Training Complete and TFLite models saved!")
 
-# 5. SAVE FOR RASPBERRY PI (TFLite)
-converter = tf.lite.TFLiteConverter.from_keras_model(model)
-tflite_model = converter.convert()
-with open('model.tflite', 'wb') as f:
-    f.write(tflite_model)
 
-print("AI Training Complete and TFLite model saved!")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Anomaly Alert Dispatcher
+Delivers anomaly alerts by console, email or webhook (config.ALERT_METHOD)
+- Ingestion only enqueues; delivery runs on a worker pool with retries
+- Per-plant dedup and rate limiting stop a stuck sensor from flooding alerts
+"""
+
+import json
+import queue
+import smtplib
+import sys
+import threading
+import time
+import urllib.request
+from email.message import EmailMessage
+
+import config
+
+
+class AlertDispatcher:
+    """Non-blocking alert queue drained by background delivery workers"""
+
+    def __init__(self,
+                 method=config.ALERT_METHOD,
+                 email_config=config.EMAIL_CONFIG,
+                 webhook_url=config.WEBHOOK_URL,
+                 workers=config.ALERT_WORKERS,
+                 queue_size=config.ALERT_QUEUE_SIZE,
+                 dedup_window=config.ALERT_DEDUP_WINDOW,
+                 rate_limit=config.ALERT_RATE_LIMIT,
+                 rate_period=config.ALERT_RATE_PERIOD,
+                 max_retries=config.ALERT_MAX_RETRIES,
+                 retry_delay=config.ALERT_RETRY_DELAY):
+        if method not in ('console', 'email', 'webhook'):
+            raise ValueError(f"Unknown alert method: {method}")
+        self.method = method
+        self.email_config = email_config
+        self.webhook_url = webhook_url
+        self.dedup_window = dedup_window
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._last_seen = {}   # (plant_id, signature) -> last time it was alerted
+        self._buckets = {}     # plant_id -> [tokens, last refill time]
+        self.counts = {'queued': 0, 'sent': 0, 'failed': 0,
+                       'deduplicated': 0, 'rate_limited': 0, 'dropped': 0}
+
+        self._workers = [
+            threading.Thread(target=self._worker, name=f'alert-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    # ------------------------------------------------------------------
+    # Ingestion side (must never block)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def signature(reading):
+        """What the alert is about, ignoring the exact numbers"""
+        kinds = [reason.rsplit(' ', 1)[0] for reason in reading.get('temporal_reasons', [])]
+        if reading.get('point_anomaly', reading.get('is_anomaly')):
+            kinds.append('model')
+        return tuple(sorted(kinds))
+
+    def _allow(self, plant_id, signature, now):
+        """Apply dedup and the per-plant token bucket; caller holds the lock"""
+        key = (plant_id, signature)
+        last = self._last_seen.get(key)
+        if last is not None and now - last < self.dedup_window:
+            self.counts['deduplicated'] += 1
+            return False
+
+        tokens, refilled = self._buckets.get(plant_id, (self.rate_limit, now))
+        tokens = min(self.rate_limit, tokens + (now - refilled) * self.rate_limit / self.rate_period)
+        if tokens < 1:
+            self._buckets[plant_id] = [tokens, now]
+            self.counts['rate_limited'] += 1
+            return False
+        self._buckets[plant_id] = [tokens - 1, now]
+        self._last_seen[key] = now
+
+        # Forget expired dedup entries now and then so memory stays bounded
+        if len(self._last_seen) > 10000:
+            cutoff = now - self.dedup_window
+            self._last_seen = {k: t for k, t in self._last_seen.items() if t >= cutoff}
+        return True
+
+    def submit(self, reading):
+        """Queue an alert for an anomalous reading; returns True if it was queued"""
+        now = time.monotonic()
+        with self._lock:
+            if not self._allow(reading.get('plant_id', 'Unknown'), self.signature(reading), now):
+                return False
+        try:
+            self.queue.put_nowait(reading)
+        except queue.Full:
+            with self._lock:
+                self.counts['dropped'] += 1
+            return False
+        with self._lock:
+            self.counts['queued'] += 1
+        return True
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, pending=self.queue.qsize())
+
+    # ------------------------------------------------------------------
+    # Delivery side
+    # ------------------------------------------------------------------
+
+    def _worker(self):
+        while True:
+            reading = self.queue.get()
+            if reading is None:
+                self.queue.task_done()
+                return
+            delivered = self._deliver_with_retries(reading)
+            with self._lock:
+                self.counts['sent' if delivered else 'failed'] += 1
+            self.queue.task_done()
+
+    def _deliver_with_retries(self, reading):
+        for attempt in range(self.max_retries):
+            try:
+                self.deliver(reading)
+                return True
+            except Exception as e:
+                print(f"✗ Alert delivery via {self.method} failed "
+                      f"(attempt {attempt + 1}/{self.max_retries}): {e}")
+                if attempt < self.max_retries - 1:
+                    time.sleep(self.retry_delay * (2 ** attempt))
+        return False
+
+    @staticmethod
+    def format_message(reading):
+        reasons = reading.get('temporal_reasons') or []
+        lines = [
+            f"Plant ID: {reading.get('plant_id', 'Unknown')}",
+            f"Time: {reading.get('timestamp', '')}",
+            f"Temperature: {reading.get('temperature')}°C",
+            f"Humidity: {reading.get('humidity')}%",
+            f"pH Level: {reading.get('ph')}",
+            f"Anomaly Score: {reading.get('anomaly_score')}",
+        ]
+        if reasons:
+            lines.append(f"Temporal: {', '.join(reasons)}")
+        return "\n".join(lines)
+
+    def deliver(self, reading):
+        """Send one alert with the configured method (raises on failure)"""
+        if self.method == 'console':
+            print(f"\n⚠️  ANOMALY ALERT\n{self.format_message(reading)}\n")
+        elif self.method == 'email':
+            self._send_email(reading)
+        else:
+            self._send_webhook(reading)
+
+    def _send_email(self, reading):
+        cfg = self.email_config
+        message = EmailMessage()
+        message['Subject'] = f"[Agribot] Anomaly detected - {reading.get('plant_id', 'Unknown')}"
+        message['From'] = cfg['sender']
+        message['To'] = ', '.join(cfg['recipients'])
+        message.set_content(self.format_message(reading))
+
+        with smtplib.SMTP(cfg['smtp_server'], cfg['smtp_port'], timeout=10) as smtp:
+            if cfg.get('use_tls', True):
+                smtp.starttls()
+            # Only log in when credentials are configured; local relays take mail without
+            if cfg.get('password') is not None:
+                smtp.login(cfg.get('username') or cfg['sender'], cfg['password'])
+            smtp.send_message(message)
+
+    def _send_webhook(self, reading):
+        body = json.dumps({'event': 'anomaly', 'reading': reading}).encode('utf-8')
+        req = urllib.request.Request(self.webhook_url, data=body, method='POST',
+                                     headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(req, timeout=10) as response:
+            if response.status >= 300:
+                raise ConnectionError(f"Webhook returned status {response.status}")
+
+    def close(self, timeout=None):
+        """Finish queued alerts and stop the workers"""
+        for _ in self._workers:
+            self.queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+
+
+if __name__ == "__main__":
+    # Send one test alert with the configured method
+    dispatcher = AlertDispatcher(method=sys.argv[1] if len(sys.argv) > 1 else config.ALERT_METHOD)
+    dispatcher.submit({
+        'plant_id': 'Test-Plant',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'temperature': 45.0,
+        'humidity': 20.0,
+        'ph': 3.5,
+        'anomaly_score': 0.9,
+        'is_anomaly': True,
+        'temporal_reasons': [],
+    })
+    dispatcher.close()
+    print(f"Alert stats: {dispatcher.stats()}")
@@ -4,8 +4,14 @@ Trains an Isolation Forest ML model to detect anomalies in:
 - Temperature (°C)
 - Humidity (%)
 - pH Level
+
+Usage:
+    python anomaly_detection_model.py              # Google Sheets (CSV fallback)
+    python anomaly_detection_model.py data.csv     # a CSV with the feature columns
 """
 
+import sys
+
 import pandas as pd
 import numpy as np
 import gspread
@@ -13,28 +19,36 @@ import joblib
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 from oauth2client.service_account import ServiceAccountCredentials
+from drift import DriftBaseline
+from forest_scorer import export
 
 print("=" * 60)
 print("ANOMALY DETECTION MODEL TRAINING")
 print("=" * 60)
 
-# 1. AUTHENTICATION & DATA FETCH FROM GOOGLE SHEETS
-print("\n1. Authenticating with Google Sheets...")
-scope = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
-client = gspread.authorize(creds)
-
-try:
-    spreadsheet = client.open("Agribot-AI-datasheet")
-    sheet = spreadsheet.sheet1
-    data = sheet.get_all_records()
-    print(f"✓ Successfully fetched {len(data)} records from Google Sheets")
-except Exception as e:
-    print(f"✗ Error fetching from Google Sheets: {e}")
-    print("  Falling back to CSV file...")
-    df = pd.read_csv('lettuce_dataset_updated.csv', encoding='latin-1')
+# 1. DATA: a CSV given on the command line (e.g. drift.py's mix of live and
+# training readings), else Google Sheets with the CSV as fallback
+if len(sys.argv) > 1:
+    print(f"\n1. Loading training data from {sys.argv[1]}...")
+    df = pd.read_csv(sys.argv[1], encoding='latin-1')
+    print(f"✓ Loaded {len(df)} records")
 else:
-    df = pd.DataFrame(data)
+    print("\n1. Authenticating with Google Sheets...")
+    scope = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+    creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
+    client = gspread.authorize(creds)
+
+    try:
+        spreadsheet = client.open("Agribot-AI-datasheet")
+        sheet = spreadsheet.sheet1
+        data = sheet.get_all_records()
+        print(f"✓ Successfully fetched {len(data)} records from Google Sheets")
+    except Exception as e:
+        print(f"✗ Error fetching from Google Sheets: {e}")
+        print("  Falling back to CSV file...")
+        df = pd.read_csv('lettuce_dataset_updated.csv', encoding='latin-1')
+    else:
+        df = pd.DataFrame(data)
 
 # 2. DATA PREPROCESSING
 print("\n2. Preprocessing data...")
@@ -96,6 +110,14 @@ joblib.dump(scaler, 'anomaly_scaler.pkl')
 print("✓ Model saved as 'anomaly_model.pkl'")
 print("✓ Scaler saved as 'anomaly_scaler.pkl'")
 
+# NumPy-only copy used by the servers and the Pi (see forest_scorer.py)
+export('anomaly_model.pkl', 'anomaly_scaler.pkl', 'anomaly_model.npz')
+print("✓ NumPy export saved as 'anomaly_model.npz'")
+
+# Training distribution for the live drift monitor (see drift.py)
+DriftBaseline.from_data(df_anomaly.values, scaler.mean_, scaler.scale_).save('drift_baseline.npz')
+print("✓ Drift baseline saved as 'drift_baseline.npz'")
+
 # 7. SHOW SAMPLE ANOMALIES
 print("\n7. Sample Anomalies Detected:")
 print("-" * 60)
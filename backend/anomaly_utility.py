@@ -5,41 +5,38 @@ Advanced Anomaly Detection Utility
 - Continuous monitoring mode
 """
 
-import pandas as pd
 import numpy as np
-import joblib
 from datetime import datetime
 import csv
 import sys
+from forest_scorer import FEATURE_NAMES, load_scorer
+
+# Display names for the attribution breakdown
+FEATURE_LABELS = dict(zip(FEATURE_NAMES, ['Temperature', 'Humidity', 'pH Level']))
 
 class AnomalyDetector:
     def __init__(self):
         """Initialize detector"""
         try:
-            self.model = joblib.load('anomaly_model.pkl')
-            self.scaler = joblib.load('anomaly_scaler.pkl')
             self.feature_columns = ['Temperature (°C)', 'Humidity (%)', 'pH Level']
-        except FileNotFoundError:
-            print("✗ Model files not found. Run anomaly_detection_model.py first.")
+            # The NumPy-only export loads without importing sklearn
+            self.forest = load_scorer('anomaly_model.pkl', 'anomaly_scaler.pkl')
+        except (FileNotFoundError, ValueError) as e:
+            print(f"✗ {e}. Run anomaly_detection_model.py first.")
             exit(1)
     
     def check_single_reading(self, temperature, humidity, ph_level):
-        """Analyze a single sensor reading"""
-        # Create array
-        X = np.array([[temperature, humidity, ph_level]])
-        
-        # Normalize
-        X_normalized = self.scaler.transform(X)
-        
-        # Predict
-        prediction = self.model.predict(X_normalized)[0]
-        score = self.model.score_samples(X_normalized)[0]
-        
-        return prediction, score
+        """
+        Analyze a single sensor reading
+        Returns: (prediction, score, attribution) where attribution holds each
+        feature's share of the isolation, computed in the same tree pass
+        """
+        result = self.forest.score_one(temperature, humidity, ph_level, explain=True)
+        return result['label'], result['raw'], result['attribution']
     
     def analyze_reading(self, temperature, humidity, ph_level, plant_id="Unknown", date="Unknown"):
         """Detailed analysis of a reading"""
-        prediction, score = self.check_single_reading(temperature, humidity, ph_level)
+        prediction, score, attribution = self.check_single_reading(temperature, humidity, ph_level)
         
         print("\n" + "=" * 70)
         print(f"SENSOR READING ANALYSIS - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -57,7 +54,10 @@ class AnomalyDetector:
             print(f"  Anomaly Score: {score:.4f} (lower = more anomalous)")
             print(f"\n  Explanation:")
             print(f"  This reading differs significantly from normal patterns.")
-            print(f"  Investigate possible causes.")
+            print(f"\n  Contributing factors:")
+            for idx in np.argsort(attribution)[::-1]:
+                print(f"    {FEATURE_LABELS[FEATURE_NAMES[idx]]:12s} {attribution[idx] * 100:5.1f}%")
+            print(f"\n  Investigate {FEATURE_LABELS[FEATURE_NAMES[int(np.argmax(attribution))]]} first.")
         else:
             print(f"  ✓ NORMAL READING")
             print(f"  Anomaly Score: {score:.4f} (normal values closer to 0)")
@@ -102,6 +102,7 @@ def interactive_mode():
         elif command == 'batch':
             filename = input("CSV filename (with Plant_ID, Date, Temperature (°C), Humidity (%), pH Level): ").strip()
             try:
+                import pandas as pd
                 df = pd.read_csv(filename)
                 results = []
                 
@@ -110,7 +111,7 @@ def interactive_mode():
                     humidity = float(row['Humidity (%)'])
                     ph = float(row['pH Level'])
                     
-                    pred, score = detector.check_single_reading(temp, humidity, ph)
+                    pred, score, attribution = detector.check_single_reading(temp, humidity, ph)
                     
                     results.append({
                         'Plant_ID': row.get('Plant_ID', 'Unknown'),
@@ -119,7 +120,8 @@ def interactive_mode():
                         'Humidity': humidity,
                         'pH_Level': ph,
                         'Is_Anomaly': 'Yes' if pred == -1 else 'No',
-                        'Anomaly_Score': score
+                        'Anomaly_Score': score,
+                        'Top_Factor': FEATURE_LABELS[FEATURE_NAMES[int(np.argmax(attribution))]] if pred == -1 else ''
                     })
                 
                 # Save results
@@ -6,48 +6,37 @@ Saves results to timestamped text file
 
 import pandas as pd
 import numpy as np
-import joblib
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime
 import os
+from forest_scorer import load_scorer
+from sheet_mirror import synced_mirror
 
 class AnomalyDetectionSystem:
     def __init__(self):
         """Initialize the anomaly detection system"""
-        self.model = None
-        self.scaler = None
+        self.forest = None
         self.feature_columns = ['Temperature (°C)', 'Humidity (%)', 'pH Level']
         self.load_models()
         
     def load_models(self):
         """Load pre-trained model and scaler"""
         try:
-            self.model = joblib.load('anomaly_model.pkl')
-            self.scaler = joblib.load('anomaly_scaler.pkl')
+            self.forest = load_scorer('anomaly_model.pkl', 'anomaly_scaler.pkl')
             print("✓ Model and scaler loaded successfully")
-        except FileNotFoundError as e:
+        except (FileNotFoundError, ValueError) as e:
             print(f"✗ Error: {e}")
             print("  Please run 'anomaly_detection_model.py' first to train the model")
             exit(1)
     
     def get_data_from_sheets(self):
-        """Fetch latest data from Google Sheets"""
+        """Fetch latest data from Google Sheets (only new rows; see sheet_mirror.py)"""
         print("\nFetching data from Google Sheets...")
-        try:
-            scope = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-            creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
-            client = gspread.authorize(creds)
-            
-            spreadsheet = client.open("Agribot-AI-datasheet")
-            sheet = spreadsheet.sheet1
-            data = sheet.get_all_records()
-            df = pd.DataFrame(data)
-            print(f"✓ Fetched {len(df)} records from Google Sheets")
-            return df
-        except Exception as e:
-            print(f"✗ Error: {e}")
+        mirror = synced_mirror()
+        if mirror is None:
             return None
+        df = mirror.dataframe()
+        print(f"✓ Loaded {len(df)} records from the sheet mirror")
+        return df
     
     def get_data_from_csv(self):
         """Fallback: Fetch data from CSV"""
@@ -72,25 +61,28 @@ class AnomalyDetectionSystem:
         # Handle missing values
         df_check = df_check.dropna()
         
-        # Extract features only for normalization
+        # Extract features only (the scorer applies the training scaler)
         X_features = df_check[self.feature_columns].values
         
-        # Normalize using the training scaler
-        X_normalized = self.scaler.transform(X_features)
-        
-        # Predict
-        predictions = self.model.predict(X_normalized)
-        anomaly_scores = self.model.score_samples(X_normalized)
+        # Predict, score and attribute in one pass over the trees
+        result = self.forest.score(X_features)
+        predictions = result['label']
+        anomaly_scores = result['raw']
         
-        return predictions, anomaly_scores, df_check
+        return predictions, anomaly_scores, df_check, result['attribution']
     
-    def generate_warnings(self, df, predictions, anomaly_scores):
+    def generate_warnings(self, df, predictions, anomaly_scores, attributions=None):
         """Generate warning messages for detected anomalies"""
         warnings = []
         
         for idx, (pred, score) in enumerate(zip(predictions, anomaly_scores)):
             if pred == -1:  # Anomaly detected
                 record = df.iloc[idx]
+                factors = ''
+                if attributions is not None:
+                    order = np.argsort(attributions[idx])[::-1]
+                    factors = ', '.join(f"{self.feature_columns[i]} {attributions[idx][i] * 100:.0f}%"
+                                        for i in order)
                 warning = {
                     'Index': idx,
                     'Anomaly_Score': f"{score:.4f}",
@@ -98,7 +90,8 @@ class AnomalyDetectionSystem:
                     'Humidity': f"{record['Humidity (%)']}%",
                     'pH': f"{record['pH Level']}",
                     'Plant_ID': str(record.get('Plant_ID', 'Unknown')),
-                    'Date': str(record.get('Date', 'Unknown'))
+                    'Date': str(record.get('Date', 'Unknown')),
+                    'Factors': factors
                 }
                 warnings.append(warning)
         
@@ -144,6 +137,8 @@ class AnomalyDetectionSystem:
                 anomaly_detail += f"\n      Humidity: {warning['Humidity']}"
                 anomaly_detail += f"\n      pH Level: {warning['pH']}"
                 anomaly_detail += f"\n      Anomaly Score: {warning['Anomaly_Score']}"
+                if warning['Factors']:
+                    anomaly_detail += f"\n      Main Factors: {warning['Factors']}"
                 
                 print_both(anomaly_detail)
                 report_text.append(anomaly_detail)
@@ -177,10 +172,10 @@ class AnomalyDetectionSystem:
         
         # Detect anomalies
         print("\nAnalyzing data for anomalies...")
-        predictions, anomaly_scores, df_clean = self.detect_anomalies(df)
+        predictions, anomaly_scores, df_clean, attributions = self.detect_anomalies(df)
         
         # Generate warnings
-        warnings = self.generate_warnings(df_clean, predictions, anomaly_scores)
+        warnings = self.generate_warnings(df_clean, predictions, anomaly_scores, attributions)
         
         # Print report to console AND file
         with open(report_filename, 'w', encoding='utf-8') as f:
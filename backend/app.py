@@ -3,103 +3,573 @@ Flask Web Server for Plant Sensor Monitoring
 Receives sensor data from Raspberry Pi and detects anomalies
 """
 
-from flask import Flask, render_template, request, jsonify
-from datetime import datetime
+from flask import Flask, render_template, request, jsonify, g
+from datetime import datetime, timedelta
 import json
-import pickle
+from functools import wraps
 import os
+import threading
+import socketserver
 from collections import deque
 import numpy as np
+from response_cache import ResponseCache
+import sensor_protocol
+import config
+from temporal_detectors import TemporalDetector
+from alerts import AlertDispatcher
+from sensor_log import SensorLogWriter
+from forest_scorer import attribution_dict, load_scorer
+from score_cache import ScoreCache
+from rollups import merge_buckets, RollupStore
+from quantiles import TDigest, QuantileStore, parse_window
+from shards import ShardPool, ShardError, serve
+from dedup import DedupIndex, reading_key
+from admission import AdmissionController, Rejected
+from drift import DriftMonitor, FeatureHistograms, load_baseline
+from shadow import ShadowScorer
 
 app = Flask(__name__)
 
 # Configuration
-MAX_READINGS = 100
+MAX_READINGS = 100  # per shard
 SENSOR_READINGS = deque(maxlen=MAX_READINGS)
+DROPPED_SEQ = 0  # seq of the newest reading that left (or was cleared from) the buffer
 PORT = 5000
+BINARY_PORT = 5001  # Persistent TCP ingestion (see sensor_protocol.py)
+DEBUG = True
+
+# Serialized /api/history and /api/stats responses, invalidated on new data
+RESPONSE_CACHE = ResponseCache()
+
+# Every stored reading gets a monotonically increasing sequence number ('seq')
+# so pollers can ask for only what they have not seen yet.
+# LAST_SEQ only advances once every reading up to it has been stored by its shard.
+LAST_SEQ = 0
+NEXT_SEQ = 1
+IN_FLIGHT = set()  # first seq of each batch handed to the shards but not yet stored
+NEW_READING = threading.Condition()
+MAX_LONG_POLL = 30  # seconds
+
+# 1m/1h/1d aggregates per plant for long-range charts (per shard, like the buffer)
+ROLLUPS = RollupStore()
+
+# Per-plant percentile sketches for /api/stats?percentiles= (per shard too)
+QUANTILES = QuantileStore()
+
+# Per-plant EWMA / rate-of-change / drift detectors, run alongside the model
+TEMPORAL = TemporalDetector()
+
+# Keys of stored readings, so retried uploads are answered, not stored twice
+DEDUP = DedupIndex()
+
+# Token buckets and in-flight limit for the ingestion endpoints
+ADMISSION = AdmissionController()
+
+# Recent per-plant feature histograms (per shard) and the drift checks run on them
+DRIFT_HISTOGRAMS = FeatureHistograms()
+
+# Anomaly alerts (config.ALERT_METHOD); ingestion only enqueues
+ALERTS = AlertDispatcher() if config.ENABLE_ALERTS else None
+
+# Candidate models scored off the request path (started in __main__ when
+# config.SHADOW_MODELS lists any)
+SHADOW = None
+
+# Durable reading history (logs/readings-*.jsonl[.gz])
+READING_LOG = SensorLogWriter('readings')
 
 # Load anomaly detection model and scaler
 MODEL_PATH = 'anomaly_model.pkl'
 SCALER_PATH = 'anomaly_scaler.pkl'
 
-model = None
-scaler = None
+forest = None  # Flattened model: label, scores and per-feature attribution in one pass
+
+# Memoized model output for readings on the sensors' decimal grid (rebound when the model changes)
+SCORE_CACHE = ScoreCache()
 
 def load_model():
-    """Load the pre-trained anomaly detection model"""
-    global model, scaler
+    """Load the pre-trained anomaly detection model and scaler (rule-based checks without them)"""
+    global forest
     try:
-        if os.path.exists(MODEL_PATH):
-            with open(MODEL_PATH, 'rb') as f:
-                model = pickle.load(f)
-            print(f"✓ Anomaly detection model loaded from {MODEL_PATH}")
-        else:
-            print(f"⚠ Model file not found at {MODEL_PATH}")
-            model = None
-            
-        if os.path.exists(SCALER_PATH):
-            with open(SCALER_PATH, 'rb') as f:
-                scaler = pickle.load(f)
-            print(f"✓ Scaler loaded from {SCALER_PATH}")
-        else:
-            print(f"⚠ Scaler file not found at {SCALER_PATH}")
-            scaler = None
+        forest = load_scorer(MODEL_PATH, SCALER_PATH)
+        print(f"✓ Anomaly detection model loaded ({len(forest.roots)} trees)")
     except Exception as e:
         print(f"✗ Error loading model: {e}")
-        model = None
-        scaler = None
+        forest = None
+    SCORE_CACHE.bind(forest)
+    if forest is not None and config.SCORE_CACHE_ENABLED and config.SCORE_CACHE_PREWARM:
+        threading.Thread(target=SCORE_CACHE.prewarm, name='score-cache-prewarm', daemon=True).start()
+    DRIFT_HISTOGRAMS.bind(load_baseline())
+
+def score_features(features):
+    """Score raw [temperature, humidity, ph] rows, through the score cache when enabled"""
+    if config.SCORE_CACHE_ENABLED and SCORE_CACHE.forest is forest:
+        return SCORE_CACHE.score(features)
+    return forest.score(features)
 
 def detect_anomaly(temperature, humidity, ph):
     """
     Detect if sensor readings are anomalous
-    Returns: (is_anomaly, anomaly_score)
+    Returns: (is_anomaly, anomaly_score, attribution)
+    attribution maps each feature to its share of the verdict (None if unavailable)
     """
-    if model is None or scaler is None:
+    if forest is None:
         # If model not loaded, use simple rule-based detection
         return check_basic_anomalies(temperature, humidity, ph)
     
-    try:
-        # Prepare data for model
-        features = np.array([[temperature, humidity, ph]])
-        features_scaled = scaler.transform(features)
-        
-        # Get anomaly prediction
-        is_anomaly = model.predict(features_scaled)[0]
-        
-        # Get decision function score (if available)
-        try:
-            anomaly_score = abs(model.decision_function(features_scaled)[0])
-        except:
-            anomaly_score = float(is_anomaly)
-        
-        return bool(is_anomaly == -1), float(anomaly_score)
-    except Exception as e:
-        print(f"Error in anomaly detection: {e}")
-        return check_basic_anomalies(temperature, humidity, ph)
+    result = score_features([[temperature, humidity, ph]])
+    return (bool(result['label'][0] == -1), float(abs(result['decision'][0])),
+            attribution_dict(result['attribution'][0]))
 
 def check_basic_anomalies(temperature, humidity, ph):
     """
     Basic rule-based anomaly detection if model is not available
     """
-    is_anomaly = False
-    score = 0.0
+    violations = {
+        # Temperature bounds (0-50°C reasonable for indoor plants)
+        'temperature': temperature < 0 or temperature > 50,
+        # Humidity bounds (0-100%)
+        'humidity': humidity < 0 or humidity > 100,
+        # pH bounds (most plants prefer 6.0-7.5)
+        'ph': ph < 4.0 or ph > 9.0
+    }
+    score = float(sum(violations.values()))
+    is_anomaly = score > 0
+    
+    # Each broken rule gets an equal share of the blame
+    attribution = {name: (1.0 / score if broken else 0.0) if score else 0.0
+                   for name, broken in violations.items()}
+    return is_anomaly, min(score, 3.0) / 3.0, attribution
+
+def detect_anomalies_batch(features):
+    """
+    Vectorized detect_anomaly for an (N, 3) array of [temperature, humidity, ph]
+    Returns: (is_anomaly array, anomaly_score array, (N, 3) attribution array or None)
+    """
+    if forest is not None:
+        result = score_features(features)
+        return result['label'] == -1, np.abs(result['decision']), result['attribution']
+    
+    temperature, humidity, ph = features[:, 0], features[:, 1], features[:, 2]
+    broken = np.column_stack([(temperature < 0) | (temperature > 50),
+                              (humidity < 0) | (humidity > 100),
+                              (ph < 4.0) | (ph > 9.0)]).astype(float)
+    violations = broken.sum(axis=1)
+    attribution = np.divide(broken, violations[:, None], out=np.zeros_like(broken),
+                            where=violations[:, None] > 0)
+    return violations > 0, np.minimum(violations, 3.0) / 3.0, attribution
+
+def make_reading(timestamp, temperature, humidity, ph, plant_id, point_anomaly, anomaly_score,
+                 attribution=None):
+    """
+    Build a reading record, combining the point model verdict with the
+    plant's temporal detectors (timestamp: datetime of the measurement)
+    """
+    temporal_anomaly, reasons = TEMPORAL.update(plant_id, timestamp.timestamp(),
+                                                (temperature, humidity, ph))
+    is_anomaly = point_anomaly or temporal_anomaly
+    return {
+        'timestamp': timestamp.isoformat(),
+        'temperature': temperature,
+        'humidity': humidity,
+        'ph': ph,
+        'plant_id': plant_id,
+        'is_anomaly': is_anomaly,
+        'anomaly_score': anomaly_score,
+        'attribution': attribution,
+        'point_anomaly': point_anomaly,
+        'temporal_anomaly': temporal_anomaly,
+        'temporal_reasons': reasons,
+        'status': 'ANOMALY' if is_anomaly else 'NORMAL'
+    }
+
+def build_readings(features, timestamps, plant_ids, device_seqs=None, extras=None):
+    """
+    Score an (N, 3) feature array in one batch and build the reading records
+    (timestamps: unix seconds, device_seqs: per-reading sensor sequence numbers,
+    extras: per-reading dicts of additional fields)
+    """
+    is_anomaly, scores, attributions = detect_anomalies_batch(features)
+    attributions = ([attribution_dict(row) for row in attributions]
+                    if attributions is not None else [None] * len(plant_ids))
+    readings = []
+    for i, (ts, (temp, hum, ph), plant_id, anomaly, score, attribution) in enumerate(zip(
+            timestamps, features.tolist(), plant_ids, is_anomaly.tolist(),
+            scores.tolist(), attributions)):
+        reading = make_reading(datetime.fromtimestamp(ts), temp, hum, ph, plant_id,
+                               anomaly, score, attribution)
+        if device_seqs is not None:
+            reading['device_seq'] = int(device_seqs[i])
+        if extras is not None and extras[i]:
+            reading.update(extras[i])
+        readings.append(reading)
+    return readings
+
+# ----------------------------------------------------------------------------
+# Shard operations: run against this process's buffer, rollups and detectors.
+# With config.INGEST_SHARDS > 1 each worker process owns the plants hashed to
+# it and the front process merges what the shards return.
+# ----------------------------------------------------------------------------
+
+def shard_ingest(features, timestamps, plant_ids, device_seqs, extras, seqs):
+    """
+    Score and buffer readings for plants on this shard.
+    Returns: (records, whether the model scored them rather than the rule-based fallback)
+    """
+    global DROPPED_SEQ
+    readings = build_readings(features, timestamps, plant_ids, device_seqs, extras)
+    DRIFT_HISTOGRAMS.add(features, plant_ids)
+    for reading, seq in zip(readings, seqs):
+        reading['seq'] = int(seq)
+        if len(SENSOR_READINGS) == SENSOR_READINGS.maxlen:
+            DROPPED_SEQ = SENSOR_READINGS[0]['seq']
+        SENSOR_READINGS.append(reading)
+        ROLLUPS.add_reading(reading)
+        QUANTILES.add_reading(reading)
+    return readings, forest is not None
+
+def shard_history(since, upto, limit, plant_id=None, oldest=False):
+    """
+    Up to `limit` newest (or with oldest=True, oldest) buffered readings with
+    since < seq <= upto, walking back from the newest so the cost is
+    proportional to the readings after `since`.
+    Returns: (readings oldest first, DROPPED_SEQ)
+    """
+    newer = []
+    for reading in reversed(SENSOR_READINGS):
+        if reading['seq'] <= since or (not oldest and len(newer) >= limit):
+            break
+        if reading['seq'] > upto or (plant_id and reading['plant_id'] != plant_id):
+            continue
+        newer.append(reading)
+    newer.reverse()
+    return (newer[:limit] if oldest else newer), DROPPED_SEQ
+
+def shard_latest():
+    return SENSOR_READINGS[-1] if SENSOR_READINGS else None
+
+def shard_stats(plant_id=None):
+    """
+    Mergeable totals over the buffered readings (None if there are none),
+    counting the readings that edge summaries and deadband reports stand for
+    """
+    readings = [r for r in SENSOR_READINGS if not plant_id or r['plant_id'] == plant_id]
+    if not readings:
+        return None
+    partial = {
+        'count': len(readings),
+        'anomalies': sum(1 for r in readings if r['is_anomaly']),
+        'last': readings[-1],
+    }
+    for metric in ('temperature', 'humidity', 'ph'):
+        values = np.array([r[metric] for r in readings], dtype=np.float64)
+        partial[metric] = (float(values.sum()), float(values.min()), float(values.max()))
+    
+    for reading in readings:
+        for key in ('summary', 'suppressed'):
+            window = reading.get(key)
+            if not window or window['count'] <= 0:
+                continue
+            # An edge summary includes the reading carrying it; suppressed ones don't
+            own = 1 if key == 'summary' else 0
+            partial['count'] += window['count'] - own
+            partial['anomalies'] += window.get('anomalies', 0)
+            for metric in ('temperature', 'humidity', 'ph'):
+                total, low, high = partial[metric]
+                stat = window[metric]
+                partial[metric] = (total + stat['mean'] * window['count'] - own * reading[metric],
+                                   min(low, stat['min']), max(high, stat['max']))
+    return partial
+
+def shard_rollups(start, end, points, plant_id, resolution):
+    return ROLLUPS.query_buckets(start, end, points, plant_id=plant_id, resolution=resolution)[1]
+
+def shard_quantiles(window, plant_id):
+    return QUANTILES.digests(window, plant_id)
+
+def shard_drift(plant_id):
+    return DRIFT_HISTOGRAMS.counts(plant_id)
+
+def shard_metrics():
+    return {
+        'pid': os.getpid(),
+        'buffered': len(SENSOR_READINGS),
+        'score_cache': SCORE_CACHE.stats(),
+        'temporal_plants': TEMPORAL.plant_count(),
+        'drift_plants': DRIFT_HISTOGRAMS.plant_count()
+    }
+
+def shard_clear(upto):
+    """Drop everything; readings up to seq `upto` count as having left the buffer"""
+    global DROPPED_SEQ
+    DROPPED_SEQ = max(DROPPED_SEQ, upto)
+    SENSOR_READINGS.clear()
+    ROLLUPS.clear()
+    QUANTILES.clear()
+    TEMPORAL.clear()
+    DRIFT_HISTOGRAMS.clear()
+
+SHARD_OPS = {
+    'ingest': shard_ingest,
+    'history': shard_history,
+    'latest': shard_latest,
+    'stats': shard_stats,
+    'rollups': shard_rollups,
+    'quantiles': shard_quantiles,
+    'drift': shard_drift,
+    'metrics': shard_metrics,
+    'reload_model': load_model,
+    'clear': shard_clear,
+}
+
+def run_shard(index, conn):
+    """Worker process entry point (see shards.py): serve one shard's operations"""
+    print(f"✓ Shard {index} started (pid {os.getpid()})")
+    load_model()
+    serve(conn, SHARD_OPS)
+
+# Plants are spread over config.INGEST_SHARDS worker processes (started in
+# __main__); until then a single shard runs inside this process
+SHARDS = ShardPool(1, run_shard, SHARD_OPS)
+
+# ----------------------------------------------------------------------------
+# Front: sequence numbers, routing and merging
+# ----------------------------------------------------------------------------
+
+REPLAY_FIELDS = ('seq', 'timestamp', 'plant_id', 'status', 'is_anomaly', 'anomaly_score',
+                 'attribution', 'temporal_reasons')
+
+def ingest(features, timestamps, plant_ids, device_seqs=None, extras=None, keys=None):
+    """
+    Store readings that haven't been stored before (keys: per-reading dedup
+    keys from reading_key(), None where a reading has none).
+    Returns: (records in input order, server cursor). A replayed reading's
+    record is its original result with 'duplicate': True.
+    """
+    if keys is None:
+        return store_readings(features, timestamps, plant_ids, device_seqs, extras)
     
-    # Temperature bounds (0-50°C reasonable for indoor plants)
-    if temperature < 0 or temperature > 50:
-        is_anomaly = True
-        score += 1.0
+    verdicts = DEDUP.claim(keys)
+    fresh = np.array([i for i, v in enumerate(verdicts) if v is None], dtype=np.int64)
+    stored = []
+    cursor = LAST_SEQ
+    try:
+        if len(fresh):
+            stored, cursor = store_readings(
+                features[fresh], timestamps[fresh], [plant_ids[i] for i in fresh],
+                device_seqs[fresh] if device_seqs is not None else None,
+                [extras[i] for i in fresh] if extras is not None else None)
+    except BaseException:
+        for i in fresh:
+            if keys[i] is not None:
+                DEDUP.release(keys[i])
+        raise
+    
+    records = list(verdicts)
+    for i, reading in zip(fresh.tolist(), stored):
+        records[i] = reading
+        if keys[i] is not None:
+            DEDUP.complete(keys[i], {f: reading[f] for f in REPLAY_FIELDS})
+    for i, verdict in enumerate(verdicts):
+        if verdict is True:
+            # Stored too long ago for its result to be kept
+            records[i] = {'plant_id': plant_ids[i], 'timestamp': datetime.fromtimestamp(
+                              timestamps[i]).isoformat(),
+                          'status': 'DUPLICATE', 'is_anomaly': False, 'anomaly_score': None,
+                          'attribution': None, 'temporal_reasons': [], 'duplicate': True}
+        elif verdict is not None:
+            records[i] = dict(verdict, duplicate=True)
+    return records, cursor
+
+def store_readings(features, timestamps, plant_ids, device_seqs=None, extras=None):
+    """
+    Route readings to their plants' shards, where they are scored and
+    buffered, then log them and queue alerts.
+    Returns: (reading records in input order, server cursor)
+    """
+    global NEXT_SEQ, LAST_SEQ
+    count = len(plant_ids)
+    shard_of = np.fromiter((SHARDS.shard_for(p) for p in plant_ids), dtype=np.int64, count=count)
+    groups = {int(shard): np.flatnonzero(shard_of == shard) for shard in np.unique(shard_of)}
     
-    # Humidity bounds (0-100%)
-    if humidity < 0 or humidity > 100:
-        is_anomaly = True
-        score += 1.0
+    # Sequence numbers are taken while holding the shard locks so each shard
+    # buffers its readings in seq order
+    with SHARDS.locked(groups):
+        with NEW_READING:
+            first_seq = NEXT_SEQ
+            NEXT_SEQ += count
+            IN_FLIGHT.add(first_seq)
+        seqs = np.arange(first_seq, first_seq + count)
+        try:
+            results = SHARDS.scatter({
+                shard: ('ingest', (features[rows], timestamps[rows], [plant_ids[i] for i in rows],
+                                   device_seqs[rows] if device_seqs is not None else None,
+                                   [extras[i] for i in rows] if extras is not None else None,
+                                   seqs[rows]))
+                for shard, rows in groups.items()
+            })
+        finally:
+            with NEW_READING:
+                IN_FLIGHT.discard(first_seq)
+                LAST_SEQ = min(IN_FLIGHT) - 1 if IN_FLIGHT else NEXT_SEQ - 1
+                RESPONSE_CACHE.bump()
+                NEW_READING.notify_all()
+                cursor = LAST_SEQ
     
-    # pH bounds (most plants prefer 6.0-7.5)
-    if ph < 4.0 or ph > 9.0:
-        is_anomaly = True
-        score += 1.0
+    readings = [None] * count
+    for shard, rows in groups.items():
+        for i, reading in zip(rows.tolist(), results[shard][0]):
+            readings[i] = reading
+    model_scored = all(scored for _, scored in results.values())
     
-    return is_anomaly, min(score, 3.0) / 3.0
+    for reading in readings:
+        READING_LOG.write(reading)
+    
+    if ALERTS is not None:
+        for reading in readings:
+            if reading['is_anomaly']:
+                ALERTS.submit(reading)
+    
+    if SHADOW is not None and not model_scored:
+        # Rule-based verdicts are no baseline for a candidate model
+        SHADOW.skip(count)
+    elif SHADOW is not None:
+        # The serving model's verdict and signed decision score (< 0 = anomaly)
+        point = np.array([r['point_anomaly'] for r in readings], dtype=bool)
+        scores = np.array([r['anomaly_score'] for r in readings], dtype=np.float64)
+        SHADOW.submit(features, point, np.where(point, -scores, scores))
+    return readings, cursor
+
+def ingest_frame(payload):
+    """
+    Decode a binary frame and store its readings.
+    The frame is viewed as a NumPy record array and scored in one batch;
+    no per-field JSON parsing or validation happens per reading.
+    Returns: (number of readings stored, not counting replays, server cursor)
+    """
+    records = sensor_protocol.decode_frame(payload)
+    if len(records) == 0:
+        return 0, LAST_SEQ
+    
+    features = np.column_stack([records['temperature'], records['humidity'],
+                                records['ph']]).astype(np.float64)
+    # Undo float32 noise to the precision the Pi sends over JSON
+    features[:, :2] = np.round(features[:, :2], 2)
+    features[:, 2] = np.round(features[:, 2], 4)
+    plant_ids = [p.decode('utf-8', 'replace') or 'Plant-1' for p in records['plant_id'].tolist()]
+    timestamps = records['timestamp'].astype(np.float64)
+    readings, cursor = ingest(features, timestamps, plant_ids, records['seq'].astype(np.int64),
+                              keys=[reading_key(p, ts) for p, ts in zip(plant_ids, timestamps.tolist())])
+    return sum(1 for r in readings if not r.get('duplicate')), cursor
+
+def query_shards(op, plant_id, *args):
+    """Run a read operation on the shard owning plant_id, or on every shard"""
+    if plant_id:
+        return [SHARDS.call(SHARDS.shard_for(plant_id), op, *args)]
+    return SHARDS.broadcast(op, *args)
+
+def collect_drift(plant_id=None):
+    """Every shard's recent feature histograms: {plant_id: counts}"""
+    histograms = {}
+    for part in query_shards('drift', plant_id, plant_id):
+        histograms.update(part)
+    return histograms
+
+def reload_model():
+    """After a drift retrain: reload the model and baseline wherever they are used"""
+    SHARDS.broadcast('reload_model')
+    DRIFT.bind(load_baseline())
+
+DRIFT = DriftMonitor(on_retrained=reload_model)
+
+def merge_history(since, upto, limit, plant_id):
+    """Newest `limit` readings across shards: (readings, newest dropped seq)"""
+    parts = query_shards('history', plant_id, since, upto, limit, plant_id)
+    readings = sorted((r for newer, _ in parts for r in newer), key=lambda r: r['seq'])
+    return readings[-limit:] if limit else [], max(dropped for _, dropped in parts)
+
+def merge_history_after(since, upto, limit, plant_id):
+    """
+    Oldest `limit` readings after `since` across shards, so a cursor can
+    resume right after the last one: (readings, newest dropped seq, more left)
+    """
+    # One extra per shard tells whether anything is left after the page
+    parts = query_shards('history', plant_id, since, upto, limit + 1, plant_id, True)
+    readings = sorted((r for newer, _ in parts for r in newer), key=lambda r: r['seq'])
+    return readings[:limit], max(dropped for _, dropped in parts), len(readings) > limit
+
+class BinaryIngestHandler(socketserver.StreamRequestHandler):
+    """One persistent connection from a sensor node; each frame gets an ack"""
+    
+    def handle(self):
+        while True:
+            try:
+                payload = sensor_protocol.read_frame(self.rfile)
+            except (sensor_protocol.ProtocolError, OSError) as e:
+                print(f"✗ Binary ingest from {self.client_address[0]}: {e}")
+                return
+            if payload is None:
+                return
+            
+            status, retry_after = sensor_protocol.ACK_OK, 0
+            try:
+                ADMISSION.admit(self.client_address[0], frame_cost(payload))
+            except Rejected as e:
+                status = sensor_protocol.ACK_TOO_LARGE if e.status == 413 else sensor_protocol.ACK_BUSY
+                retry_after, cursor = min(e.retry_after, 255), LAST_SEQ
+            else:
+                try:
+                    _, cursor = ingest_frame(payload)
+                except sensor_protocol.ProtocolError:
+                    status, cursor = sensor_protocol.ACK_BAD_FRAME, LAST_SEQ
+                except Exception as e:
+                    print(f"✗ Binary ingest error: {e}")
+                    status, cursor = sensor_protocol.ACK_SERVER_ERROR, LAST_SEQ
+                finally:
+                    ADMISSION.release()
+            self.wfile.write(sensor_protocol.ACK.pack(sensor_protocol.MAGIC, status, retry_after,
+                                                      cursor))
+
+class BinaryIngestServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def start_binary_server(port=BINARY_PORT):
+    """Start the TCP ingestion listener in a background thread"""
+    server = BinaryIngestServer(('0.0.0.0', port), BinaryIngestHandler)
+    thread = threading.Thread(target=server.serve_forever, name='binary-ingest', daemon=True)
+    thread.start()
+    return server
+
+def frame_cost(payload):
+    """Admission cost of a binary frame: its record count (1 if the header is bad)"""
+    try:
+        return max(1, sensor_protocol.parse_header(payload[:sensor_protocol.HEADER.size]))
+    except sensor_protocol.ProtocolError:
+        return 1
+
+def admitted(cost=lambda: 1):
+    """
+    Run an ingestion view under ADMISSION; when it is saturated answer
+    429 (this client is over its rate) or 503 (server full) with Retry-After,
+    413 when the request is larger than the client may ever send at once
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                ADMISSION.admit(request.remote_addr, cost())
+            except Rejected as e:
+                response = jsonify({'error': e.reason, 'retry_after': e.retry_after})
+                if e.retry_after:
+                    response.headers['Retry-After'] = str(e.retry_after)
+                return response, e.status
+            try:
+                return view(*args, **kwargs)
+            finally:
+                ADMISSION.release()
+        return wrapper
+    return decorator
 
 @app.route('/')
 def index():
@@ -107,6 +577,7 @@ def index():
     return render_template('index.html')
 
 @app.route('/api/sensor-data', methods=['POST'])
+@admitted()
 def receive_sensor_data():
     """
     Receive sensor data from Raspberry Pi
@@ -114,8 +585,21 @@ def receive_sensor_data():
         "temperature": float,
         "humidity": float,
         "ph": float,
-        "plant_id": str (optional)
+        "plant_id": str (optional),
+        "timestamp": unix seconds or ISO string of the measurement (optional,
+                     defaults to the arrival time; with plant_id it identifies
+                     the reading, so a retry gets the original result back
+                     with "duplicate": true instead of being stored twice),
+        "suppressed": {                 (optional, deadband reporting)
+            "count": int,               readings held back since the last message
+            "start", "end",             their time range, and when count > 0
+            "temperature": {"min", "max", "mean"}, "humidity": {...}, "ph": {...},
+            "last_sent": {"timestamp", "temperature", "humidity", "ph"}
+        }
     }
+    The held-back readings stayed within the deadband of last_sent, so the
+    series is a step from last_sent to this reading; their stats go into the
+    rollups and /api/stats.
     """
     try:
         data = request.get_json()
@@ -133,34 +617,138 @@ def receive_sensor_data():
         humidity = float(data['humidity'])
         ph = float(data['ph'])
         plant_id = data.get('plant_id', 'Plant-1')
+        timestamp = data.get('timestamp')
+        key = None
+        if timestamp is None:
+            timestamp = datetime.now().timestamp()
+        else:
+            if isinstance(timestamp, str):
+                timestamp = datetime.fromisoformat(timestamp).timestamp()
+            else:
+                timestamp = float(timestamp)
+            # A device timestamp identifies the reading, so a retry is recognised
+            key = reading_key(plant_id, timestamp)
+        extras = None
+        if data.get('suppressed'):
+            suppressed = data['suppressed']
+            extras = [{'suppressed': dict(parse_window_stats(suppressed) if suppressed['count']
+                                          else {'count': 0},
+                                          last_sent=suppressed.get('last_sent'))}]
         
-        # Detect anomalies
-        is_anomaly, anomaly_score = detect_anomaly(temperature, humidity, ph)
+        # Score, add the temporal detector verdict and store on the plant's shard
+        readings, _ = ingest(np.array([[temperature, humidity, ph]]),
+                             np.array([timestamp]), [plant_id], extras=extras,
+                             keys=[key] if key else None)
+        reading = readings[0]
         
-        # Create reading record
-        reading = {
-            'timestamp': datetime.now().isoformat(),
-            'temperature': temperature,
-            'humidity': humidity,
-            'ph': ph,
-            'plant_id': plant_id,
-            'is_anomaly': is_anomaly,
-            'anomaly_score': anomaly_score,
-            'status': 'ANOMALY' if is_anomaly else 'NORMAL'
-        }
-        
-        SENSOR_READINGS.append(reading)
+        if reading.get('duplicate'):
+            print(f"[{reading['timestamp']}] {plant_id} - Retry of a stored reading, not stored again")
+            return jsonify({
+                'success': True,
+                'duplicate': True,
+                'status': reading['status'],
+                'anomaly_score': reading['anomaly_score'],
+                'attribution': reading['attribution'],
+                'temporal_reasons': reading['temporal_reasons']
+            }), 200
         
         print(f"[{reading['timestamp']}] {plant_id} - "
               f"Temp: {temperature:.1f}°C, Humidity: {humidity:.1f}%, "
               f"pH: {ph:.2f}, Status: {reading['status']}")
+        if reading['temporal_reasons']:
+            print(f"  ⚠ Temporal: {', '.join(reading['temporal_reasons'])}")
         
         return jsonify({
             'success': True,
             'status': reading['status'],
-            'anomaly_score': anomaly_score
+            'anomaly_score': reading['anomaly_score'],
+            'attribution': reading['attribution'],
+            'temporal_reasons': reading['temporal_reasons']
         }), 200
     
+    except (KeyError, TypeError) as e:
+        return jsonify({'error': f'Missing field: {str(e)}'}), 400
+    except ValueError as e:
+        return jsonify({'error': f'Invalid data format: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+def parse_window_stats(data):
+    """Count, time range and per-metric min/max/mean of readings aggregated on a device"""
+    stats = {
+        'start': float(data['start']),
+        'end': float(data['end']),
+        'count': int(data['count']),
+        'anomalies': int(data.get('anomalies', 0))
+    }
+    for metric in ('temperature', 'humidity', 'ph'):
+        stats[metric] = {key: float(data[metric][key]) for key in ('min', 'max', 'mean')}
+    return stats
+
+@app.route('/api/sensor-data/binary', methods=['POST'])
+@admitted(cost=lambda: frame_cost(request.get_data()))
+def receive_sensor_frame():
+    """
+    Receive a binary frame of readings (application/octet-stream body,
+    format in sensor_protocol.py) for clients that cannot hold a TCP socket
+    """
+    try:
+        stored, cursor = ingest_frame(request.get_data())
+        return jsonify({'success': True, 'stored': stored, 'cursor': cursor}), 200
+    except sensor_protocol.ProtocolError as e:
+        return jsonify({'error': f'Invalid frame: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/api/sensor-summary', methods=['POST'])
+@admitted()
+def receive_sensor_summary():
+    """
+    Receive a periodic summary from a Pi running edge inference
+    (raspberry_pi_sensor.py EDGE_INFERENCE; also the last deadband-suppressed
+    readings on shutdown); anomalies arrive separately through
+    /api/sensor-data. Expected JSON: {
+        "plant_id": str,
+        "start": float, "end": float,   (unix seconds)
+        "count": int,                   (normal readings summarized)
+        "temperature": {"min", "max", "mean"}, "humidity": {...}, "ph": {...},
+        "last": {"temperature", "humidity", "ph"}
+    }
+    The last reading is stored as an ordinary reading carrying the summary,
+    and the rollups count the whole window.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        summary = parse_window_stats(data)
+        last = data['last']
+        plant_id = data.get('plant_id', 'Plant-1')
+        if summary['count'] <= 0:
+            return jsonify({'error': 'Empty summary'}), 400
+        
+        readings, cursor = ingest(
+            np.array([[float(last['temperature']), float(last['humidity']), float(last['ph'])]]),
+            np.array([summary['end']]), [plant_id], extras=[{'summary': summary}],
+            keys=[reading_key(plant_id, summary['end'])])
+        reading = readings[0]
+        if reading.get('duplicate'):
+            return jsonify({'success': True, 'duplicate': True, 'status': reading['status'],
+                            'anomaly_score': reading['anomaly_score'], 'cursor': cursor}), 200
+        
+        print(f"[{reading['timestamp']}] {plant_id} - Summary of {summary['count']} readings, "
+              f"Status: {reading['status']}")
+        
+        return jsonify({
+            'success': True,
+            'status': reading['status'],
+            'anomaly_score': reading['anomaly_score'],
+            'cursor': cursor
+        }), 200
+    
+    except (KeyError, TypeError) as e:
+        return jsonify({'error': f'Missing field: {str(e)}'}), 400
     except ValueError as e:
         return jsonify({'error': f'Invalid data format: {str(e)}'}), 400
     except Exception as e:
@@ -169,11 +757,11 @@ def receive_sensor_data():
 @app.route('/api/latest', methods=['GET'])
 def get_latest():
     """Get the latest sensor reading"""
-    if not SENSOR_READINGS:
+    latest = [r for r in SHARDS.broadcast('latest') if r is not None]
+    if not latest:
         return jsonify({'error': 'No readings available'}), 404
     
-    latest = SENSOR_READINGS[-1]
-    return jsonify(latest), 200
+    return jsonify(max(latest, key=lambda r: r['seq'])), 200
 
 @app.route('/api/history', methods=['GET'])
 def get_history():
@@ -182,76 +770,249 @@ def get_history():
     Query params:
     - limit: number of readings (default: 100)
     - plant_id: filter by plant (optional)
+    - since: only return readings with seq > since, oldest first; with
+      'more' in the response, poll again from its 'cursor' (optional)
+    - wait: with since, block up to this many seconds for new data (optional)
     """
+    since = request.args.get('since', None, type=int)
+    if since is None:
+        return get_recent_history()
+    
+    wait = min(request.args.get('wait', 0, type=float), MAX_LONG_POLL)
+    if wait > 0:
+        with NEW_READING:
+            NEW_READING.wait_for(lambda: LAST_SEQ > since, timeout=wait)
+    
+    return get_history_since(since)
+
+@RESPONSE_CACHE.cached
+def get_recent_history():
+    """Last `limit` readings (optionally for one plant)"""
     limit = request.args.get('limit', 100, type=int)
     plant_id = request.args.get('plant_id', None)
     
-    readings = list(SENSOR_READINGS)
+    with NEW_READING:
+        cursor = LAST_SEQ
+    readings, _ = merge_history(0, cursor, max(limit, 0), plant_id)
     
-    if plant_id:
-        readings = [r for r in readings if r['plant_id'] == plant_id]
+    return jsonify({
+        'count': len(readings),
+        'readings': readings,
+        'cursor': cursor
+    }), 200
+
+@RESPONSE_CACHE.cached
+def get_history_since(since):
+    """
+    Readings newer than the `since` cursor, oldest first (each shard walks
+    back from its newest reading, so the cost is proportional to the number
+    of new readings). When more than `limit` are waiting, 'cursor' is the seq
+    of the last one returned and 'more' is set: poll again from there.
+    'truncated' is set when readings after the cursor already left the buffer.
+    """
+    limit = request.args.get('limit', MAX_READINGS, type=int)
+    plant_id = request.args.get('plant_id', None)
     
-    readings = readings[-limit:]
+    with NEW_READING:
+        cursor = LAST_SEQ
+    newer, dropped_seq, more = merge_history_after(since, cursor, max(limit, 0), plant_id)
+    if more:
+        cursor = newer[-1]['seq'] if newer else since
     
     return jsonify({
-        'count': len(readings),
-        'readings': readings
+        'count': len(newer),
+        'readings': newer,
+        'cursor': cursor,
+        'more': more,
+        'truncated': since < dropped_seq
     }), 200
 
+def stats_cache_key():
+    # Percentile windows move forward a bucket at a time
+    try:
+        return QUANTILES.window_start(parse_window(request.args.get('window', None)))
+    except ValueError:
+        return None
+
 @app.route('/api/stats', methods=['GET'])
+@RESPONSE_CACHE.cached(vary=stats_cache_key)
 def get_stats():
-    """Get statistics about sensor readings"""
-    if not SENSOR_READINGS:
-        return jsonify({'error': 'No readings available'}), 404
-    
+    """
+    Get statistics about sensor readings
+    Query params:
+    - plant_id: filter by plant (optional)
+    - percentiles: e.g. 50,95,99 - adds per-metric percentiles (optional)
+    - window: e.g. 30m, 24h, 7d or 'all' - period the percentiles cover
+      (default: all; avg/min/max always cover the buffered readings)
+    """
     plant_id = request.args.get('plant_id', None)
-    readings = list(SENSOR_READINGS)
+    try:
+        percentiles = [float(p) for p in request.args.get('percentiles', '').split(',') if p.strip()]
+        window = parse_window(request.args.get('window', None))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if window and QUANTILES.pick_resolution(window) is None:
+        return jsonify({'error': f"Window is longer than the {QUANTILES.max_window() / 86400:g} days "
+                                 f"of percentile history kept (use window=all)"}), 400
+    if any(not 0 <= p <= 100 for p in percentiles):
+        return jsonify({'error': 'Percentiles must be between 0 and 100'}), 400
     
-    if plant_id:
-        readings = [r for r in readings if r['plant_id'] == plant_id]
+    parts = [p for p in query_shards('stats', plant_id, plant_id) if p is not None]
     
-    if not readings:
-        return jsonify({'error': 'No readings for this plant'}), 404
+    if not parts:
+        return jsonify({'error': 'No readings for this plant' if plant_id
+                        else 'No readings available'}), 404
     
-    # Extract values
-    temperatures = [r['temperature'] for r in readings]
-    humidities = [r['humidity'] for r in readings]
-    phs = [r['ph'] for r in readings]
-    anomalies = [r for r in readings if r['is_anomaly']]
+    count = sum(p['count'] for p in parts)
+    anomalies = sum(p['anomalies'] for p in parts)
+    last = max((p['last'] for p in parts), key=lambda r: r['seq'])
     
     stats = {
-        'total_readings': len(readings),
-        'anomaly_count': len(anomalies),
-        'anomaly_percentage': round((len(anomalies) / len(readings) * 100), 2) if readings else 0,
-        'temperature': {
-            'current': readings[-1]['temperature'],
-            'avg': round(np.mean(temperatures), 2),
-            'min': round(np.min(temperatures), 2),
-            'max': round(np.max(temperatures), 2)
-        },
-        'humidity': {
-            'current': readings[-1]['humidity'],
-            'avg': round(np.mean(humidities), 2),
-            'min': round(np.min(humidities), 2),
-            'max': round(np.max(humidities), 2)
-        },
-        'ph': {
-            'current': readings[-1]['ph'],
-            'avg': round(np.mean(phs), 2),
-            'min': round(np.min(phs), 2),
-            'max': round(np.max(phs), 2)
-        },
-        'last_reading_time': readings[-1]['timestamp']
+        'total_readings': count,
+        'anomaly_count': anomalies,
+        'anomaly_percentage': round((anomalies / count * 100), 2) if count else 0,
+        'last_reading_time': last['timestamp']
     }
+    for metric in ('temperature', 'humidity', 'ph'):
+        stats[metric] = {
+            'current': last[metric],
+            'avg': round(sum(p[metric][0] for p in parts) / count, 2),
+            'min': round(min(p[metric][1] for p in parts), 2),
+            'max': round(max(p[metric][2] for p in parts), 2)
+        }
+    
+    if percentiles:
+        # Each shard merges its plants' sketches, then the shards' are merged here
+        sketches = query_shards('quantiles', plant_id, window, plant_id)
+        stats['window'] = request.args.get('window') or 'all'
+        for metric in ('temperature', 'humidity', 'ph'):
+            digest = TDigest.merged([s[metric] for s in sketches])
+            values = digest.quantiles([p / 100 for p in percentiles])
+            stats[metric]['percentiles'] = {
+                f"p{p:g}": round(v, 2) if v is not None else None
+                for p, v in zip(percentiles, values)
+            }
+            stats[metric]['window_count'] = int(digest.count)
     
     return jsonify(stats), 200
 
+def rollup_window():
+    """
+    The (start, end) datetimes a /api/rollups request covers, resolved once
+    per request so the response cache can key on it (ValueError if invalid)
+    """
+    if 'rollup_window' not in g:
+        end = request.args.get('end', None)
+        end = datetime.fromisoformat(end) if end else datetime.now().replace(microsecond=0)
+        start = request.args.get('start', None)
+        if start:
+            start = datetime.fromisoformat(start)
+        else:
+            start = end - timedelta(hours=request.args.get('hours', 24, type=float))
+        g.rollup_window = (start, end)
+    return g.rollup_window
+
+def rollup_cache_key():
+    # With the default end=now the window moves even when no readings arrive
+    try:
+        return rollup_window()
+    except ValueError:
+        return None
+
+@app.route('/api/rollups', methods=['GET'])
+@RESPONSE_CACHE.cached(vary=rollup_cache_key)
+def get_rollups():
+    """
+    Get aggregated readings for long-range charts
+    Query params:
+    - hours: how far back to look (default: 24), or
+    - start / end: ISO timestamps (end defaults to now)
+    - points: maximum number of points to return (default: 500)
+    - resolution: force '1m', '1h' or '1d' (optional, otherwise picked from points)
+    - plant_id: filter by plant (optional, otherwise all plants are merged)
+    """
+    try:
+        start, end = rollup_window()
+    except ValueError as e:
+        return jsonify({'error': f'Invalid time range: {str(e)}'}), 400
+    
+    points = max(1, min(request.args.get('points', 500, type=int), config.ROLLUP_MAX_POINTS))
+    resolution = request.args.get('resolution', None)
+    if resolution is not None and resolution not in ('1m', '1h', '1d'):
+        return jsonify({'error': f'Unknown resolution: {resolution}'}), 400
+    
+    # Every shard must bucket at the same resolution for the merge
+    resolution = resolution or ROLLUPS.pick_resolution(start.timestamp(), end.timestamp(), points)
+    plant_id = request.args.get('plant_id', None)
+    parts = query_shards('rollups', plant_id, start.timestamp(), end.timestamp(), points,
+                         plant_id, resolution)
+    rollup = RollupStore.to_points(parts[0] if len(parts) == 1 else merge_buckets(parts), points)
+    return jsonify({
+        'resolution': resolution,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'count': len(rollup),
+        'points': rollup
+    }), 200
+
+@app.route('/api/drift', methods=['GET'])
+def get_drift():
+    """
+    How far recent readings are from the training distribution
+    Query params:
+    - plant_id: filter by plant (optional)
+    Per feature: PSI (< 0.1 stable, >= 0.25 drifted) and KS distance;
+    'fleet' covers all the plants returned
+    """
+    plant_id = request.args.get('plant_id', None)
+    report = DRIFT.evaluate(collect_drift(plant_id))
+    if plant_id and not report.get('plants'):
+        return jsonify({'error': 'No readings for this plant'}), 404
+    report['monitor'] = DRIFT.stats()
+    return jsonify(report), 200
+
+@app.route('/api/shadow', methods=['GET'])
+def get_shadow():
+    """How the shadow candidate models compare with the serving model on live readings"""
+    if SHADOW is None:
+        return jsonify({'enabled': False, 'candidates': {}}), 200
+    return jsonify(SHADOW.stats()), 200
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Internal counters: caches, dedup index, admission, drift, shadow, alert queue, buffers, shards"""
+    shards = SHARDS.broadcast('metrics')
+    with NEW_READING:
+        cursor, in_flight = LAST_SEQ, len(IN_FLIGHT)
+    return jsonify({
+        'readings': {'buffered': sum(s['buffered'] for s in shards), 'cursor': cursor,
+                     'in_flight_batches': in_flight},
+        'response_cache': RESPONSE_CACHE.stats(),
+        'dedup': DEDUP.stats(),
+        'admission': ADMISSION.stats(),
+        'drift': DRIFT.stats(),
+        'shadow': SHADOW.stats() if SHADOW is not None else None,
+        'alerts': ALERTS.stats() if ALERTS is not None else None,
+        'temporal_plants': sum(s['temporal_plants'] for s in shards),
+        'shards': shards
+    }), 200
+
 @app.route('/api/clear', methods=['POST'])
 def clear_data():
     """Clear all sensor readings (for testing)"""
-    SENSOR_READINGS.clear()
+    with NEW_READING:
+        upto = NEXT_SEQ - 1
+    SHARDS.broadcast('clear', upto)
+    with NEW_READING:
+        RESPONSE_CACHE.bump()
     return jsonify({'success': True, 'message': 'All readings cleared'}), 200
 
+@app.errorhandler(ShardError)
+def shard_error(error):
+    """A shard worker failed or died"""
+    print(f"✗ Shard error: {error}")
+    return jsonify({'error': f'Shard error: {str(error)}'}), 503
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -267,17 +1028,40 @@ if __name__ == '__main__':
     print("Plant Sensor Monitoring System - Flask Server")
     print("=" * 60)
     
-    # Load anomaly detection model
-    load_model()
+    serving = not DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+    if config.INGEST_SHARDS > 1:
+        # Each shard process loads its own copy of the model
+        if serving:
+            SHARDS = ShardPool(config.INGEST_SHARDS, run_shard, SHARD_OPS)
+            print(f"✓ Ingestion sharded across {config.INGEST_SHARDS} worker processes")
+    else:
+        # Load anomaly detection model
+        load_model()
+    DRIFT.bind(load_baseline())
     
     print(f"\n✓ Server starting on http://localhost:{PORT}")
     print(f"✓ Dashboard: http://localhost:{PORT}/")
     print(f"✓ API: http://localhost:{PORT}/api/sensor-data")
+    
+    # Start the binary listener once (the debug reloader runs this block twice)
+    if serving:
+        READING_LOG.compress_stale()
+        start_binary_server(BINARY_PORT)
+        print(f"✓ Binary ingest: tcp://0.0.0.0:{BINARY_PORT}")
+        DRIFT.start(collect_drift)
+        print(f"✓ Drift checks every {config.DRIFT_CHECK_INTERVAL}s")
+        if config.SHADOW_MODELS:
+            SHADOW = ShadowScorer()
+            print(f"✓ Shadow scoring: {', '.join(config.SHADOW_MODELS)}")
     print("\nPress Ctrl+C to stop the server\n")
     
     # Run the Flask app
-    app.run(
-        host='0.0.0.0',  # Listen on all network interfaces
-        port=PORT,
-        debug=True
-    )
+    try:
+        app.run(
+            host='0.0.0.0',  # Listen on all network interfaces
+            port=PORT,
+            debug=DEBUG
+        )
+    finally:
+        # Write out buffered readings before exiting
+        READING_LOG.close()
@@ -9,6 +9,11 @@ Modify these settings without editing the main scripts
 SPREADSHEET_NAME = "Agribot-AI-datasheet"  # Name of your Google Sheet
 CREDENTIALS_FILE = "credentials.json"        # Your Google credentials file
 
+# Local copy of the sheet, updated incrementally (see sheet_mirror.py)
+SHEET_MIRROR_FILE = "sheet_mirror.npz"
+SHEET_MIRROR_OVERLAP = 20              # Synced rows re-checked on every sync
+SHEET_MIRROR_FULL_SYNC = 24 * 3600     # Seconds between full re-downloads
+
 # ============================================================================
 # FEATURE CONFIGURATION
 # ============================================================================
@@ -98,15 +103,179 @@ ALERT_METHOD = 'console'       # 'console', 'email', 'webhook'
 # Email configuration (if ALERT_METHOD = 'email')
 EMAIL_CONFIG = {
     'sender': 'your_email@gmail.com',
-    'password': 'your_app_password',
+    'username': None,          # SMTP login name (None = the sender address)
+    'password': None,          # SMTP password, e.g. 'your_app_password' (None = no login, for a local relay)
     'recipients': ['admin@example.com'],
     'smtp_server': 'smtp.gmail.com',
-    'smtp_port': 587
+    'smtp_port': 587,
+    'use_tls': True            # STARTTLS (set False for a local test SMTP server)
 }
 
 # Webhook configuration (if ALERT_METHOD = 'webhook')
 WEBHOOK_URL = 'https://your-webhook-endpoint.com/anomaly'
 
+# Alert delivery (see alerts.py)
+ALERT_WORKERS = 2              # Background delivery threads
+ALERT_QUEUE_SIZE = 1000        # Alerts waiting for delivery (extra ones are dropped)
+ALERT_DEDUP_WINDOW = 300       # Seconds before the same plant/problem alerts again
+ALERT_RATE_LIMIT = 5           # Max alerts per plant...
+ALERT_RATE_PERIOD = 3600       # ...per this many seconds
+ALERT_MAX_RETRIES = 3          # Delivery attempts per alert
+ALERT_RETRY_DELAY = 2          # Seconds before the first retry (doubles each time)
+
+# ============================================================================
+# PLANT HEALTH IMAGE ANALYSIS
+# ============================================================================
+IMAGE_DIR = 'mock_images'      # Camera frames / labelled fixture images
+IMAGE_ANALYSIS_SIZE = 96       # Images are decoded and analysed at this size (px)
+IMAGE_CACHE_SIZE = 64          # Decoded images kept in memory
+IMAGE_WORKERS = 2              # Decode/feature worker threads
+IMAGE_BATCH_SIZE = 16          # Frames scored per batch
+
+# ============================================================================
+# LONG-RANGE CHART ROLLUPS
+# ============================================================================
+# Buckets kept per plant at each resolution
+ROLLUP_RETENTION = {
+    '1m': 2 * 24 * 60,   # 2 days of 1-minute buckets
+    '1h': 60 * 24,       # 60 days of 1-hour buckets
+    '1d': 2 * 365        # 2 years of 1-day buckets
+}
+ROLLUP_MAX_POINTS = 5000      # Upper bound on points per /api/rollups response
+
+# ============================================================================
+# TEMPORAL (STREAMING) ANOMALY DETECTION
+# ============================================================================
+TEMPORAL_ALPHA = 0.2           # EWMA weight of each new reading (fast average)
+TEMPORAL_SLOW_ALPHA = 0.001    # Baseline EWMA weight (~2 hour half-life at 10s sampling)
+TEMPORAL_Z_THRESHOLD = 4.0     # Flag readings this many std devs from the EWMA mean
+TEMPORAL_WARMUP = 10           # Readings per plant before temporal checks start
+
+# Smallest std dev used for z-scores (stops a steady sensor from flagging noise)
+TEMPORAL_MIN_STD = {'temperature': 0.3, 'humidity': 1.5, 'ph': 0.05}
+
+# Largest believable change per minute
+TEMPORAL_MAX_RATE = {'temperature': 5.0, 'humidity': 15.0, 'ph': 0.5}
+
+# Largest allowed gap between the fast average and the slow baseline
+TEMPORAL_DRIFT_LIMIT = {'temperature': 3.0, 'humidity': 10.0, 'ph': 0.2}
+
+# ============================================================================
+# SENSOR LOG (append-only JSONL, see sensor_log.py)
+# ============================================================================
+SENSOR_LOG_DIR = 'logs'
+SENSOR_LOG_MAX_BYTES = 16 * 1024 * 1024  # Rotate segments at 16 MB...
+SENSOR_LOG_MAX_AGE = 24 * 3600           # ...or after a day
+SENSOR_LOG_FSYNC_INTERVAL = 5            # Seconds between fsyncs
+
+# ============================================================================
+# MODEL SCORE CACHE (see score_cache.py)
+# ============================================================================
+SCORE_CACHE_ENABLED = True
+SCORE_CACHE_SIZE = 100000      # Grid cells kept in the LRU
+# Grid readings are memoized on: the precision sensors report (the Pi rounds to
+# 0.01 / 0.01 / 0.0001). Readings off the grid are scored directly, so a coarser
+# grid than the sensors' never changes a verdict, it only gets fewer hits.
+SCORE_CACHE_RESOLUTION = {'temperature': 0.01, 'humidity': 0.01, 'ph': 0.0001}
+# Optional dense table over the normal operating range, built at startup. Only
+# practical for sensors reporting on a coarse grid: with a resolution of
+# {'temperature': 0.1, 'humidity': 0.5, 'ph': 0.02}, ~4M cells / ~35 MB, a few minutes
+SCORE_CACHE_PREWARM = False
+SCORE_CACHE_ENVELOPE = {'temperature': (15.0, 40.0), 'humidity': (40.0, 95.0), 'ph': (5.0, 8.0)}
+
+# ============================================================================
+# PERCENTILE SKETCHES (see quantiles.py)
+# ============================================================================
+QUANTILE_COMPRESSION = 200     # t-digest size (~100 centroids); higher = more accurate
+# Sketch buckets kept per plant at each resolution (bounds /api/stats?window=)
+QUANTILE_RETENTION = {
+    '1m': 120,   # 2 hours of 1-minute sketches
+    '1h': 72,    # 3 days of 1-hour sketches
+    '1d': 365    # 1 year of 1-day sketches (longer windows are refused; window=all is all-time)
+}
+
+# ============================================================================
+# INGESTION SHARDS (see shards.py)
+# ============================================================================
+# Worker processes for app.py. Plants are spread over them by consistent
+# hashing of plant_id; each owns its plants' buffer, rollups, detectors and
+# model. 1 = everything runs in the server process.
+INGEST_SHARDS = 1
+
+# ============================================================================
+# INGESTION DEDUP (see dedup.py)
+# ============================================================================
+# Retried uploads are recognised by (plant_id, device timestamp)
+DEDUP_RECENT = 10000           # Recent readings whose original result is replayed
+DEDUP_BLOOM_CAPACITY = 1000000 # Older keys per Bloom generation (two are kept)...
+DEDUP_FALSE_POSITIVE = 1e-5    # ...and the chance a new reading is taken for a replay
+DEDUP_WAIT = 10                # Seconds a retry waits for its still-running original
+
+# ============================================================================
+# INGESTION ADMISSION CONTROL (see admission.py)
+# ============================================================================
+ADMISSION_GLOBAL_RATE = 500    # Readings per second accepted from all clients...
+ADMISSION_GLOBAL_BURST = 2000  # ...with bursts up to this many
+ADMISSION_CLIENT_RATE = 5      # Readings per second from one client (IP)...
+ADMISSION_CLIENT_BURST = 300   # ...with bursts up to this many (e.g. a backlog frame)
+ADMISSION_MAX_IN_FLIGHT = 16   # Requests processed at once
+ADMISSION_MAX_QUEUED = 64      # Requests waiting for a slot (more get 503)
+ADMISSION_QUEUE_TIMEOUT = 2    # Seconds a request may wait for a slot
+ADMISSION_MAX_CLIENTS = 10000  # Per-client buckets kept (least recent dropped)
+# Client IPs that skip the per-client bucket (global limits still apply), e.g.
+# the host running replay.py or a NAT gateway that a whole fleet shares.
+# A request costing more than the burst it is checked against gets 413.
+ADMISSION_EXEMPT_CLIENTS = ()
+
+# ============================================================================
+# INPUT DRIFT MONITOR (see drift.py)
+# ============================================================================
+# Live readings are compared with the distribution the model was trained on
+DRIFT_BASELINE_FILE = "drift_baseline.npz"  # Training histogram (python drift.py baseline)
+DRIFT_BINS = 16                # Histogram bins per feature within +/- DRIFT_RANGE...
+DRIFT_RANGE = 4.0              # ...standard deviations (plus an open bin on each side)
+DRIFT_HALF_LIFE = 6 * 3600     # Seconds until a reading counts half as much
+DRIFT_CHECK_INTERVAL = 300     # Seconds between drift checks
+DRIFT_MIN_COUNT = 200          # Recent readings needed before a plant is judged
+DRIFT_PSI_WARN = 0.1           # PSI from here: moderate shift
+DRIFT_PSI_ALERT = 0.25         # PSI from here: drifted
+DRIFT_MAX_PLANTS = 10000       # Per-plant histograms kept (least recent dropped)
+# When the whole fleet drifts, the live readings of the last DRIFT_RETRAIN_WINDOW
+# (from the sensor log) plus the training CSV are written to DRIFT_RETRAIN_DATA
+# and DRIFT_RETRAIN_COMMAND runs with that CSV's path appended. Fewer than
+# DRIFT_MIN_COUNT live readings: alert only.
+DRIFT_RETRAIN_COMMAND = None   # e.g. ['python', 'anomaly_detection_model.py']
+DRIFT_RETRAIN_COOLDOWN = 24 * 3600  # Minimum seconds between retrains
+DRIFT_RETRAIN_WINDOW = 7 * 24 * 3600  # Seconds of live readings to retrain on
+DRIFT_RETRAIN_DATA = "drift_retrain.csv"
+DRIFT_TRAINING_CSV = "lettuce_dataset_updated.csv"
+
+# ============================================================================
+# SHADOW MODELS (see shadow.py)
+# ============================================================================
+# Candidate models scored on live traffic next to the serving model, off the
+# request path. name -> exported .npz, model .pkl (uses SCALER_FILE), or a
+# (model .pkl, scaler .pkl) pair. Empty = shadow scoring off.
+SHADOW_MODELS = {}             # e.g. {'retrained': ('candidate_model.pkl', 'candidate_scaler.pkl')}
+SHADOW_WORKERS = 1             # Scoring processes
+SHADOW_QUEUE_SIZE = 200        # Batches waiting to be scored (further ones are dropped)
+SHADOW_MAX_ROWS = 5000         # Readings scored together when the queue has backed up
+
+# ============================================================================
+# SYNTHETIC DATA (see synthetic.py)
+# ============================================================================
+# Levels, trends and day-to-day variation are fitted from the training CSV;
+# it has one reading per day, so the within-day shape is set here
+SYNTH_INTERVAL = 60            # Seconds between readings of a plant
+SYNTH_DIURNAL = {'temperature': 2.0, 'humidity': -5.0, 'ph': 0.0}  # Day/night half-swing (negative = lowest at the peak hour)
+SYNTH_PEAK_HOUR = 15           # Warmest hour of the day
+SYNTH_NOISE = {'temperature': 0.1, 'humidity': 0.5, 'ph': 0.02}    # Sensor noise (sd)
+SYNTH_ANOMALIES = {'spike': 1e-4, 'drift': 2e-6, 'stuck': 2e-6}    # Chance per reading that one starts
+SYNTH_SPIKE_SIGMA = 6.0        # Spike size in training standard deviations
+SYNTH_DRIFT_SIGMA = 4.0        # Offset a drift reaches by the end of its episode (sd)
+SYNTH_EPISODE = (1800, 6 * 3600)  # Drift / stuck-sensor episode length range (seconds)
+SYNTH_CHUNK_ROWS = 1000000     # Readings per generated chunk
+
 # ============================================================================
 # ADVANCED OPTIONS
 # ============================================================================
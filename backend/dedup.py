@@ -0,0 +1,152 @@
+"""
+Ingestion Dedup Index
+Remembers which readings were already stored so a retried upload (the
+server stored it but the response was lost) is not stored twice:
+- An exact LRU of recent keys keeps each reading's original result, so a
+  replay gets the same answer without being scored again
+- Older keys live on in two rotating Bloom filters (fixed size), which can
+  only say "seen before" - with a small false-positive rate
+- Keys still being ingested are marked pending; a concurrent retry waits
+  for the original's result instead of racing it
+Memory is fixed by config.DEDUP_* whatever the uptime; every check is O(1).
+"""
+
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+
+import config
+
+_PENDING = object()
+
+
+def reading_key(plant_id, timestamp):
+    """Dedup key of a reading: its plant and device-side measurement time"""
+    return f"{plant_id}|{float(timestamp)!r}"
+
+
+class BloomFilter:
+    """Fixed-size bit array with k hash positions per key (double hashing)"""
+
+    def __init__(self, capacity, false_positive_rate):
+        self.size = max(64, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, key):
+        bits = self.bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class DedupIndex:
+    """Bounded record of stored reading keys (see module docstring)"""
+
+    def __init__(self, recent=config.DEDUP_RECENT,
+                 bloom_capacity=config.DEDUP_BLOOM_CAPACITY,
+                 false_positive_rate=config.DEDUP_FALSE_POSITIVE):
+        self.recent = recent
+        self.bloom_capacity = bloom_capacity
+        self.false_positive_rate = false_positive_rate
+        self._results = OrderedDict()  # key -> original result, or _PENDING
+        self._current = BloomFilter(bloom_capacity, false_positive_rate)
+        self._previous = None
+        self._cond = threading.Condition()
+        self.counts = {'checked': 0, 'replayed': 0, 'seen_before': 0, 'waited': 0}
+
+    def claim(self, keys):
+        """
+        Sort a batch of keys (None = no key, always new).
+        Returns one entry per key: None if the reading is new (the caller now
+        owns it and must complete() or release() it), the original result for
+        a replay, or True if it was stored too long ago to have a result.
+        Keys another request is still ingesting are waited for.
+        """
+        with self._cond:
+            verdicts = []
+            waiting = []
+            claimed = set()
+            for i, key in enumerate(keys):
+                if key is None:
+                    verdicts.append(None)
+                    continue
+                self.counts['checked'] += 1
+                result = self._results.get(key)
+                if key in claimed:
+                    # Repeated within this batch
+                    self.counts['seen_before'] += 1
+                    verdicts.append(True)
+                elif result is _PENDING:
+                    waiting.append(i)
+                    verdicts.append(None)
+                elif result is not None:
+                    self._results.move_to_end(key)
+                    self.counts['replayed'] += 1
+                    verdicts.append(result)
+                elif key in self._current or (self._previous is not None and key in self._previous):
+                    self.counts['seen_before'] += 1
+                    verdicts.append(True)
+                else:
+                    self._results[key] = _PENDING
+                    claimed.add(key)
+                    verdicts.append(None)
+
+            for i in waiting:
+                key = keys[i]
+                self.counts['waited'] += 1
+                self._cond.wait_for(lambda: self._results.get(key) is not _PENDING,
+                                    timeout=config.DEDUP_WAIT)
+                result = self._results.get(key)
+                if result is None:
+                    # The original failed: this retry takes over
+                    self._results[key] = _PENDING
+                elif result is _PENDING:
+                    # Original still running after the wait: answer as seen
+                    verdicts[i] = True
+                else:
+                    self.counts['replayed'] += 1
+                    verdicts[i] = result
+            return verdicts
+
+    def complete(self, key, result):
+        """Record the result of a reading this caller claimed"""
+        with self._cond:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            self._current.add(key)
+            if self._current.count >= self.bloom_capacity:
+                self._previous = self._current
+                self._current = BloomFilter(self.bloom_capacity, self.false_positive_rate)
+            while len(self._results) > self.recent:
+                oldest, value = next(iter(self._results.items()))
+                if value is _PENDING:
+                    break
+                del self._results[oldest]
+            self._cond.notify_all()
+
+    def release(self, key):
+        """Give up a claim (ingestion failed), letting a retry store the reading"""
+        with self._cond:
+            if self._results.get(key) is _PENDING:
+                del self._results[key]
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return dict(self.counts, recent=len(self._results),
+                        bloom_fill=round(self._current.count / self.bloom_capacity, 3),
+                        bloom_bytes=len(self._current.bits) * 2)
@@ -0,0 +1,458 @@
+"""
+Input Drift Monitor
+Checks that live sensor readings still look like the data the anomaly model
+was trained on, so a seasonal shift shows up as drift instead of as a
+silently ballooning anomaly rate:
+- Each feature is binned on fixed edges in the scaler's standardized units
+  (z = (x - mean) / scale), giving a small histogram per plant
+- Counts decay with a DRIFT_HALF_LIFE, so the histograms describe recent
+  readings while memory stays fixed (DRIFT_MAX_PLANTS histograms at most)
+- PSI and a binned KS distance are computed against the training histogram
+  (drift_baseline.npz; the scaler's normal approximation if it is missing)
+- When the fleet as a whole drifts, DRIFT_RETRAIN_COMMAND runs (at most once
+  per DRIFT_RETRAIN_COOLDOWN) on a CSV of recent live readings from the
+  sensor log plus the training rows, so the new model learns the shift
+- Rebinding to a new model keeps the live histograms (re-binned when the
+  scaler moved), so PSI/KS history survives a reload
+
+Usage:
+    python drift.py baseline [lettuce_dataset_updated.csv]   # training histogram
+    python drift.py show
+"""
+
+import csv
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+import config
+from forest_scorer import FEATURE_NAMES
+
+_EPSILON = 1e-4  # floor on bin shares, so empty bins don't make PSI infinite
+
+
+def bin_edges(bins=config.DRIFT_BINS, spread=config.DRIFT_RANGE):
+    """Inner bin edges in standard deviations; values beyond them fall in two open bins"""
+    return np.linspace(-spread, spread, bins + 1)
+
+
+class DriftBaseline:
+    """Training distribution: per-feature bin shares on bin_edges() around the scaler's mean"""
+
+    def __init__(self, mean, scale, probs, source):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.probs = np.asarray(probs, dtype=np.float64)  # (features, bins)
+        self.source = source
+        self.edges = bin_edges(self.probs.shape[1] - 2)
+
+    @classmethod
+    def from_data(cls, features, mean, scale):
+        """Histogram of the training rows (NaN rows are skipped)"""
+        baseline = cls(mean, scale, np.zeros((len(mean), config.DRIFT_BINS + 2)), 'training data')
+        features = np.asarray(features, dtype=np.float64)
+        features = features[np.isfinite(features).all(axis=1)]
+        counts = baseline.histogram(features)
+        baseline.probs = counts / max(len(features), 1)
+        return baseline
+
+    @classmethod
+    def from_scaler(cls, mean, scale):
+        """Normal distribution with the scaler's mean and variance"""
+        edges = np.concatenate([[-np.inf], bin_edges(), [np.inf]])
+        cdf = np.array([0.5 * (1 + math.erf(z / math.sqrt(2))) for z in edges])
+        return cls(mean, scale, np.tile(np.diff(cdf), (len(mean), 1)), 'scaler (normal approximation)')
+
+    def bins(self, features):
+        """(N, features) bin index of each value"""
+        z = (np.asarray(features, dtype=np.float64) - self.mean) / self.scale
+        return np.searchsorted(self.edges, z, side='right')
+
+    def same_bins(self, other):
+        """True when both put every value in the same bin"""
+        return (self.probs.shape == other.probs.shape and np.array_equal(self.mean, other.mean)
+                and np.array_equal(self.scale, other.scale))
+
+    def rebin(self, counts, other):
+        """
+        (features, bins) counts made against `other`, moved to this baseline's
+        bins: each old bin's weight goes to the new bin of its centre
+        """
+        if self.same_bins(other):
+            return counts.copy()
+        width = other.edges[1] - other.edges[0]
+        centres = np.concatenate([[other.edges[0] - width / 2],
+                                  (other.edges[:-1] + other.edges[1:]) / 2,
+                                  [other.edges[-1] + width / 2]])
+        raw = other.mean[:, None] + centres[None, :] * other.scale[:, None]  # (features, old bins)
+        moved = np.zeros((len(counts), self.probs.shape[1]))
+        for j, (row, column) in enumerate(zip(counts, self.bins(raw.T).T)):
+            np.add.at(moved[j], column, row)
+        return moved
+
+    def histogram(self, features):
+        """(features, bins) counts of an (N, features) array"""
+        nbins = self.probs.shape[1]
+        return np.stack([np.bincount(column, minlength=nbins)
+                         for column in self.bins(features).T]).astype(np.float64)
+
+    def save(self, path=config.DRIFT_BASELINE_FILE):
+        np.savez(path, mean=self.mean, scale=self.scale, probs=self.probs,
+                 source=np.array(self.source))
+
+    @classmethod
+    def load(cls, path=config.DRIFT_BASELINE_FILE):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['mean'], data['scale'], data['probs'], str(data['source']))
+
+
+def load_baseline(path=config.DRIFT_BASELINE_FILE):
+    """The saved training histogram, else the scaler's normal approximation; None without either"""
+    if os.path.exists(path):
+        try:
+            return DriftBaseline.load(path)
+        except Exception as e:
+            print(f"⚠ Ignoring unreadable drift baseline {path}: {e}")
+    try:
+        from forest_scorer import load_scorer
+        scorer = load_scorer(config.MODEL_FILE, config.SCALER_FILE)
+    except Exception as e:
+        print(f"⚠ Drift monitor disabled, no scaler to compare against: {e}")
+        return None
+    if scorer.mean is None:
+        print("⚠ Drift monitor disabled, the model has no scaler")
+        return None
+    print(f"⚠ No {path}, drift is measured against a normal approximation "
+          f"(run 'python drift.py baseline')")
+    return DriftBaseline.from_scaler(scorer.mean, scorer.scale)
+
+
+def drift_scores(counts, baseline):
+    """
+    PSI and KS distance per feature of a (features, bins) count array.
+    Returns: {'count': effective readings, 'features': {name: {'psi', 'ks'}}}
+    """
+    total = counts.sum(axis=1, keepdims=True)
+    live = np.divide(counts, total, out=np.zeros_like(counts), where=total > 0)
+    expected = baseline.probs
+    psi = ((np.maximum(live, _EPSILON) - np.maximum(expected, _EPSILON))
+           * np.log(np.maximum(live, _EPSILON) / np.maximum(expected, _EPSILON))).sum(axis=1)
+    ks = np.abs(np.cumsum(live, axis=1) - np.cumsum(expected, axis=1)).max(axis=1)
+    return {
+        'count': round(float(total.max()), 1) if total.size else 0.0,
+        'features': {name: {'psi': round(float(p), 4), 'ks': round(float(k), 4)}
+                     for name, p, k in zip(FEATURE_NAMES, psi, ks)}
+    }
+
+
+class FeatureHistograms:
+    """Decaying per-plant histograms of live readings (kept where the readings are ingested)"""
+
+    def __init__(self, half_life=config.DRIFT_HALF_LIFE, max_plants=config.DRIFT_MAX_PLANTS):
+        self.half_life = half_life
+        self.max_plants = max_plants
+        self.baseline = None
+        self._plants = OrderedDict()  # plant_id -> [counts, updated], least recent first
+        self._lock = threading.Lock()
+
+    def bind(self, baseline):
+        """
+        Bin against `baseline` (None disables and drops the counts). Existing
+        counts are kept, re-binned if the new baseline's scaler differs.
+        """
+        with self._lock:
+            previous, self.baseline = self.baseline, baseline
+            if baseline is None:
+                self._plants.clear()
+            elif previous is not None:
+                for entry in self._plants.values():
+                    entry[0] = baseline.rebin(entry[0], previous)
+
+    def _decayed(self, entry, now):
+        counts, updated = entry
+        if now > updated:
+            counts *= 0.5 ** ((now - updated) / self.half_life)
+            entry[1] = now
+        return counts
+
+    def add(self, features, plant_ids, now=None):
+        """Fold an (N, features) batch of raw readings in; rows with NaN are skipped"""
+        baseline = self.baseline
+        if baseline is None or not len(plant_ids):
+            return
+        now = now if now is not None else time.time()
+        features = np.asarray(features, dtype=np.float64)
+        valid = np.isfinite(features).all(axis=1)
+        bins = baseline.bins(features)
+        nbins = baseline.probs.shape[1]
+        plant_ids = np.asarray(plant_ids, dtype=object)
+        with self._lock:
+            for plant in set(plant_ids.tolist()):
+                rows = bins[(plant_ids == plant) & valid]
+                if not len(rows):
+                    continue
+                entry = self._plants.get(plant)
+                if entry is None:
+                    entry = self._plants[plant] = [np.zeros(baseline.probs.shape), now]
+                    if len(self._plants) > self.max_plants:
+                        self._plants.popitem(last=False)
+                else:
+                    self._plants.move_to_end(plant)
+                counts = self._decayed(entry, now)
+                for j, column in enumerate(rows.T):
+                    counts[j] += np.bincount(column, minlength=nbins)
+
+    def counts(self, plant_id=None, now=None):
+        """{plant_id: (features, bins) counts decayed to now}, for one plant or all"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            plants = [plant_id] if plant_id else list(self._plants)
+            return {p: self._decayed(self._plants[p], now).copy()
+                    for p in plants if p in self._plants}
+
+    def plant_count(self):
+        return len(self._plants)
+
+    def clear(self):
+        with self._lock:
+            self._plants.clear()
+
+
+class DriftMonitor:
+    """
+    Scores histograms against the baseline, remembers which plants are
+    drifted and triggers retraining (runs in the front process)
+    """
+
+    def __init__(self, baseline=None, psi_warn=config.DRIFT_PSI_WARN,
+                 psi_alert=config.DRIFT_PSI_ALERT, min_count=config.DRIFT_MIN_COUNT,
+                 retrain_command=config.DRIFT_RETRAIN_COMMAND,
+                 retrain_cooldown=config.DRIFT_RETRAIN_COOLDOWN,
+                 retrain_window=config.DRIFT_RETRAIN_WINDOW,
+                 retrain_data=config.DRIFT_RETRAIN_DATA,
+                 training_csv=config.DRIFT_TRAINING_CSV,
+                 log_dir=config.SENSOR_LOG_DIR, on_retrained=None):
+        self.baseline = baseline
+        self.psi_warn = psi_warn
+        self.psi_alert = psi_alert
+        self.min_count = min_count
+        self.retrain_command = retrain_command
+        self.retrain_cooldown = retrain_cooldown
+        self.retrain_window = retrain_window
+        self.retrain_data = retrain_data
+        self.training_csv = training_csv
+        self.log_dir = log_dir
+        self.on_retrained = on_retrained
+        self.drifted = set()      # plants whose last check was 'drift'
+        self.last_check = None
+        self.fleet = None         # fleet-wide result of the last check
+        self.checks = 0
+        self.retrains = 0
+        self.last_retrain = None
+        self._retraining = None   # thread running the retrain command
+        self._lock = threading.Lock()
+
+    def bind(self, baseline):
+        """Judge against `baseline`; drift state carries over until the next check"""
+        with self._lock:
+            self.baseline = baseline
+            if baseline is None:
+                self.drifted.clear()
+                self.fleet = None
+
+    def _judge(self, counts):
+        result = drift_scores(counts, self.baseline)
+        if result['count'] < self.min_count:
+            result['status'] = 'insufficient data'
+        else:
+            worst = max(f['psi'] for f in result['features'].values())
+            result['status'] = ('drift' if worst >= self.psi_alert else
+                                'warning' if worst >= self.psi_warn else 'ok')
+        return result
+
+    def evaluate(self, histograms):
+        """
+        Drift of each plant and of all of them together.
+        histograms: {plant_id: counts} as returned by FeatureHistograms.counts()
+        """
+        if self.baseline is None:
+            return {'enabled': False}
+        plants = {plant: self._judge(counts) for plant, counts in histograms.items()}
+        fleet = (self._judge(sum(histograms.values())) if histograms
+                 else {'count': 0.0, 'features': {}, 'status': 'insufficient data'})
+        return {
+            'enabled': True,
+            'baseline': self.baseline.source,
+            'thresholds': {'psi_warning': self.psi_warn, 'psi_drift': self.psi_alert,
+                           'min_count': self.min_count},
+            'fleet': fleet,
+            'plants': plants
+        }
+
+    def check(self, histograms):
+        """Periodic check: evaluate, log plants that started or stopped drifting, maybe retrain"""
+        report = self.evaluate(histograms)
+        if not report['enabled']:
+            return report
+        now_drifted = {p for p, r in report['plants'].items() if r['status'] == 'drift'}
+        with self._lock:
+            started, stopped = now_drifted - self.drifted, self.drifted - now_drifted
+            # Plants that dropped out of the histograms keep no drift state
+            self.drifted = now_drifted
+            self.fleet = report['fleet']
+            self.last_check = time.time()
+            self.checks += 1
+        for plant in sorted(started):
+            features = report['plants'][plant]['features']
+            name = max(features, key=lambda f: features[f]['psi'])
+            print(f"⚠ Input drift on {plant}: {name} PSI {features[name]['psi']:.2f}")
+        for plant in sorted(stopped):
+            print(f"✓ {plant} back within the training distribution")
+        if report['fleet']['status'] == 'drift':
+            self.request_retrain()
+        return report
+
+    def request_retrain(self):
+        """Run DRIFT_RETRAIN_COMMAND in the background unless one ran recently; returns True if started"""
+        with self._lock:
+            if (self._retraining is not None and self._retraining.is_alive()) or (
+                    self.last_retrain is not None
+                    and time.time() - self.last_retrain < self.retrain_cooldown):
+                return False
+            self.last_retrain = time.time()
+            if not self.retrain_command:
+                print("⚠ Fleet-wide input drift: retraining recommended "
+                      "(set DRIFT_RETRAIN_COMMAND to automate)")
+                return False
+            self.retrains += 1
+            self._retraining = threading.Thread(target=self._retrain, name='drift-retrain', daemon=True)
+            self._retraining.start()
+            return True
+
+    def _retrain(self):
+        live = write_retrain_data(self.retrain_data, time.time() - self.retrain_window,
+                                  self.training_csv, log_dir=self.log_dir)
+        if live < self.min_count:
+            print(f"⚠ Fleet-wide input drift: only {live} live readings logged, "
+                  f"not retraining (retraining recommended once more are recorded)")
+            return
+        command = list(self.retrain_command) + [self.retrain_data]
+        print(f"⚠ Fleet-wide input drift: retraining on {live} live readings "
+              f"plus the training data ({' '.join(command)})")
+        try:
+            result = subprocess.run(command, capture_output=True, text=True)
+        except OSError as e:
+            print(f"✗ Retrain command failed to start: {e}")
+            return
+        if result.returncode != 0:
+            print(f"✗ Retrain failed (exit {result.returncode}): {result.stderr.strip()[-500:]}")
+            return
+        print("✓ Retrain finished")
+        if self.on_retrained is not None:
+            self.on_retrained()
+
+    def start(self, collect, interval=config.DRIFT_CHECK_INTERVAL):
+        """Check `collect()`'s histograms every `interval` seconds in a daemon thread"""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.check(collect())
+                except Exception as e:
+                    print(f"✗ Drift check failed: {e}")
+        thread = threading.Thread(target=run, name='drift-monitor', daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.baseline is not None,
+                'checks': self.checks,
+                'last_check': self.last_check,
+                'fleet_status': self.fleet['status'] if self.fleet else None,
+                'drifted_plants': sorted(self.drifted),
+                'retrains': self.retrains,
+                'last_retrain': self.last_retrain
+            }
+
+
+def _csv_features(path, encoding='latin-1'):
+    """Feature rows of a training CSV (unparsable values become NaN)"""
+    with open(path, encoding=encoding, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns = [header.index(name) for name in config.FEATURE_COLUMNS]
+        rows = []
+        for row in reader:
+            values = []
+            for i in columns:
+                try:
+                    values.append(float(row[i]))
+                except (ValueError, IndexError):
+                    values.append(np.nan)
+            rows.append(values)
+    return np.array(rows, dtype=np.float64).reshape(-1, len(columns))
+
+
+def write_retrain_data(path, since, training_csv=config.DRIFT_TRAINING_CSV, prefix='readings',
+                       log_dir=config.SENSOR_LOG_DIR):
+    """
+    Training CSV for a drift retrain: the readings logged since `since`
+    (unix time) followed by the training rows. Returns the live row count.
+    """
+    from sensor_log import read_log
+    live = []
+    for record in read_log(since=datetime.fromtimestamp(since), prefix=prefix, log_dir=log_dir):
+        try:
+            if datetime.fromisoformat(record['timestamp']).timestamp() < since:
+                continue
+            live.append([float(record['temperature']), float(record['humidity']),
+                         float(record['ph'])])
+        except (KeyError, TypeError, ValueError):
+            continue
+    training = _csv_features(training_csv) if training_csv and os.path.exists(training_csv) else []
+    with open(path, 'w', encoding='latin-1', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(config.FEATURE_COLUMNS)
+        writer.writerows(live)
+        writer.writerows(row for row in np.asarray(training).tolist()
+                         if all(math.isfinite(v) for v in row))
+    return len(live)
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('baseline', 'show'):
+        print(__doc__)
+        sys.exit(1)
+    if sys.argv[1] == 'baseline':
+        from forest_scorer import load_scorer
+        scorer = load_scorer(config.MODEL_FILE, config.SCALER_FILE)
+        path = sys.argv[2] if len(sys.argv) > 2 else 'lettuce_dataset_updated.csv'
+        features = _csv_features(path)
+        baseline = DriftBaseline.from_data(features, scorer.mean, scorer.scale)
+        baseline.save()
+        print(f"✓ Drift baseline from {len(features)} rows of {path} saved to {config.DRIFT_BASELINE_FILE}")
+        return
+    baseline = load_baseline()
+    if baseline is None:
+        sys.exit(1)
+    print(f"Baseline: {baseline.source}")
+    labels = (['< ' + f"{baseline.edges[0]:g}σ"] +
+              [f"{a:g}..{b:g}σ" for a, b in zip(baseline.edges[:-1], baseline.edges[1:])] +
+              ['> ' + f"{baseline.edges[-1]:g}σ"])
+    for name, mean, scale, probs in zip(FEATURE_NAMES, baseline.mean, baseline.scale, baseline.probs):
+        print(f"\n{name} (mean {mean:.2f}, sd {scale:.2f})")
+        for label, p in zip(labels, probs):
+            print(f"  {label:>12} {p:6.1%} {'#' * round(p * 100)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,75 +1,149 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+"""
+Agribot Dashboard API (FastAPI, port 8000)
+Startup only does cheap, local work; the anomaly model, Google Sheets and the
+image classifier initialise in background threads once the server is
+accepting connections. GET /ready reports their progress and startup timing.
+"""
+
+from startup import StartupReport
+
+STARTUP = StartupReport()
+
+with STARTUP.phase('import fastapi'):
+    from contextlib import asynccontextmanager
+    from fastapi import Depends, FastAPI, HTTPException, Request
+    from fastapi.concurrency import run_in_threadpool
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse
+    from fastapi.staticfiles import StaticFiles
+
 import random
 import time
 import os
-import gspread
-import joblib
-import numpy as np
-from oauth2client.service_account import ServiceAccountCredentials
-
-app = FastAPI()
-
-# 1. SECURITY: ENABLE CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# 2. LOAD LAWRENCE'S AI (Anomaly Detection Model)
+import config
+from admission import AdmissionController, Rejected
+from sensor_log import SensorLogWriter
+
+# Set by the background initialisers below (None until ready, or if unavailable)
+forest = None             # Anomaly model (NumPy scorer)
+sheet = None              # Google Sheet for uploads
+health_classifier = None  # Plant health image classifier
+
+@asynccontextmanager
+async def lifespan(app):
+    # Runs as the server starts; the initialisers must not delay accepting connections
+    sensor_log.compress_stale()
+    STARTUP.start_background('anomaly_model', load_anomaly_model)
+    STARTUP.start_background('google_sheets', connect_sheets)
+    STARTUP.start_background('image_classifier', load_image_classifier)
+    # 'serving' is marked once the socket is listening (DashboardServer below)
+    yield
+    # Shutdown: write out buffered readings
+    sensor_log.close()
+
+with STARTUP.phase('app setup'):
+    app = FastAPI(lifespan=lifespan)
+
+    # 1. SECURITY: ENABLE CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # 2. STATIC FILES (For Lettuce Images)
+    if not os.path.exists("mock_images"):
+        os.makedirs("mock_images")
+    app.mount("/images", StaticFiles(directory="mock_images"), name="images")
+
+    # 3. SENSOR LOG (append-only JSONL segments in logs/)
+    sensor_log = SensorLogWriter("sensor_history")
+
+STARTUP.mark('module loaded')
+
+# 4. LOAD LAWRENCE'S AI (Anomaly Detection Model)
 # These files must be in the same folder as main.py
-try:
-    model = joblib.load('anomaly_model.pkl')
-    scaler = joblib.load('anomaly_scaler.pkl')
+def load_anomaly_model():
+    """Prefer the NumPy-only export (python forest_scorer.py export): no sklearn import"""
+    global forest
+    from forest_scorer import load_scorer
+    forest = load_scorer(config.MODEL_FILE, config.SCALER_FILE)
     print("✓ SUCCESS: Real ML Anomaly Model Loaded")
-except Exception as e:
-    print(f"⚠ WARNING: Model files not found. Using simulation mode. Error: {e}")
-    model, scaler = None, None
 
-# 3. GOOGLE SHEETS SETUP
+# 5. GOOGLE SHEETS SETUP
 # Requires 'credentials.json' in the backend folder
-sheet = None
-try:
+def connect_sheets():
+    """Authorize and open the sheet; slow or failing without network, so never on the startup path"""
+    global sheet
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
     scope = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
+    creds = ServiceAccountCredentials.from_json_keyfile_name(config.CREDENTIALS_FILE, scope)
     client = gspread.authorize(creds)
     # Ensure the Sheet name matches exactly
-    spreadsheet = client.open("Agribot-AI-datasheet") 
-    sheet = spreadsheet.sheet1
+    sheet = client.open(config.SPREADSHEET_NAME).sheet1
     print("✓ SUCCESS: Google Sheets Connected")
-except Exception as e:
-    print(f"⚠ WARNING: Google Sheets not connected. Check credentials.json. Error: {e}")
 
-# 4. STATIC FILES (For Lettuce Images)
-if not os.path.exists("mock_images"):
-    os.makedirs("mock_images")
-app.mount("/images", StaticFiles(directory="mock_images"), name="images")
+# 6. PLANT HEALTH IMAGE CLASSIFIER (fitted on the labelled mock images)
+def load_image_classifier():
+    global health_classifier
+    from plant_health import PlantHealthClassifier
+    health_classifier = PlantHealthClassifier.from_fixtures("mock_images")
+    print("✓ SUCCESS: Plant Health Image Classifier Ready")
 
-# 5. THE AI LOGIC (Integrated from Lawrence's anomaly_utility.py)
+# 7. THE AI LOGIC (Integrated from Lawrence's anomaly_utility.py)
 def analyze_environment(temp, hum, ph):
-    if model and scaler:
-        # Prepare data for Lawrence's Isolation Forest model
-        X = np.array([[temp, hum, ph]])
-        X_normalized = scaler.transform(X)
-        prediction = model.predict(X_normalized)[0] 
-        
-        # 1 = Normal, -1 = Anomaly
-        if prediction == -1:
+    if forest is not None:
+        # Lawrence's Isolation Forest: 1 = Normal, -1 = Anomaly
+        if forest.score_one(temp, hum, ph)['is_anomaly']:
             return "Anomaly Detected", "Warning: Environmental levels are abnormal!"
         return "Normal", "System conditions are stable."
     
-    # Fallback if no model is present
+    # Fallback while the model loads or if no model is present
+    if STARTUP.state('anomaly_model') == 'pending':
+        return "Simulating", "AI model is still loading."
     return "Simulating", "Add model files to enable real AI."
 
-@app.get("/system-data")
+@app.get("/ready")
+async def get_ready():
+    """Readiness: 200 once every background component is ready or has failed (degraded)"""
+    report = STARTUP.as_dict()
+    return JSONResponse(report, status_code=200 if report['ready'] else 503)
+
+# Token buckets and in-flight limit for /system-data (see admission.py)
+ADMISSION = AdmissionController()
+
+def admitted(request: Request):
+    """Admit a request or answer 429/503 with Retry-After; never blocks the event loop"""
+    try:
+        ADMISSION.admit(request.client.host if request.client else 'unknown', wait=False)
+    except Rejected as e:
+        raise HTTPException(status_code=e.status, detail=e.reason,
+                            headers={'Retry-After': str(e.retry_after)} if e.retry_after else None)
+    try:
+        yield
+    finally:
+        ADMISSION.release()
+
+def simulated_readings():
+    """One synthetic plant, a reading per request (see synthetic.py); uniform noise without the CSV"""
+    try:
+        from synthetic import SyntheticGenerator
+        generator = SyntheticGenerator(plants=1, start=time.time(), seed=None)
+    except (OSError, ValueError) as e:
+        print(f"⚠ Synthetic readings unavailable ({e}), using uniform noise")
+        while True:
+            yield random.uniform(20.0, 35.0), random.uniform(50.0, 90.0), random.uniform(5.0, 8.0)
+    for chunk in generator.chunks():
+        yield from chunk['values'].tolist()
+
+SIMULATED = simulated_readings()
+
+@app.get("/system-data", dependencies=[Depends(admitted)])
 async def get_system_data():
     # Simulate current readings
-    temp = round(random.uniform(20.0, 35.0), 1)
-    hum = round(random.uniform(50.0, 90.0), 1)
-    ph = round(random.uniform(5.0, 8.0), 1)
+    temp, hum, ph = (round(value, 1) for value in next(SIMULATED))
     
     # Run Real AI Analysis
     status, advice = analyze_environment(temp, hum, ph)
@@ -78,16 +152,30 @@ async def get_system_data():
     images = os.listdir("mock_images")
     selected_img = random.choice(images) if images else ""
     
+    # Run the image classifier on the frame; a visible leaf problem
+    # overrides a "normal" environment verdict. Decoding and featurizing is
+    # CPU-bound, so it runs in the threadpool rather than on the event loop
+    health, confidence = None, None
+    if health_classifier and selected_img:
+        result = await run_in_threadpool(
+            health_classifier.classify, os.path.join("mock_images", selected_img))
+        health, confidence = result["status"], result["confidence"]
+        if health != "Healthy" and status != "Anomaly Detected":
+            status, advice = health, result["advice"]
+    
     payload = {
         "sensors": {"temp": temp, "ph": ph, "humidity": hum},
-        "ai_analysis": {"status": status, "image": selected_img, "advice": advice},
+        "ai_analysis": {"status": status, "image": selected_img, "advice": advice,
+                        "plant_health": health, "confidence": confidence},
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
     }
 
-    # Upload to Google Sheets if connected
+    sensor_log.write(payload)
+
+    # Upload to Google Sheets if connected (a blocking HTTP call, so off the event loop too)
     if sheet:
         try:
-            sheet.append_row([payload["timestamp"], temp, hum, ph, status])
+            await run_in_threadpool(sheet.append_row, [payload["timestamp"], temp, hum, ph, status])
         except Exception as e:
             print(f"Upload failed: {e}")
             
@@ -95,4 +183,14 @@ async def get_system_data():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
+
+    class DashboardServer(uvicorn.Server):
+        """Marks 'serving' when the socket accepts connections (after the lifespan startup)"""
+
+        async def startup(self, sockets=None):
+            await super().startup(sockets=sockets)
+            if self.started:
+                STARTUP.mark('serving')
+                STARTUP.print_report()
+
+    DashboardServer(uvicorn.Config(app, host="127.0.0.1", port=8000)).run()
\ No newline at end of file
@@ -0,0 +1,244 @@
+"""
+Streaming Percentiles
+Mergeable t-digest sketches per plant and metric, kept in time buckets at
+1-minute, 1-hour and 1-day resolution plus one all-time sketch, so
+percentiles over any window cost the same however long the history is
+"""
+
+import math
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+import config
+from rollups import METRICS, RESOLUTIONS
+
+
+class TDigest:
+    """
+    Merging t-digest (Dunning & Ertl) with the arcsine scale function:
+    about compression/2 centroids, small ones at the tails so high and low
+    percentiles stay accurate. Two digests merge into one of the same size.
+    """
+
+    BUFFER_SIZE = 256
+
+    def __init__(self, compression=config.QUANTILE_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer = []  # (value, weight) not yet folded into centroids
+
+    def add(self, value, weight=1.0):
+        self._buffer.append((value, weight))
+        self.count += weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if len(self._buffer) >= self.BUFFER_SIZE:
+            self._flush()
+
+    def _centroids(self):
+        """All centroids including the unflushed buffer (unsorted)"""
+        if not self._buffer:
+            return self.means, self.weights
+        pending = np.array(self._buffer, dtype=np.float64)
+        return (np.concatenate([self.means, pending[:, 0]]),
+                np.concatenate([self.weights, pending[:, 1]]))
+
+    def _flush(self):
+        if self._buffer:
+            self.means, self.weights = self._compress(*self._centroids())
+            self._buffer = []
+
+    def _compress(self, means, weights):
+        """
+        Sort and merge adjacent centroids so each covers at most one unit of
+        k(q) = compression / (2 pi) * asin(2q - 1)
+        """
+        if len(means) == 0:
+            return means, weights
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = np.floor(self.compression / (2 * math.pi) * np.arcsin(2 * q - 1))
+        starts = np.flatnonzero(np.diff(k, prepend=np.nan))
+        merged_weights = np.add.reduceat(weights, starts)
+        merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+        return merged_means, merged_weights
+
+    @classmethod
+    def merged(cls, digests, compression=config.QUANTILE_COMPRESSION):
+        """New digest combining several (inputs are left untouched)"""
+        result = cls(compression)
+        parts = [d._centroids() for d in digests if d.count]
+        if not parts:
+            return result
+        result.means, result.weights = result._compress(
+            np.concatenate([m for m, _ in parts]), np.concatenate([w for _, w in parts]))
+        result.count = sum(d.count for d in digests)
+        result.min = min(d.min for d in digests)
+        result.max = max(d.max for d in digests)
+        return result
+
+    def quantiles(self, qs):
+        """Values at quantiles qs (0..1); None for an empty digest"""
+        if not self.count:
+            return [None] * len(qs)
+        self._flush()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        xs = np.concatenate([[0.0], centers, [self.count]])
+        ys = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(np.asarray(qs, dtype=np.float64) * self.count, xs, ys).tolist()
+
+    def __getstate__(self):
+        self._flush()
+        return self.__dict__
+
+
+def parse_window(text):
+    """'90s', '30m', '24h', '7d' or plain seconds -> seconds; None/'all' -> None"""
+    if text in (None, '', 'all'):
+        return None
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([smhd]?)', text.strip())
+    if not match:
+        raise ValueError(f"Invalid window: {text}")
+    scale = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}[match.group(2)]
+    seconds = float(match.group(1)) * scale
+    if seconds <= 0:
+        raise ValueError(f"Invalid window: {text}")
+    return seconds
+
+
+class QuantileStore:
+    """Per-plant bucketed digests; O(1) per reading, bounded per plant"""
+
+    def __init__(self, retention=config.QUANTILE_RETENTION,
+                 compression=config.QUANTILE_COMPRESSION):
+        self.retention = retention
+        self.compression = compression
+        self._series = {}  # (plant_id, resolution) -> deque of (start, {metric: TDigest})
+        self._totals = {}  # plant_id -> {metric: TDigest} since startup
+        self._lock = threading.Lock()
+
+    def _new_digests(self):
+        return {metric: TDigest(self.compression) for metric in METRICS}
+
+    def add(self, plant_id, timestamp, values, weight=1.0):
+        """Fold readings (metric values in METRICS order, weight = how many) into every sketch"""
+        with self._lock:
+            totals = self._totals.get(plant_id)
+            if totals is None:
+                totals = self._totals[plant_id] = self._new_digests()
+            targets = [totals]
+            for name in self.retention:
+                digests = self._digests_for(plant_id, name, timestamp)
+                if digests is not None:
+                    targets.append(digests)
+            for digests in targets:
+                for metric, value in zip(METRICS, values):
+                    digests[metric].add(value, weight)
+
+    def _digests_for(self, plant_id, name, timestamp):
+        """Digests of the bucket covering timestamp (None if older than retention); caller holds the lock"""
+        width = RESOLUTIONS[name]
+        start = int(timestamp // width) * width
+        buckets = self._series.get((plant_id, name))
+        if buckets is None:
+            buckets = self._series[(plant_id, name)] = deque(maxlen=self.retention[name])
+
+        if buckets and buckets[-1][0] == start:
+            return buckets[-1][1]
+        if not buckets or buckets[-1][0] < start:
+            buckets.append((start, self._new_digests()))
+            return buckets[-1][1]
+        if buckets[0][0] > start and len(buckets) == buckets.maxlen:
+            return None
+        for idx in range(len(buckets) - 1, -1, -1):
+            if buckets[idx][0] == start:
+                return buckets[idx][1]
+            if buckets[idx][0] < start:
+                buckets.insert(idx + 1, (start, self._new_digests()))
+                return buckets[idx + 1][1]
+        buckets.appendleft((start, self._new_digests()))
+        return buckets[0][1]
+
+    def add_reading(self, reading):
+        """
+        Fold a stored reading record (as built by app.py). Edge summaries and
+        deadband-suppressed windows only carry min/max/mean, so they enter as
+        their mean weighted by their count.
+        """
+        summary = reading.get('summary')
+        if summary:
+            self._add_window(reading['plant_id'], summary)
+            return
+        timestamp = datetime.fromisoformat(reading['timestamp']).timestamp()
+        self.add(reading['plant_id'], timestamp, [reading[m] for m in METRICS])
+        suppressed = reading.get('suppressed')
+        if suppressed and suppressed['count'] > 0:
+            self._add_window(reading['plant_id'], suppressed)
+
+    def _add_window(self, plant_id, window):
+        self.add(plant_id, (window['start'] + window['end']) / 2,
+                 [window[m]['mean'] for m in METRICS], window['count'])
+
+    def pick_resolution(self, window):
+        """Finest resolution that still holds the whole window"""
+        for name in self.retention:
+            if window / RESOLUTIONS[name] + 1 <= self.retention[name]:
+                return name
+        return None
+
+    def max_window(self):
+        """Longest window (seconds) the bucketed sketches can answer"""
+        return max((count - 1) * RESOLUTIONS[name] for name, count in self.retention.items())
+
+    def window_start(self, window, now=None):
+        """Start of the first bucket a `window` ending now covers (None = all-time sketch)"""
+        resolution = self.pick_resolution(window) if window else None
+        if resolution is None:
+            return None
+        now = now if now is not None else time.time()
+        width = RESOLUTIONS[resolution]
+        return int((now - window) // width) * width
+
+    def digests(self, window=None, plant_id=None, now=None):
+        """
+        Merged digests per metric over the last `window` seconds (None = since
+        startup) for one plant or all of them. Windows are widened to whole
+        buckets; ones longer than max_window() raise ValueError.
+        Returns: {metric: TDigest}, ready for TDigest.merged() across stores
+        """
+        resolution = self.pick_resolution(window) if window else None
+        if window and resolution is None:
+            raise ValueError(f"Window is longer than the {self.max_window() / 86400:g} days "
+                             f"of percentile history kept (use window=all)")
+        with self._lock:
+            plants = [plant_id] if plant_id else list(self._totals)
+            if resolution is None:
+                groups = [self._totals[p] for p in plants if p in self._totals]
+            else:
+                start = self.window_start(window, now)
+                groups = []
+                for plant in plants:
+                    for bucket_start, digests in reversed(self._series.get((plant, resolution), ())):
+                        if bucket_start < start:
+                            break
+                        groups.append(digests)
+            return {metric: TDigest.merged([g[metric] for g in groups], self.compression)
+                    for metric in METRICS}
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+            self._totals.clear()
@@ -4,6 +4,9 @@ Reads sensor data and sends to Flask server
 """
 
 import requests
+import queue
+import random
+import threading
 import time
 import json
 from datetime import datetime
@@ -16,15 +19,50 @@ from datetime import datetime
 SERVER_URL = "http://localhost:5000"  # Change to your Raspberry Pi's IP or hostname
 API_ENDPOINT = f"{SERVER_URL}/api/sensor-data"
 
-# Sensor reading interval (seconds)
+# Sensor reading interval (seconds). Samples fire on fixed ticks of the
+# monotonic clock; sending happens on a separate thread so slow network
+# calls and retries never delay the next sample.
 SENSOR_READ_INTERVAL = 10
+FAST_READ_INTERVAL = 2     # Interval while the plant is in an anomaly state...
+ANOMALY_HOLD = 60          # ...until this many seconds after the last anomaly
+SEND_QUEUE_SIZE = 1000     # Samples waiting to be sent (oldest dropped when full)
+
+# Report by exception (JSON transport): only send a reading when a value moved
+# more than its deadband from the last one sent, or HEARTBEAT_INTERVAL seconds
+# passed. Suppressed readings are summarized in the next message so the server
+# keeps exact counts and stats. Everything is sent while a plant is anomalous.
+DEADBAND_REPORTING = False
+DEADBAND = {'temperature': 0.3, 'humidity': 1.5, 'ph': 0.05}
+HEARTBEAT_INTERVAL = 300
 
 # Plant identifier (for monitoring multiple plants)
 PLANT_ID = "Plant-1"
 
-# Connection retry settings
+# Connection retry settings. Waits grow exponentially from RETRY_DELAY up to
+# BACKOFF_MAX and are jittered; a busy server's Retry-After is honoured.
 MAX_RETRIES = 3
 RETRY_DELAY = 2
+BACKOFF_MAX = 60
+
+# Transport: 'json' sends one HTTP POST per reading,
+# 'binary' batches packed readings into frames over one persistent TCP
+# connection (needs sensor_protocol.py next to this script)
+TRANSPORT = 'json'
+BINARY_HOST = "localhost"
+BINARY_PORT = 5001
+FRAME_MAX_READINGS = 30   # Send a frame once this many readings are queued
+FRAME_MAX_DELAY = 30      # ...or once the oldest queued reading is this old (seconds)
+
+# Edge inference: score readings here with the exported model
+# (python forest_scorer.py export -> anomaly_model.npz; needs only NumPy and
+# forest_scorer.py on the Pi). Anomalies are sent at once, normal readings
+# only as a summary every SUMMARY_INTERVAL seconds. While the server is
+# unreachable, anomalies raise alerts on the Pi itself (alerts.py + config.py).
+EDGE_INFERENCE = False
+EDGE_MODEL_PATH = "anomaly_model.npz"
+SUMMARY_ENDPOINT = f"{SERVER_URL}/api/sensor-summary"
+SUMMARY_INTERVAL = 300
+EDGE_ALERT_METHOD = 'console'   # 'console', 'email' or 'webhook' (see config.py)
 
 # ============================================================================
 # SENSOR READING FUNCTIONS
@@ -161,18 +199,37 @@ def read_ph_sensor(adc_pin):
 # Use these when sensors are not connected
 # ============================================================================
 
+def mock_readings():
+    """
+    Endless (temperature, humidity, ph) of one synthetic plant, one per
+    SENSOR_READ_INTERVAL (synthetic.py; needs it, config.py and the training
+    CSV next to this script). Uniform noise without them.
+    """
+    try:
+        from synthetic import SyntheticGenerator
+        generator = SyntheticGenerator(plants=1, interval=SENSOR_READ_INTERVAL, start=time.time(),
+                                       seed=None)
+    except (ImportError, OSError, ValueError) as e:
+        print(f"⚠ Synthetic readings unavailable ({e}), using uniform noise")
+        while True:
+            yield (20 + random.uniform(-2, 5),     # 18-25°C
+                   60 + random.uniform(-10, 10),   # 50-70%
+                   6.5 + random.uniform(-0.3, 0.3))  # 6.2-6.8
+    for chunk in generator.chunks():
+        yield from chunk['values'].tolist()
+
+_MOCK_READINGS = None
+
 def read_mock_sensors():
     """
-    Generate random sensor data for testing
+    Simulated sensor data for testing: a synthetic plant's readings walking
+    through time (day/night cycle, injected anomalies)
     Remove this function once real sensors are connected
     """
-    import random
-    
-    temperature = 20 + random.uniform(-2, 5)  # 18-25°C
-    humidity = 60 + random.uniform(-10, 10)   # 50-70%
-    ph = 6.5 + random.uniform(-0.3, 0.3)      # 6.2-6.8
-    
-    return temperature, humidity, ph
+    global _MOCK_READINGS
+    if _MOCK_READINGS is None:
+        _MOCK_READINGS = mock_readings()
+    return next(_MOCK_READINGS)
 
 # ============================================================================
 # SENSOR DATA COLLECTION
@@ -208,18 +265,41 @@ def collect_sensor_data():
 # DATA TRANSMISSION
 # ============================================================================
 
-def send_sensor_data(temperature, humidity, ph, plant_id=PLANT_ID):
+def backoff_delay(attempt, retry_after=None):
+    """
+    Seconds to wait before retry number `attempt` (0 = first): the server's
+    Retry-After if it sent one, else RETRY_DELAY doubled per attempt (capped
+    at BACKOFF_MAX). Jittered so nodes that failed together don't retry together.
+    """
+    if retry_after:
+        return retry_after + random.uniform(0, retry_after / 2)
+    base = min(BACKOFF_MAX, RETRY_DELAY * 2 ** attempt)
+    return base / 2 + random.uniform(0, base / 2)
+
+def retry_after_header(response):
+    """Retry-After in seconds from a 429/503 response (None if absent or a date)"""
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+def send_sensor_data(temperature, humidity, ph, plant_id=PLANT_ID, timestamp=None, extra=None):
     """
     Send sensor data to Flask server
-    Returns: True if successful, False otherwise
+    (timestamp: unix time of the measurement, defaults to now;
+     extra: additional payload fields)
+    Returns: the server's status ('NORMAL' / 'ANOMALY') if successful, None otherwise
     """
     
     payload = {
         'temperature': round(temperature, 2),
         'humidity': round(humidity, 2),
         'ph': round(ph, 4),
-        'plant_id': plant_id
+        'plant_id': plant_id,
+        'timestamp': timestamp or time.time()
     }
+    if extra:
+        payload.update(extra)
     
     for attempt in range(MAX_RETRIES):
         try:
@@ -233,27 +313,377 @@ def send_sensor_data(temperature, humidity, ph, plant_id=PLANT_ID):
                 result = response.json()
                 status = result.get('status', 'UNKNOWN')
                 print(f"✓ Data sent successfully - Status: {status}")
-                return True
+                return status
+            elif response.status_code in (429, 503):
+                # Server is shedding load: back off as long as it asks
+                retry_after = retry_after_header(response)
+                print(f"⚠ Server busy ({response.status_code}, attempt {attempt + 1}/{MAX_RETRIES})")
+                if attempt < MAX_RETRIES - 1:
+                    time.sleep(backoff_delay(attempt, retry_after))
             else:
                 print(f"✗ Server returned status {response.status_code}: {response.text}")
                 
         except requests.exceptions.ConnectionError:
             print(f"✗ Connection error (attempt {attempt + 1}/{MAX_RETRIES})")
             if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
+                time.sleep(backoff_delay(attempt))
                 
         except requests.exceptions.Timeout:
             print(f"✗ Request timeout (attempt {attempt + 1}/{MAX_RETRIES})")
             if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
+                time.sleep(backoff_delay(attempt))
                 
         except Exception as e:
             print(f"✗ Error sending data: {e}")
-            return False
+            return None
     
     print(f"✗ Failed to send data after {MAX_RETRIES} attempts")
+    return None
+
+def create_binary_sender():
+    """
+    Create the framed TCP sender used when TRANSPORT = 'binary'
+    (None when PLANT_ID does not fit a binary record: JSON is used instead)
+    """
+    from sensor_protocol import BinaryFrameSender, ProtocolError, check_plant_id
+    try:
+        check_plant_id(PLANT_ID)
+    except ProtocolError as e:
+        print(f"⚠ {e}; sending over JSON instead")
+        return None
+    return BinaryFrameSender(BINARY_HOST, BINARY_PORT,
+                             max_records=FRAME_MAX_READINGS,
+                             max_delay=FRAME_MAX_DELAY)
+
+def send_sensor_data_binary(sender, temperature, humidity, ph, plant_id=PLANT_ID,
+                            timestamp=None):
+    """
+    Queue a reading on the binary sender and ship a frame when one is due
+    Returns: number of readings delivered by this call (0 if still buffered)
+    """
+    sender.add(round(temperature, 2), round(humidity, 2), round(ph, 4), plant_id,
+               timestamp=timestamp)
+    if not sender.due():
+        return 0
+    
+    try:
+        sent = sender.flush()
+        print(f"✓ Frame sent - {sent} readings (server cursor {sender.last_cursor})")
+        return sent
+    except Exception as e:
+        # sender.due() stays False until its backoff has passed
+        print(f"✗ Frame send failed, {len(sender.pending)} readings kept for retry: {e}")
+        return 0
+
+# ============================================================================
+# EDGE INFERENCE
+# ============================================================================
+
+def load_edge_scorer(path=EDGE_MODEL_PATH):
+    """Load the NumPy-only anomaly scorer; None (send everything) if unavailable"""
+    try:
+        from forest_scorer import ForestScorer
+        scorer = ForestScorer.load(path)
+        print(f"✓ Edge model loaded from {path} ({len(scorer.roots)} trees)")
+        return scorer
+    except Exception as e:
+        print(f"⚠ Edge inference disabled, could not load {path}: {e}")
+        return None
+
+class ReadingSummary:
+    """Running min/max/mean of the normal readings not sent individually"""
+    
+    METRICS = ('temperature', 'humidity', 'ph')
+    
+    def __init__(self, plant_id=PLANT_ID):
+        self.plant_id = plant_id
+        self.reset()
+    
+    def reset(self):
+        self.count = 0
+        self.start = None
+        self.end = None
+        self.stats = {m: [float('inf'), float('-inf'), 0.0] for m in self.METRICS}
+        self.last = None
+        self.opened = time.monotonic()
+        self.retry_at = 0.0
+    
+    def add(self, temperature, humidity, ph, timestamp=None):
+        now = timestamp or time.time()
+        self.start = self.start or now
+        self.end = now
+        self.count += 1
+        for metric, value in zip(self.METRICS, (temperature, humidity, ph)):
+            stat = self.stats[metric]
+            stat[0] = min(stat[0], value)
+            stat[1] = max(stat[1], value)
+            stat[2] += value
+        self.last = {'temperature': round(temperature, 2), 'humidity': round(humidity, 2),
+                     'ph': round(ph, 4)}
+    
+    def due(self):
+        now = time.monotonic()
+        return self.count > 0 and now - self.opened >= SUMMARY_INTERVAL and now >= self.retry_at
+    
+    def payload(self):
+        payload = {'plant_id': self.plant_id, 'start': self.start, 'end': self.end,
+                   'count': self.count, 'last': self.last}
+        for metric, (low, high, total) in self.stats.items():
+            payload[metric] = {'min': round(low, 4), 'max': round(high, 4),
+                               'mean': round(total / self.count, 4)}
+        return payload
+
+def send_summary(summary):
+    """
+    Send the current summary; on success start a new one, otherwise keep
+    accumulating so the next attempt covers the whole gap
+    """
+    try:
+        response = requests.post(SUMMARY_ENDPOINT, json=summary.payload(), timeout=5)
+        if response.status_code == 200:
+            print(f"✓ Summary sent - {summary.count} normal readings")
+            summary.reset()
+            return True
+        if response.status_code in (429, 503):
+            summary.retry_at = time.monotonic() + backoff_delay(0, retry_after_header(response))
+            print(f"⚠ Server busy, summary kept for later")
+            return False
+        print(f"✗ Server returned status {response.status_code}: {response.text}")
+    except requests.exceptions.RequestException as e:
+        print(f"✗ Summary not sent, will retry: {e}")
     return False
 
+def create_local_alerts():
+    """Alert dispatcher used while the server is unreachable"""
+    try:
+        from alerts import AlertDispatcher
+        return AlertDispatcher(method=EDGE_ALERT_METHOD, workers=1)
+    except Exception as e:
+        print(f"⚠ Local alerts unavailable ({e}); offline anomalies will only be printed")
+        return None
+
+def raise_local_alert(alerts, temperature, humidity, ph, score, plant_id=PLANT_ID,
+                      timestamp=None):
+    reading = {
+        'plant_id': plant_id,
+        'timestamp': datetime.fromtimestamp(timestamp or time.time()).isoformat(),
+        'temperature': round(temperature, 2),
+        'humidity': round(humidity, 2),
+        'ph': round(ph, 4),
+        'anomaly_score': round(score, 4),
+        'is_anomaly': True,
+        'temporal_reasons': [],
+    }
+    if alerts is None or not alerts.submit(reading):
+        print(f"⚠ Offline anomaly on {plant_id}: {temperature:.2f}°C, "
+              f"{humidity:.2f}%, pH {ph:.4f} (score {score:.3f})")
+
+def handle_edge_reading(scorer, summary, alerts, sender, temperature, humidity, ph,
+                        timestamp=None):
+    """
+    Score one reading on the Pi: anomalies go to the server right away
+    (or to a local alert when that fails), normal readings into the summary.
+    Returns: (readings delivered, delivery failed, is anomaly)
+    """
+    result = scorer.score([[temperature, humidity, ph]], explain=False)
+    if result['label'][0] != -1:
+        summary.add(temperature, humidity, ph, timestamp)
+        print("  Edge verdict: NORMAL (summarized)")
+        if summary.due():
+            send_summary(summary)
+        return 0, False, False
+    
+    score = float(abs(result['decision'][0]))
+    print(f"  Edge verdict: ANOMALY (score {score:.3f}), sending reading")
+    if sender is not None:
+        sender.add(round(temperature, 2), round(humidity, 2), round(ph, 4), PLANT_ID,
+                   timestamp=timestamp)
+        try:
+            return sender.flush(), False, True
+        except Exception as e:
+            print(f"✗ Frame send failed: {e}")
+            delivered = 0
+    else:
+        delivered = 1 if send_sensor_data(temperature, humidity, ph, timestamp=timestamp) else 0
+    
+    if not delivered:
+        raise_local_alert(alerts, temperature, humidity, ph, score, timestamp=timestamp)
+        return 0, True, True
+    return delivered, False, True
+
+# ============================================================================
+# DEADBAND REPORTING
+# ============================================================================
+
+class DeadbandFilter:
+    """
+    Decides which readings are worth sending (DEADBAND_REPORTING). A reading
+    goes out when any value left its deadband around the last sent value or
+    the heartbeat expired; the rest are summarized and that summary, with
+    the last sent values, rides along with the next message as 'suppressed'.
+    """
+    
+    METRICS = ReadingSummary.METRICS
+    
+    def __init__(self, deadband=DEADBAND, heartbeat=HEARTBEAT_INTERVAL, plant_id=PLANT_ID):
+        self.deadband = deadband
+        self.heartbeat = heartbeat
+        self.pending = ReadingSummary(plant_id)
+        self.last_sent = None
+        self.last_sent_at = None
+        self.seen = 0
+        self.suppressed = 0
+    
+    def check(self, temperature, humidity, ph, timestamp, force=False):
+        """True if this reading should be sent; otherwise it is summarized"""
+        self.seen += 1
+        values = dict(zip(self.METRICS, (temperature, humidity, ph)))
+        if (force or self.last_sent is None
+                or timestamp - self.last_sent_at >= self.heartbeat
+                or any(abs(values[m] - self.last_sent[m]) > self.deadband[m] for m in self.METRICS)):
+            return True
+        self.pending.add(temperature, humidity, ph, timestamp)
+        self.suppressed += 1
+        return False
+    
+    def metadata(self):
+        """'suppressed' field for the next message (None before the first send)"""
+        if self.last_sent is None:
+            return None
+        last_sent = dict(self.last_sent, timestamp=self.last_sent_at)
+        if not self.pending.count:
+            return {'count': 0, 'last_sent': last_sent}
+        meta = self.pending.payload()
+        del meta['plant_id'], meta['last']
+        meta['last_sent'] = last_sent
+        return meta
+    
+    def failed(self, temperature, humidity, ph, timestamp):
+        """A reading that was due could not be sent: summarize it with the held ones"""
+        self.pending.add(temperature, humidity, ph, timestamp)
+    
+    def sent(self, temperature, humidity, ph, timestamp):
+        """Record a delivered reading; the summary it carried is now on the server"""
+        self.last_sent = {'temperature': round(temperature, 2), 'humidity': round(humidity, 2),
+                          'ph': round(ph, 4)}
+        self.last_sent_at = timestamp
+        self.pending.reset()
+    
+    def ratio(self):
+        return self.suppressed / self.seen if self.seen else 0.0
+
+# ============================================================================
+# SCHEDULING
+# ============================================================================
+
+class SampleScheduler:
+    """
+    Fixed-rate sample clock on time.monotonic(). Ticks are laid out from the
+    previous tick rather than from when the last loop finished, so read time
+    doesn't accumulate into drift; ticks missed by a stalled read are skipped
+    rather than fired in a burst. The interval drops to FAST_READ_INTERVAL
+    while report() has seen an anomaly within the last ANOMALY_HOLD seconds.
+    """
+    
+    def __init__(self, interval=SENSOR_READ_INTERVAL, fast_interval=FAST_READ_INTERVAL,
+                 hold=ANOMALY_HOLD):
+        self.base_interval = interval
+        self.fast_interval = fast_interval
+        self.hold = hold
+        self.interval = interval
+        self.last_tick = None
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._anomalous_until = 0.0
+    
+    def report(self, is_anomaly):
+        """Feed back a verdict (called from the send thread)"""
+        if is_anomaly:
+            with self._lock:
+                self._anomalous_until = time.monotonic() + self.hold
+    
+    def anomalous(self):
+        with self._lock:
+            return time.monotonic() < self._anomalous_until
+    
+    def current_interval(self):
+        return self.fast_interval if self.anomalous() else self.base_interval
+    
+    def wait(self):
+        """Sleep until the next tick and return its monotonic time"""
+        now = time.monotonic()
+        interval = self.current_interval()
+        if interval != self.interval:
+            print(f"  Sampling every {interval}s")
+            self.interval = interval
+        
+        if self.last_tick is None:
+            tick = now
+        else:
+            tick = self.last_tick + interval
+            if now - tick >= interval:
+                missed = int((now - tick) // interval)
+                self.skipped += missed
+                tick += missed * interval
+                print(f"⚠ Sampling fell behind, skipped {missed} tick(s)")
+        
+        if tick > now:
+            time.sleep(tick - now)
+        self.last_tick = tick
+        return tick
+
+class SendStage:
+    """
+    Background thread that transmits samples from a bounded queue, so
+    network timeouts and retries happen off the sampling clock. When the
+    queue is full the oldest sample is dropped.
+    """
+    
+    def __init__(self, transmit, queue_size=SEND_QUEUE_SIZE):
+        self.transmit = transmit
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._abandon = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='sensor-send', daemon=True)
+        self.thread.start()
+    
+    def put(self, sample):
+        while True:
+            try:
+                self.queue.put_nowait(sample)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+    
+    def _run(self):
+        while True:
+            sample = self.queue.get()
+            if sample is None:
+                return
+            if self._abandon.is_set():
+                self.dropped += 1
+                continue
+            try:
+                self.transmit(*sample)
+            except Exception as e:
+                print(f"✗ Send stage error: {e}")
+    
+    def close(self, timeout=None):
+        """
+        Send what is still queued for up to timeout seconds and drop the
+        rest. Returns once the send thread has stopped (it finishes the
+        sample in hand), so nothing it touches is still changing.
+        """
+        self.put(None)
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            self._abandon.set()
+            self.thread.join()
+
 # ============================================================================
 # MAIN LOOP
 # ============================================================================
@@ -266,46 +696,106 @@ def main():
     print("=" * 70)
     print(f"Server URL: {SERVER_URL}")
     print(f"Plant ID: {PLANT_ID}")
-    print(f"Read interval: {SENSOR_READ_INTERVAL} seconds")
+    print(f"Read interval: {SENSOR_READ_INTERVAL} seconds "
+          f"({FAST_READ_INTERVAL}s while anomalous)")
     print(f"Retries on failure: {MAX_RETRIES}")
+    print(f"Transport: {TRANSPORT}")
+    print(f"Edge inference: {'on' if EDGE_INFERENCE else 'off'}")
+    print(f"Deadband reporting: {'on' if DEADBAND_REPORTING else 'off'}")
     print("\nStarting sensor collection... (Press Ctrl+C to stop)\n")
     
-    reading_count = 0
-    error_count = 0
+    # Updated only by the send thread
+    counts = {'sent': 0, 'errors': 0}
+    read_errors = 0
+    sender = create_binary_sender() if TRANSPORT == 'binary' else None
+    scorer = load_edge_scorer() if EDGE_INFERENCE else None
+    summary = ReadingSummary() if scorer is not None else None
+    alerts = create_local_alerts() if scorer is not None else None
+    scheduler = SampleScheduler()
+    deadband = (DeadbandFilter() if DEADBAND_REPORTING and scorer is None and sender is None
+                else None)
+    
+    def transmit(measured_at, temperature, humidity, ph):
+        if scorer is not None:
+            delivered, failed, is_anomaly = handle_edge_reading(
+                scorer, summary, alerts, sender, temperature, humidity, ph, measured_at)
+            counts['sent'] += delivered
+            counts['errors'] += failed
+        elif sender is not None:
+            # Frames carry no per-reading verdict, so the rate stays fixed
+            counts['sent'] += send_sensor_data_binary(sender, temperature, humidity, ph,
+                                                      timestamp=measured_at)
+            is_anomaly = False
+        else:
+            extra = None
+            if deadband is not None:
+                if not deadband.check(temperature, humidity, ph, measured_at,
+                                      force=scheduler.anomalous()):
+                    print(f"  Within deadband, not sent ({deadband.pending.count} held)")
+                    return
+                extra = {'suppressed': deadband.metadata()}
+            status = send_sensor_data(temperature, humidity, ph, timestamp=measured_at,
+                                      extra=extra)
+            if status:
+                counts['sent'] += 1
+                if deadband is not None:
+                    deadband.sent(temperature, humidity, ph, measured_at)
+            else:
+                counts['errors'] += 1
+                if deadband is not None:
+                    deadband.failed(temperature, humidity, ph, measured_at)
+            is_anomaly = status == 'ANOMALY'
+        scheduler.report(is_anomaly)
+    
+    stage = SendStage(transmit)
     
     try:
         while True:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            print(f"\n[{timestamp}] Reading sensors...")
+            scheduler.wait()
+            measured_at = time.time()
             
             # Read sensor data
             temperature, humidity, ph = collect_sensor_data()
             
+            timestamp = datetime.fromtimestamp(measured_at).strftime("%Y-%m-%d %H:%M:%S")
             if temperature is None or humidity is None or ph is None:
-                print("✗ Failed to read sensors")
-                error_count += 1
-                time.sleep(SENSOR_READ_INTERVAL)
+                print(f"\n[{timestamp}] ✗ Failed to read sensors")
+                read_errors += 1
                 continue
             
             # Display readings
+            print(f"\n[{timestamp}] Sensors read")
             print(f"  Temperature: {temperature:.2f}°C")
             print(f"  Humidity:    {humidity:.2f}%")
             print(f"  pH:          {ph:.4f}")
             
-            # Send to server
-            if send_sensor_data(temperature, humidity, ph):
-                reading_count += 1
-            else:
-                error_count += 1
-            
-            # Wait before next reading
-            time.sleep(SENSOR_READ_INTERVAL)
+            # Hand over to the send thread; the next tick doesn't wait for it
+            stage.put((measured_at, temperature, humidity, ph))
     
     except KeyboardInterrupt:
+        print("\nSending queued readings...")
+        # The send thread must be done before the final summaries are built
+        stage.close(timeout=15)
+        if summary is not None and summary.count:
+            send_summary(summary)
+        if deadband is not None and deadband.pending.count:
+            send_summary(deadband.pending)
+        if alerts is not None:
+            alerts.close(timeout=5)
+        if sender is not None:
+            try:
+                counts['sent'] += sender.flush()
+            except Exception:
+                pass
+            sender.close()
         print(f"\n\n{'=' * 70}")
         print("Sensor collection stopped by user")
-        print(f"Total readings sent: {reading_count}")
-        print(f"Errors: {error_count}")
+        print(f"Total readings sent: {counts['sent']}")
+        print(f"Errors: {counts['errors'] + read_errors}")
+        print(f"Skipped ticks: {scheduler.skipped}, dropped from send queue: {stage.dropped}")
+        if deadband is not None:
+            print(f"Suppressed by deadband: {deadband.suppressed} "
+                  f"({deadband.ratio() * 100:.1f}% of readings)")
         print("=" * 70)
 
 if __name__ == '__main__':
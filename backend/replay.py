@@ -0,0 +1,330 @@
+"""
+Sensor Data Replay Harness
+Streams recorded readings back through the Flask server for capacity and
+regression testing:
+- Sources: the sensor log (sensor_log.py; main.py's sensor_history or
+  app.py's readings), lettuce_dataset_updated.csv and synthetic/ (chunks
+  written by synthetic.py)
+- Speeds: real time, N x faster, or as fast as possible
+- Transports: JSON POSTs to /api/sensor-data or binary frames over TCP
+Per-plant ordering is preserved; throughput and anomaly verdicts are reported.
+Busy answers (429/503, ACK_BUSY) are retried after the server's Retry-After
+with the Pi's jittered backoff. Admission control (config.ADMISSION_*) lets
+one client in at ADMISSION_CLIENT_RATE readings/s, so for a fast replay list
+the replay host in config.ADMISSION_EXEMPT_CLIENTS.
+
+Usage:
+    python replay.py --source csv --speed 0
+    python replay.py --source history --speed 10 --transport binary
+    python replay.py --source readings --speed 0
+    python replay.py --source synthetic --transport binary --limit 1000000
+"""
+
+import argparse
+import csv
+import json
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime
+
+import config
+from raspberry_pi_sensor import backoff_delay, retry_after_header
+from sensor_protocol import BinaryFrameSender, ProtocolError, ServerBusy
+
+CSV_FILE = 'lettuce_dataset_updated.csv'
+SYNTHETIC_DIR = 'synthetic'
+DEFAULT_SERVER = 'http://localhost:5000'
+BUSY_RETRIES = 5  # Busy answers retried per request/frame before counting its readings as errors
+
+
+# ============================================================================
+# SOURCES
+# Each event: (unix timestamp, plant_id, temperature, humidity, ph)
+# ============================================================================
+
+def load_history(prefix='sensor_history', plant_id='Plant-1', log_dir=config.SENSOR_LOG_DIR):
+    """
+    Readings from the sensor log: main.py's payloads ('sensor_history',
+    replayed as `plant_id`) or app.py's stored readings ('readings')
+    """
+    from sensor_log import read_log
+    events = []
+    for record in read_log(prefix=prefix, log_dir=log_dir):
+        try:
+            ts = datetime.fromisoformat(record['timestamp']).timestamp()
+            if 'sensors' in record:
+                sensors = record['sensors']
+                events.append((ts, plant_id, float(sensors['temp']), float(sensors['humidity']),
+                               float(sensors['ph'])))
+            else:
+                events.append((ts, record.get('plant_id', plant_id), float(record['temperature']),
+                               float(record['humidity']), float(record['ph'])))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return events
+
+
+def load_csv(path=CSV_FILE):
+    """Daily per-plant readings from the training dataset"""
+    temp_col, hum_col, ph_col = config.FEATURE_COLUMNS
+    events = []
+    with open(path, encoding='latin-1', newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                ts = datetime.strptime(row['Date'], '%m/%d/%Y').timestamp()
+                events.append((ts, f"Plant-{row['Plant_ID']}", float(row[temp_col]),
+                               float(row[hum_col]), float(row[ph_col])))
+            except (KeyError, ValueError):
+                continue
+    return events
+
+
+def load_synthetic(path=SYNTHETIC_DIR):
+    """Generated readings written by synthetic.py (.npz chunks)"""
+    from synthetic import load_chunks
+    events = []
+    for records, _, _ in load_chunks(path):
+        events.extend(zip(records['timestamp'].tolist(),
+                          [p.decode('utf-8') for p in records['plant_id'].tolist()],
+                          records['temperature'].tolist(), records['humidity'].tolist(),
+                          records['ph'].tolist()))
+    return events
+
+
+SOURCES = {
+    'history': load_history,
+    'readings': lambda: load_history('readings'),
+    'csv': load_csv,
+    'synthetic': load_synthetic,
+}
+
+
+# ============================================================================
+# REPLAY
+# ============================================================================
+
+class ReplayStats:
+    """Thread-safe counters shared by the replay workers"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.errors = 0
+        self.verdicts = Counter()
+        self.reasons = Counter()
+        self.latencies = []
+
+    def record(self, status, reasons=(), latency=None):
+        with self.lock:
+            self.sent += 1
+            self.verdicts[status] += 1
+            for reason in reasons:
+                self.reasons[reason.rsplit(' ', 1)[0]] += 1
+            if latency is not None:
+                self.latencies.append(latency)
+
+    def error(self, count=1):
+        with self.lock:
+            self.errors += count
+
+    def merge(self, other):
+        self.sent += other.sent
+        self.errors += other.errors
+        self.verdicts.update(other.verdicts)
+        self.reasons.update(other.reasons)
+        self.latencies.extend(other.latencies)
+
+
+def partition(events, workers):
+    """Split events so each plant's readings all go to the same worker, in time order"""
+    lanes = [[] for _ in range(workers)]
+    for event in sorted(events, key=lambda e: e[0]):
+        lanes[zlib.crc32(event[1].encode('utf-8')) % workers].append(event)
+    return lanes
+
+
+def _pace(event_ts, first_ts, started, speed):
+    """Sleep until an event's scaled due time (speed 0 = no waiting)"""
+    if speed <= 0:
+        return
+    delay = started + (event_ts - first_ts) / speed - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+
+
+def replay_json(lane, server, first_ts, started, speed, stats):
+    """
+    POST each reading to /api/sensor-data over one keep-alive session, with
+    its recorded timestamp like the binary transport (so the server dedups a
+    reading replayed twice, reported as DUPLICATE)
+    """
+    import requests
+    session = requests.Session()
+    url = f"{server}/api/sensor-data"
+    for ts, plant_id, temp, hum, ph in lane:
+        _pace(ts, first_ts, started, speed)
+        payload = {'temperature': temp, 'humidity': hum, 'ph': ph, 'plant_id': plant_id,
+                   'timestamp': ts}
+        try:
+            for attempt in range(BUSY_RETRIES + 1):
+                sent_at = time.perf_counter()
+                response = session.post(url, json=payload, timeout=10)
+                latency = time.perf_counter() - sent_at
+                if response.status_code not in (429, 503) or attempt == BUSY_RETRIES:
+                    break
+                time.sleep(backoff_delay(attempt, retry_after_header(response)))
+            if response.status_code != 200:
+                stats.error()
+                continue
+            result = response.json()
+            if result.get('duplicate'):
+                stats.record('DUPLICATE', latency=latency)
+                continue
+            stats.record(result.get('status', 'UNKNOWN'), result.get('temporal_reasons', []), latency)
+        except Exception:
+            stats.error()
+
+
+def replay_binary(lane, host, port, first_ts, started, speed, stats, frame_size):
+    """Send readings as binary frames over one persistent TCP connection"""
+    # Paced replays flush every reading so events are not held back
+    sender = BinaryFrameSender(host, port, max_records=frame_size if speed <= 0 else 1)
+    for ts, plant_id, temp, hum, ph in lane:
+        _pace(ts, first_ts, started, speed)
+        try:
+            sender.add(temp, hum, ph, plant_id, timestamp=ts)
+        except ProtocolError:
+            # Id too long for a binary record (replay these over JSON)
+            stats.error()
+            continue
+        if sender.due():
+            _flush(sender, stats)
+    _flush(sender, stats)
+    sender.close()
+
+
+def _flush(sender, stats):
+    """Send everything buffered, waiting out busy acks; what cannot be sent counts as errors"""
+    attempt = 0
+    while sender.pending:
+        try:
+            sent_at = time.perf_counter()
+            count = sender.flush()
+            latency = time.perf_counter() - sent_at
+        except ServerBusy as e:
+            if attempt == BUSY_RETRIES:
+                stats.error(len(sender.pending))
+                sender.pending.clear()
+                return
+            time.sleep(backoff_delay(attempt, e.retry_after))
+            attempt += 1
+            continue
+        except OSError:
+            stats.error(len(sender.pending))
+            sender.pending.clear()
+            return
+        attempt = 0
+        for _ in range(count):
+            # The binary ack carries no per-reading verdict
+            stats.record('SENT (binary)', latency=latency / count)
+
+
+def run(events, transport='json', server=DEFAULT_SERVER, binary_host='localhost',
+        binary_port=5001, speed=0.0, workers=4, frame_size=250):
+    """
+    Replay events and return (ReplayStats, elapsed seconds). Readings a lane
+    never got to (its thread died) are counted as errors.
+    """
+    stats = ReplayStats()
+    if not events:
+        return stats, 0.0
+
+    lanes = [lane for lane in partition(events, workers) if lane]
+    first_ts = min(e[0] for e in events)
+    started = time.monotonic()
+
+    threads, lane_stats = [], []
+    for lane in lanes:
+        lane_stats.append(ReplayStats())
+        if transport == 'binary':
+            args = (lane, binary_host, binary_port, first_ts, started, speed, lane_stats[-1],
+                    frame_size)
+            target = replay_binary
+        else:
+            args = (lane, server, first_ts, started, speed, lane_stats[-1])
+            target = replay_json
+        threads.append(threading.Thread(target=_run_lane, args=(target, args), daemon=True))
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for lane, lane_stat in zip(lanes, lane_stats):
+        stats.merge(lane_stat)
+        stats.error(len(lane) - lane_stat.sent - lane_stat.errors)
+    return stats, time.monotonic() - started
+
+
+def _run_lane(target, args):
+    try:
+        target(*args)
+    except Exception as e:
+        print(f"✗ Replay lane stopped: {e!r}")
+
+
+def print_report(stats, elapsed, source, transport, speed):
+    print("\n" + "=" * 70)
+    print("REPLAY REPORT")
+    print("=" * 70)
+    print(f"  Source: {source} | Transport: {transport} | "
+          f"Speed: {'max' if speed <= 0 else f'{speed:g}x'}")
+    print(f"  Readings sent: {stats.sent} ({stats.errors} errors)")
+    print(f"  Elapsed: {elapsed:.2f}s")
+    if elapsed > 0:
+        print(f"  Throughput: {stats.sent / elapsed:.1f} readings/s")
+
+    if stats.latencies:
+        latencies = sorted(stats.latencies)
+        pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+        print(f"  Latency: p50 {pick(0.50):.1f} ms | p95 {pick(0.95):.1f} ms | p99 {pick(0.99):.1f} ms")
+
+    print("\n  Verdicts:")
+    for status, count in stats.verdicts.most_common():
+        print(f"    {status:15s} {count:7d} ({count / max(stats.sent, 1) * 100:.1f}%)")
+    if stats.reasons:
+        print("\n  Temporal reasons:")
+        for reason, count in stats.reasons.most_common():
+            print(f"    {reason:30s} {count:7d}")
+    print("=" * 70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded sensor data into the server")
+    parser.add_argument('--source', choices=sorted(SOURCES), default='csv')
+    parser.add_argument('--transport', choices=['json', 'binary'], default='json')
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help="1 = real time, N = N x faster, 0 = as fast as possible")
+    parser.add_argument('--server', default=DEFAULT_SERVER, help="Flask server URL (json transport)")
+    parser.add_argument('--binary-host', default='localhost')
+    parser.add_argument('--binary-port', type=int, default=5001)
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent senders (plants are pinned to one)")
+    parser.add_argument('--frame-size', type=int, default=250,
+                        help="Readings per binary frame (at most the admission burst, "
+                             "config.ADMISSION_CLIENT_BURST, unless this host is exempt)")
+    parser.add_argument('--limit', type=int, default=0, help="Replay only the first N readings")
+    args = parser.parse_args()
+
+    events = SOURCES[args.source]()
+    if args.limit:
+        events = sorted(events, key=lambda e: e[0])[:args.limit]
+    print(f"✓ Loaded {len(events)} readings from {args.source}")
+
+    stats, elapsed = run(events, args.transport, args.server, args.binary_host,
+                         args.binary_port, args.speed, args.workers, args.frame_size)
+    print_report(stats, elapsed, args.source, args.transport, args.speed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Versioned Response Cache for the Flask API
+Caches serialized JSON responses keyed on (route, query params, data version,
+and for time-relative views the window they resolve to) and answers conditional requests (If-None-Match) with 304 Not Modified
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, Response
+
+
+class ResponseCache:
+    """
+    Serialized-response cache invalidated by a data version counter.
+    Call bump() whenever the underlying readings change.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def bump(self):
+        """Advance the data version; every cached response becomes stale"""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            return self._version
+
+    def _key(self, route, vary=None):
+        params = tuple(sorted(request.args.items(multi=True)))
+        return (route, params, self._version, vary() if vary else None)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, body, status):
+        """Store a serialized body; entries from an older version are discarded"""
+        etag = hashlib.sha1(body).hexdigest()[:20]
+        entry = (body, status, etag)
+        with self._lock:
+            if key[2] != self._version:
+                return entry
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return {
+                'version': self._version,
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+            }
+
+    def _respond(self, entry):
+        body, status, etag = entry
+        if status == 200 and request.if_none_match.contains(etag):
+            self.not_modified += 1
+            response = Response(status=304)
+        else:
+            response = Response(body, status=status, mimetype='application/json')
+        if status == 200:
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def cached(self, view=None, vary=None):
+        """
+        Decorator for GET views returning (jsonify(...), status) tuples.
+        vary: optional callable whose result is added to the key, for views
+        whose answer also depends on the time of the request
+        """
+        if view is None:
+            return lambda view: self.cached(view, vary)
+        route = view.__name__
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = self._key(route, vary)
+            entry = self.get(key)
+            if entry is not None:
+                self.hits += 1
+                return self._respond(entry)
+
+            self.misses += 1
+            result = view(*args, **kwargs)
+            response, status = result if isinstance(result, tuple) else (result, 200)
+            # Server errors are never cached
+            if status >= 500:
+                return result
+            entry = self.put(key, response.get_data(), status)
+            return self._respond(entry)
+
+        return wrapper
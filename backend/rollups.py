@@ -0,0 +1,233 @@
+"""
+Multi-Resolution Rollups for Long-Range Charts
+Keeps per-plant min/max/mean/count/anomaly-count buckets at 1-minute,
+1-hour and 1-day resolution, updated incrementally as readings arrive
+"""
+
+import math
+import threading
+from collections import deque
+from datetime import datetime
+
+import config
+
+METRICS = ('temperature', 'humidity', 'ph')
+
+# Resolution name -> bucket width in seconds (finest first)
+RESOLUTIONS = {
+    '1m': 60,
+    '1h': 3600,
+    '1d': 86400,
+}
+
+# Bucket layout: [start, count, anomalies, then (min, max, sum) per metric]
+_START, _COUNT, _ANOMALIES, _FIRST_METRIC = 0, 1, 2, 3
+
+
+def _new_bucket(start):
+    bucket = [start, 0, 0]
+    for _ in METRICS:
+        bucket.extend((math.inf, -math.inf, 0.0))
+    return bucket
+
+
+def _add_to_bucket(bucket, values, is_anomaly):
+    bucket[_COUNT] += 1
+    if is_anomaly:
+        bucket[_ANOMALIES] += 1
+    i = _FIRST_METRIC
+    for value in values:
+        if value < bucket[i]:
+            bucket[i] = value
+        if value > bucket[i + 1]:
+            bucket[i + 1] = value
+        bucket[i + 2] += value
+        i += 3
+
+
+def _merge_bucket(into, other):
+    into[_COUNT] += other[_COUNT]
+    into[_ANOMALIES] += other[_ANOMALIES]
+    for i in range(_FIRST_METRIC, len(into), 3):
+        into[i] = min(into[i], other[i])
+        into[i + 1] = max(into[i + 1], other[i + 1])
+        into[i + 2] += other[i + 2]
+
+
+def merge_buckets(series):
+    """Merge several bucket lists (e.g. one per plant or shard) into one, by bucket start"""
+    merged = {}
+    for buckets in series:
+        for bucket in buckets:
+            if bucket[_START] in merged:
+                _merge_bucket(merged[bucket[_START]], bucket)
+            else:
+                merged[bucket[_START]] = list(bucket)
+    return [merged[k] for k in sorted(merged)]
+
+
+class RollupStore:
+    """Per-plant rollup buckets, O(1) per reading and bounded per plant"""
+
+    def __init__(self, retention=config.ROLLUP_RETENTION):
+        self.retention = retention
+        self._series = {}  # (plant_id, resolution) -> deque of buckets
+        self._lock = threading.Lock()
+
+    def add(self, plant_id, timestamp, values, is_anomaly):
+        """Fold one reading (unix timestamp, metric values in METRICS order) into every resolution"""
+        with self._lock:
+            for name, width in RESOLUTIONS.items():
+                bucket = self._bucket_for(plant_id, name, width, timestamp)
+                if bucket is not None:
+                    _add_to_bucket(bucket, values, is_anomaly)
+
+    def add_aggregate(self, plant_id, timestamp, count, anomalies, stats):
+        """
+        Fold readings that were already aggregated elsewhere (an edge device
+        summary) into the buckets containing `timestamp`.
+        stats: (min, max, mean) per metric in METRICS order
+        """
+        if count <= 0:
+            return
+        other = [0, count, anomalies]
+        for low, high, mean in stats:
+            other.extend((low, high, mean * count))
+        with self._lock:
+            for name, width in RESOLUTIONS.items():
+                bucket = self._bucket_for(plant_id, name, width, timestamp)
+                if bucket is not None:
+                    _merge_bucket(bucket, other)
+
+    def _bucket_for(self, plant_id, name, width, timestamp):
+        """Bucket of one series that covers timestamp (None if older than retention); caller holds the lock"""
+        start = int(timestamp // width) * width
+        buckets = self._series.get((plant_id, name))
+        if buckets is None:
+            buckets = self._series[(plant_id, name)] = deque(maxlen=self.retention[name])
+
+        if buckets and buckets[-1][_START] == start:
+            return buckets[-1]
+        if not buckets or buckets[-1][_START] < start:
+            bucket = _new_bucket(start)
+            buckets.append(bucket)
+            return bucket
+        return self._find_or_insert(buckets, start)
+
+    def add_reading(self, reading):
+        """
+        Fold a stored reading record (as built by app.py) into the rollups.
+        A reading standing in for an edge summary contributes the whole summary;
+        one carrying deadband-suppressed readings contributes those as well.
+        """
+        timestamp = datetime.fromisoformat(reading['timestamp']).timestamp()
+        summary = reading.get('summary')
+        if summary:
+            self._add_window(reading['plant_id'], summary)
+            return
+        values = [reading[m] for m in METRICS]
+        self.add(reading['plant_id'], timestamp, values, reading['is_anomaly'])
+        suppressed = reading.get('suppressed')
+        if suppressed and suppressed['count'] > 0:
+            self._add_window(reading['plant_id'], suppressed)
+
+    def _add_window(self, plant_id, window):
+        """Aggregate of readings taken between window['start'] and window['end']"""
+        stats = [(window[m]['min'], window[m]['max'], window[m]['mean']) for m in METRICS]
+        self.add_aggregate(plant_id, (window['start'] + window['end']) / 2,
+                           window['count'], window.get('anomalies', 0), stats)
+
+    @staticmethod
+    def _find_or_insert(buckets, start):
+        """Late reading: locate (or create) its bucket; None if older than retention"""
+        if buckets[0][_START] > start and len(buckets) == buckets.maxlen:
+            return None
+        for idx in range(len(buckets) - 1, -1, -1):
+            if buckets[idx][_START] == start:
+                return buckets[idx]
+            if buckets[idx][_START] < start:
+                bucket = _new_bucket(start)
+                buckets.insert(idx + 1, bucket)
+                return bucket
+        bucket = _new_bucket(start)
+        buckets.appendleft(bucket)
+        return bucket
+
+    def plants(self):
+        with self._lock:
+            return sorted({plant for plant, _ in self._series})
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def pick_resolution(self, start, end, max_points):
+        """
+        Finest resolution whose bucket count over [start, end] fits in max_points.
+        Falls back to the coarsest resolution if none does.
+        """
+        span = max(end - start, 0)
+        for name, width in RESOLUTIONS.items():
+            if span / width + 1 <= max_points:
+                return name
+        return list(RESOLUTIONS)[-1]
+
+    def _range(self, plant_id, resolution, start, end):
+        """Buckets in [start, end], walking back from the newest one"""
+        buckets = self._series.get((plant_id, resolution))
+        if not buckets:
+            return []
+        selected = []
+        for bucket in reversed(buckets):
+            if bucket[_START] < start:
+                break
+            if bucket[_START] <= end:
+                selected.append(bucket)
+        selected.reverse()
+        return selected
+
+    def query(self, start, end, max_points=500, plant_id=None, resolution=None):
+        """
+        Rollup points between two unix timestamps.
+        plant_id=None merges all plants bucket by bucket.
+        Returns: (resolution name, list of point dicts)
+        """
+        resolution, buckets = self.query_buckets(start, end, max_points, plant_id, resolution)
+        return resolution, [self._to_point(b) for b in buckets[-max_points:]]
+
+    def query_buckets(self, start, end, max_points=500, plant_id=None, resolution=None):
+        """Like query() but returns raw buckets, which merge_buckets() can combine across stores"""
+        resolution = resolution or self.pick_resolution(start, end, max_points)
+        width = RESOLUTIONS[resolution]
+        start = int(start // width) * width
+
+        with self._lock:
+            plants = [plant_id] if plant_id else {p for p, _ in self._series}
+            if len(plants) == 1:
+                buckets = [list(b) for b in self._range(next(iter(plants)), resolution, start, end)]
+            else:
+                buckets = merge_buckets(self._range(plant, resolution, start, end) for plant in plants)
+        return resolution, buckets
+
+    @staticmethod
+    def to_points(buckets, max_points=500):
+        """Point dicts for the newest max_points buckets"""
+        return [RollupStore._to_point(b) for b in buckets[-max_points:]]
+
+    @staticmethod
+    def _to_point(bucket):
+        count = bucket[_COUNT]
+        point = {
+            'timestamp': datetime.fromtimestamp(bucket[_START]).isoformat(),
+            'count': count,
+            'anomaly_count': bucket[_ANOMALIES],
+        }
+        i = _FIRST_METRIC
+        for metric in METRICS:
+            point[metric] = {
+                'min': round(bucket[i], 2),
+                'max': round(bucket[i + 1], 2),
+                'mean': round(bucket[i + 2] / count, 2) if count else None,
+            }
+            i += 3
+        return point
@@ -0,0 +1,221 @@
+"""
+Quantized-Grid Score Cache
+Memoizes anomaly model output for readings on a fixed decimal grid: the
+precision the Pi reports (0.01°C, 0.01% humidity, 0.0001 pH). Sensor values
+repeat constantly, so many readings can skip the forest entirely:
+- Bounded LRU of (label, decision score, attribution) per grid cell
+- Optional dense lookup table pre-computed over the operating envelope
+  (attribution kept to 1/255 there)
+- Readings off the grid are scored directly, never snapped, so the cache
+  cannot change a verdict; a coarser grid only lowers the hit rate
+- Invalidated whenever a different model is bound
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import config
+from forest_scorer import FEATURE_NAMES
+
+# Largest dense table prewarm() builds (~9 bytes per cell)
+MAX_LUT_CELLS = 64 * 1024 * 1024
+
+
+class ScoreCache:
+    """Cache in front of a ForestScorer; score() mirrors ForestScorer.score()"""
+
+    def __init__(self, resolution=config.SCORE_CACHE_RESOLUTION, max_entries=config.SCORE_CACHE_SIZE):
+        self.step = np.array([resolution[name] for name in FEATURE_NAMES], dtype=np.float64)
+        # Cells per unit: cell / per_unit gives back exactly the float round(x, decimals) gives
+        self.per_unit = np.rint(1.0 / self.step)
+        if not np.allclose(self.per_unit * self.step, 1.0):
+            raise ValueError(f"Score cache resolution must be 1/integer (e.g. 0.01): {resolution}")
+        self.max_entries = max_entries
+        self.forest = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._lut = None
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.hits = 0
+        self.lut_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def bind(self, forest):
+        """Use this scorer; cached results from any other model are discarded"""
+        with self._lock:
+            if forest is not self.forest:
+                self.forest = forest
+                self._entries.clear()
+                self._lut = None
+                self._reset_counters()
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._lut = None
+
+    def quantize(self, X):
+        """Nearest grid cell indices (N, 3) for raw readings"""
+        return np.rint(np.atleast_2d(np.asarray(X, dtype=np.float64)) * self.per_unit).astype(np.int64)
+
+    def values(self, cells):
+        """Readings (N, 3) at grid cells"""
+        return np.asarray(cells, dtype=np.float64) / self.per_unit
+
+    # ------------------------------------------------------------------
+    # Dense lookup table
+    # ------------------------------------------------------------------
+
+    def prewarm(self, envelope=config.SCORE_CACHE_ENVELOPE, batch_size=2048):
+        """
+        Score every grid cell inside envelope {feature: (low, high)} once and
+        keep the results in flat arrays; readings inside it never miss.
+        Returns the number of cells computed.
+        """
+        forest = self.forest
+        if forest is None:
+            raise RuntimeError("No model bound to the score cache")
+        lo = self.quantize([[envelope[name][0] for name in FEATURE_NAMES]])[0]
+        hi = self.quantize([[envelope[name][1] for name in FEATURE_NAMES]])[0]
+        shape = tuple(int(n) for n in hi - lo + 1)
+        cells = int(np.prod(shape))
+        if cells > MAX_LUT_CELLS:
+            print(f"⚠ Score cache pre-warm skipped: {cells} cells at this resolution "
+                  f"(limit {MAX_LUT_CELLS}); use a coarser SCORE_CACHE_RESOLUTION")
+            return 0
+
+        label = np.empty(cells, dtype=np.int8)
+        decision = np.empty(cells, dtype=np.float32)
+        attribution = np.empty((cells, len(FEATURE_NAMES)), dtype=np.uint8)
+
+        started = time.perf_counter()
+        for start in range(0, cells, batch_size):
+            idx = np.arange(start, min(start + batch_size, cells))
+            grid = np.column_stack(np.unravel_index(idx, shape)) + lo
+            result = forest.score(self.values(grid))
+            label[idx] = result['label']
+            decision[idx] = result['decision']
+            attribution[idx] = np.rint(result['attribution'] * 255)
+
+        with self._lock:
+            if forest is self.forest:
+                self._lut = {'lo': lo, 'shape': np.array(shape), 'label': label,
+                             'decision': decision, 'attribution': attribution}
+        print(f"✓ Score cache pre-warmed: {cells} cells in {time.perf_counter() - started:.1f}s "
+              f"({self._lut_bytes() / 1e6:.1f} MB)")
+        return cells
+
+    def _lut_bytes(self):
+        lut = self._lut
+        if lut is None:
+            return 0
+        return lut['label'].nbytes + lut['decision'].nbytes + lut['attribution'].nbytes
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def score(self, X):
+        """
+        Score raw readings (N, 3) through the cache.
+        Returns the same keys and values as ForestScorer.score(); readings
+        off the grid are passed straight to the model.
+        """
+        forest = self.forest
+        if forest is None:
+            raise RuntimeError("No model bound to the score cache")
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        q = self.quantize(X)
+        n = len(q)
+        label = np.empty(n, dtype=np.int64)
+        decision = np.empty(n, dtype=np.float64)
+        attribution = np.empty((n, len(FEATURE_NAMES)), dtype=np.float64)
+        on_grid = np.all(self.values(q) == X, axis=1)
+        pending = on_grid.copy()
+
+        off_grid = np.flatnonzero(~on_grid)
+        if len(off_grid):
+            result = forest.score(X[off_grid])
+            label[off_grid] = result['label']
+            decision[off_grid] = result['decision']
+            attribution[off_grid] = result['attribution']
+
+        with self._lock:
+            lut = self._lut
+            if lut is not None:
+                offset = q - lut['lo']
+                inside = on_grid & np.all((offset >= 0) & (offset < lut['shape']), axis=1)
+                if inside.any():
+                    flat = np.ravel_multi_index(offset[inside].T, tuple(lut['shape']))
+                    label[inside] = lut['label'][flat]
+                    decision[inside] = lut['decision'][flat]
+                    attribution[inside] = lut['attribution'][flat] / 255.0
+                    pending &= ~inside
+                    self.lut_hits += int(inside.sum())
+
+            missing = {}
+            for i in np.flatnonzero(pending):
+                key = tuple(q[i].tolist())
+                entry = self._entries.get(key)
+                if entry is None:
+                    missing.setdefault(key, []).append(i)
+                    continue
+                self._entries.move_to_end(key)
+                label[i], decision[i] = entry[0], entry[1]
+                attribution[i] = entry[2:]
+                self.hits += 1
+
+        with self._lock:
+            self.bypassed += len(off_grid)
+        if missing:
+            keys = list(missing)
+            result = forest.score(self.values(keys))
+            with self._lock:
+                self.misses += sum(len(rows) for rows in missing.values())
+                for j, key in enumerate(keys):
+                    entry = (int(result['label'][j]), float(result['decision'][j]),
+                             *result['attribution'][j].tolist())
+                    for i in missing[key]:
+                        label[i], decision[i] = entry[0], entry[1]
+                        attribution[i] = entry[2:]
+                    if forest is self.forest:
+                        self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return {
+            'raw': decision + forest.offset,
+            'decision': decision,
+            'label': label,
+            'attribution': attribution,
+        }
+
+    def stats(self):
+        """Hit rate and approximate memory use"""
+        with self._lock:
+            lookups = self.hits + self.lut_hits + self.misses + self.bypassed
+            entries = len(self._entries)
+            entry_bytes = 0
+            if entries:
+                key, value = next(iter(self._entries.items()))
+                entry_bytes = (sys.getsizeof(key) + sum(sys.getsizeof(k) for k in key) +
+                               sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value) + 100)
+            return {
+                'entries': entries,
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'lut_hits': self.lut_hits,
+                'misses': self.misses,
+                'bypassed': self.bypassed,
+                'hit_rate': round((self.hits + self.lut_hits) / lookups, 4) if lookups else 0.0,
+                'lru_bytes': entries * entry_bytes,
+                'lut_bytes': self._lut_bytes(),
+                'resolution': dict(zip(FEATURE_NAMES, self.step.tolist())),
+            }
@@ -0,0 +1,287 @@
+"""
+Append-Only Sensor Log
+Replaces the single logs/sensor_history.json array with rotated JSONL segments:
+- One compact JSON line per reading, buffered writes, periodic fsync (also
+  while idle, from a background thread)
+- Rotation by size or age; closed segments are gzip-compressed, including
+  ones a previous run left uncompressed (compress_stale at startup)
+- Streaming reader across segments with time-range filtering
+- One-time import of the old sensor_history.json (remembered in a marker file)
+
+One writer per prefix: app.py writes 'readings', main.py 'sensor_history'.
+
+Usage:
+    python sensor_log.py import [logs/sensor_history.json] [--force]
+    python sensor_log.py cat [--since 2026-02-16T13:00] [--until 2026-02-16T14:00]
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+
+import config
+
+SEGMENT_RE = re.compile(r'-(\d{8}-\d{6})-(\d+)\.jsonl(\.gz)?$')
+
+
+def _record_time(record):
+    """Reading time of a log record (main.py payloads and app.py readings both work)"""
+    try:
+        return datetime.fromisoformat(record['timestamp'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class SensorLogWriter:
+    """Buffered JSONL writer with size/time rotation and background compression"""
+
+    def __init__(self, prefix='sensor_history', log_dir=config.SENSOR_LOG_DIR,
+                 max_bytes=config.SENSOR_LOG_MAX_BYTES,
+                 max_age=config.SENSOR_LOG_MAX_AGE,
+                 fsync_interval=config.SENSOR_LOG_FSYNC_INTERVAL,
+                 compress=True):
+        self.prefix = prefix
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.fsync_interval = fsync_interval
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._opened_at = 0.0
+        self._last_sync = 0.0
+        self._dirty = False
+        self._counter = 0
+        self._compressing = []
+        self._stop = threading.Event()
+        self._syncer = None
+        os.makedirs(log_dir, exist_ok=True)
+
+    def _open_segment(self, start=None):
+        start = start or datetime.now()
+        while True:
+            # Never append to a segment left by another run started in the same second
+            self._counter += 1
+            name = f"{self.prefix}-{start:%Y%m%d-%H%M%S}-{self._counter:04d}.jsonl"
+            self._path = os.path.join(self.log_dir, name)
+            if not os.path.exists(self._path) and not os.path.exists(self._path + '.gz'):
+                break
+        self._file = open(self._path, 'ab', buffering=64 * 1024)
+        self._opened_at = time.monotonic()
+        self._last_sync = self._opened_at
+        if self._syncer is None:
+            self._syncer = threading.Thread(target=self._sync_loop, name=f'{self.prefix}-fsync',
+                                            daemon=True)
+            self._syncer.start()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+        self._dirty = False
+
+    def _compress_later(self, path):
+        thread = threading.Thread(target=_compress_segment, args=(path,), daemon=True)
+        thread.start()
+        self._compressing = [t for t in self._compressing if t.is_alive()] + [thread]
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        self._sync()
+        self._file.close()
+        path, self._file, self._path = self._path, None, None
+        if self.compress and os.path.getsize(path) > 0:
+            self._compress_later(path)
+
+    def _sync_loop(self):
+        """Background fsync, so buffered readings reach disk when writes stop too"""
+        while not self._stop.wait(self.fsync_interval):
+            with self._lock:
+                if self._file is None:
+                    continue
+                if time.monotonic() - self._opened_at >= self.max_age:
+                    self._close_segment()
+                elif self._dirty:
+                    self._sync()
+
+    def write(self, record, when=None):
+        """Append one record (when: datetime used to name a new segment, default now)"""
+        line = json.dumps(record, separators=(',', ':'), ensure_ascii=False).encode('utf-8') + b'\n'
+        with self._lock:
+            now = time.monotonic()
+            if self._file is not None and (self._file.tell() >= self.max_bytes or
+                                           now - self._opened_at >= self.max_age):
+                self._close_segment()
+            if self._file is None:
+                self._open_segment(when)
+            self._file.write(line)
+            self._dirty = True
+            if now - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+
+    def compress_stale(self):
+        """
+        Compress this prefix's uncompressed segments other than the active one
+        (left by a run that stopped before rotating); call once at startup.
+        Returns the number queued for compression.
+        """
+        if not self.compress:
+            return 0
+        with self._lock:
+            stale = [path for _, path in list_segments(self.prefix, self.log_dir)
+                     if not path.endswith('.gz') and path != self._path
+                     and os.path.getsize(path) > 0]
+            for path in stale:
+                self._compress_later(path)
+        return len(stale)
+
+    def close(self):
+        """Close the active segment and wait for pending compression"""
+        self._stop.set()
+        if self._syncer is not None:
+            self._syncer.join()
+        with self._lock:
+            # A later write starts a new segment and sync thread
+            self._syncer = None
+            self._stop.clear()
+            self._close_segment()
+            pending, self._compressing = self._compressing, []
+        for thread in pending:
+            thread.join()
+
+
+def _compress_segment(path):
+    """gzip a closed segment, then remove the plain file"""
+    try:
+        with open(path, 'rb') as src, gzip.open(path + '.gz.tmp', 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(path + '.gz.tmp', path + '.gz')
+        os.remove(path)
+    except OSError as e:
+        print(f"✗ Could not compress {path}: {e}")
+
+
+def list_segments(prefix='sensor_history', log_dir=config.SENSOR_LOG_DIR):
+    """Segment paths in chronological order (plain or compressed)"""
+    segments = []
+    for path in glob.glob(os.path.join(log_dir, f"{prefix}-*.jsonl*")):
+        match = SEGMENT_RE.search(path)
+        if match and not path.endswith('.tmp'):
+            started = datetime.strptime(match.group(1), '%Y%m%d-%H%M%S')
+            segments.append((started, int(match.group(2)), path))
+    segments.sort()
+    # While compression runs both forms can exist for a moment; keep one
+    seen, ordered = set(), []
+    for started, counter, path in segments:
+        base = path[:-3] if path.endswith('.gz') else path
+        if base not in seen:
+            seen.add(base)
+            ordered.append((started, path))
+    return ordered
+
+
+def read_log(since=None, until=None, prefix='sensor_history', log_dir=config.SENSOR_LOG_DIR):
+    """
+    Iterate records across all segments, oldest first.
+    since/until are datetimes; segments that start after `until`, or end
+    (i.e. the next one starts) before `since`, are skipped without reading.
+    """
+    segments = list_segments(prefix, log_dir)
+    for i, (started, path) in enumerate(segments):
+        if until is not None and started > until:
+            break
+        next_start = segments[i + 1][0] if i + 1 < len(segments) else None
+        if since is not None and next_start is not None and next_start < since:
+            continue
+
+        try:
+            f = open(path, 'rb') if not path.endswith('.gz') else gzip.open(path, 'rb')
+        except FileNotFoundError:
+            # Compressed between listing and opening
+            if path.endswith('.gz'):
+                continue
+            f = gzip.open(path + '.gz', 'rb')
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn final line after a crash
+                if since is not None or until is not None:
+                    when = _record_time(record)
+                    if when is None:
+                        continue
+                    if since is not None and when < since:
+                        continue
+                    if until is not None and when > until:
+                        continue
+                yield record
+
+
+def import_marker(prefix='sensor_history', log_dir=config.SENSOR_LOG_DIR):
+    """File recording that the old JSON history was imported into this prefix"""
+    return os.path.join(log_dir, f"{prefix}.imported")
+
+
+def import_history(path='logs/sensor_history.json', prefix='sensor_history',
+                   log_dir=config.SENSOR_LOG_DIR):
+    """
+    One-time conversion of the old JSON array file into log segments. They
+    are named after their records' times, so they sort before the segments
+    written since. Leaves a marker so the import is not repeated.
+    """
+    with open(path, encoding='utf-8') as f:
+        records = json.load(f)
+    if records:
+        writer = SensorLogWriter(prefix, log_dir)
+        for record in records:
+            writer.write(record, when=_record_time(record))
+        writer.close()
+    with open(import_marker(prefix, log_dir), 'w', encoding='utf-8') as f:
+        json.dump({'source': os.path.abspath(path), 'records': len(records),
+                   'imported_at': datetime.now().isoformat(timespec='seconds')}, f)
+    return len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sensor JSONL log tools")
+    sub = parser.add_subparsers(dest='command', required=True)
+    imp = sub.add_parser('import', help="Import the old sensor_history.json array")
+    imp.add_argument('path', nargs='?', default='logs/sensor_history.json')
+    imp.add_argument('--prefix', default='sensor_history')
+    imp.add_argument('--force', action='store_true', help="Import again even if already imported")
+    cat = sub.add_parser('cat', help="Print records as JSON lines")
+    cat.add_argument('--since', type=datetime.fromisoformat)
+    cat.add_argument('--until', type=datetime.fromisoformat)
+    cat.add_argument('--prefix', default='sensor_history')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        marker = import_marker(args.prefix)
+        if os.path.exists(marker) and not args.force:
+            print(f"⚠ Already imported ({marker}); import skipped (--force to import again)")
+            return
+        count = import_history(args.path, args.prefix)
+        print(f"✓ Imported {count} records from {args.path}")
+    else:
+        for record in read_log(args.since, args.until, args.prefix):
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Compact Binary Sensor Protocol
+Fixed-layout packed records sent in frames over a persistent TCP connection.
+Used by raspberry_pi_sensor.py (encoding) and app.py (decoding).
+
+Frame:   header <4s B B H>  magic b'AGRB', version, reserved, record count
+         followed by `count` packed records (RECORD_SIZE bytes each)
+Record:  <I d f f f 16s>    device seq, unix timestamp, temperature, humidity, pH, plant id
+Ack:     <4s B B I>         magic, status (0 = ok), retry-after seconds (busy only),
+                            server cursor after the frame
+A frame the server's admission control can never accept is answered
+ACK_TOO_LARGE; the sender halves its frame size and sends again.
+Plant ids longer than PLANT_ID_SIZE bytes (UTF-8) are refused rather than
+truncated, which would merge plants sharing a 16-byte prefix.
+"""
+
+import random
+import socket
+import struct
+import time
+
+MAGIC = b'AGRB'
+VERSION = 1
+MAX_RECORDS_PER_FRAME = 65535
+PLANT_ID_SIZE = 16  # bytes of UTF-8, NUL padded
+
+HEADER = struct.Struct('<4sBBH')
+RECORD = struct.Struct('<Idfff16s')
+ACK = struct.Struct('<4sBBI')
+
+RECORD_SIZE = RECORD.size  # 40 bytes vs ~90 bytes of JSON per reading
+
+ACK_OK = 0
+ACK_BAD_FRAME = 1
+ACK_SERVER_ERROR = 2
+ACK_BUSY = 3
+ACK_TOO_LARGE = 4
+
+
+class ProtocolError(ValueError):
+    """Raised when a frame is malformed"""
+
+
+class ServerBusy(Exception):
+    """Server turned a frame away under load; retry after `retry_after` seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Server busy, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def check_plant_id(plant_id):
+    """The plant id as record bytes; ProtocolError if it does not fit"""
+    encoded = plant_id.encode('utf-8')
+    if len(encoded) > PLANT_ID_SIZE:
+        raise ProtocolError(f"Plant id {plant_id!r} is {len(encoded)} bytes, "
+                            f"the binary protocol carries {PLANT_ID_SIZE} (use JSON)")
+    return encoded
+
+
+def record_dtype():
+    """NumPy dtype matching RECORD, so a frame body decodes with one frombuffer call"""
+    import numpy as np
+    return np.dtype([
+        ('seq', '<u4'),
+        ('timestamp', '<f8'),
+        ('temperature', '<f4'),
+        ('humidity', '<f4'),
+        ('ph', '<f4'),
+        ('plant_id', f'S{PLANT_ID_SIZE}'),
+    ])
+
+
+def encode_frame(records):
+    """
+    Pack readings into one frame.
+    records: iterable of (seq, timestamp, temperature, humidity, ph, plant_id)
+    Raises ProtocolError for a plant id over PLANT_ID_SIZE bytes.
+    """
+    records = list(records)
+    if len(records) > MAX_RECORDS_PER_FRAME:
+        raise ProtocolError(f"Too many records for one frame: {len(records)}")
+    body = b''.join(
+        RECORD.pack(seq & 0xFFFFFFFF, ts, temp, hum, ph, check_plant_id(plant_id))
+        for seq, ts, temp, hum, ph, plant_id in records
+    )
+    return HEADER.pack(MAGIC, VERSION, 0, len(records)) + body
+
+
+def parse_header(data):
+    """Validate a frame header and return the number of records that follow"""
+    if len(data) != HEADER.size:
+        raise ProtocolError("Truncated frame header")
+    magic, version, _, count = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ProtocolError("Bad frame magic")
+    if version != VERSION:
+        raise ProtocolError(f"Unsupported protocol version {version}")
+    return count
+
+
+def decode_frame(payload):
+    """Decode a complete frame into a NumPy structured array (zero-copy view)"""
+    import numpy as np
+    count = parse_header(payload[:HEADER.size])
+    body = payload[HEADER.size:]
+    if len(body) != count * RECORD_SIZE:
+        raise ProtocolError(f"Frame body is {len(body)} bytes, expected {count * RECORD_SIZE}")
+    return np.frombuffer(body, dtype=record_dtype(), count=count)
+
+
+def read_frame(stream):
+    """Read one frame from a file-like stream; returns None on a clean EOF"""
+    header = stream.read(HEADER.size)
+    if not header:
+        return None
+    count = parse_header(header)
+    body = stream.read(count * RECORD_SIZE)
+    if len(body) != count * RECORD_SIZE:
+        raise ProtocolError("Connection closed mid-frame")
+    return header + body
+
+
+# ============================================================================
+# CLIENT
+# ============================================================================
+
+class BinaryFrameSender:
+    """
+    Buffers readings and ships them as frames over one persistent TCP connection.
+    Reconnects on demand; unsent readings stay buffered until a send succeeds.
+    """
+
+    def __init__(self, host, port, max_records=30, max_delay=30.0, timeout=5.0, max_pending=10000):
+        self.host = host
+        self.port = port
+        self.max_records = max_records
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.dropped = 0
+        self.sock = None
+        self.stream = None
+        self.pending = []
+        self.oldest_pending = None
+        self.next_seq = 1
+        self.frame_limit = MAX_RECORDS_PER_FRAME  # lowered when the server says ACK_TOO_LARGE
+        self.last_cursor = None
+        self.failures = 0       # consecutive failed flushes
+        self.retry_at = 0.0     # no flush is due before this (monotonic)
+
+    def add(self, temperature, humidity, ph, plant_id, timestamp=None):
+        """
+        Queue one reading; returns its device sequence number.
+        Raises ProtocolError (nothing queued) if the plant id is too long.
+        """
+        check_plant_id(plant_id)
+        seq = self.next_seq
+        self.next_seq += 1
+        if not self.pending:
+            self.oldest_pending = time.monotonic()
+        elif len(self.pending) >= self.max_pending:
+            # Long outage: keep the newest readings, bounded
+            self.pending.pop(0)
+            self.dropped += 1
+        self.pending.append((seq, timestamp or time.time(), temperature, humidity, ph, plant_id))
+        return seq
+
+    def due(self):
+        """True when the buffer is full or the oldest reading has waited long enough"""
+        if not self.pending or time.monotonic() < self.retry_at:
+            return False
+        return (len(self.pending) >= self.max_records or
+                time.monotonic() - self.oldest_pending >= self.max_delay)
+
+    def _back_off(self, retry_after=None):
+        """Hold off the next flush: the server's hint, else exponential; jittered"""
+        self.failures += 1
+        base = retry_after or min(60, 2 ** self.failures)
+        self.retry_at = time.monotonic() + base + random.uniform(0, base / 2)
+
+    def _connect(self):
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.sock.makefile('rb')
+
+    def close(self):
+        if self.stream:
+            self.stream.close()
+        if self.sock:
+            self.sock.close()
+        self.sock = None
+        self.stream = None
+
+    def flush(self):
+        """
+        Send buffered readings as one frame (at most frame_limit) and wait for
+        the ack. Returns the number of readings delivered; raises OSError on
+        failure or ServerBusy when the server is shedding load (the readings
+        stay buffered for the next attempt).
+        """
+        if not self.pending:
+            return 0
+        batch = self.pending[:self.frame_limit]
+        frame = encode_frame(batch)
+        try:
+            if self.sock is None:
+                self._connect()
+            self.sock.sendall(frame)
+            ack = self.stream.read(ACK.size)
+            if len(ack) != ACK.size:
+                raise ConnectionError("Server closed connection before ack")
+            magic, status, retry_after, cursor = ACK.unpack(ack)
+            if magic != MAGIC or status not in (ACK_OK, ACK_BUSY, ACK_TOO_LARGE):
+                raise ConnectionError(f"Server rejected frame (status {status})")
+        except (OSError, ConnectionError):
+            self.close()
+            self._back_off()
+            raise
+        if status == ACK_TOO_LARGE:
+            if len(batch) == 1:
+                self.close()
+                self._back_off()
+                raise ConnectionError("Server rejected a single-reading frame as too large")
+            # Nothing was stored: split the frame and send again
+            self.frame_limit = len(batch) // 2
+            return self.flush()
+        if status == ACK_BUSY:
+            # The connection stays usable; the readings stay buffered
+            self._back_off(retry_after)
+            raise ServerBusy(retry_after)
+
+        self.failures = 0
+        self.retry_at = 0.0
+        self.last_cursor = cursor
+        del self.pending[:len(batch)]
+        self.oldest_pending = time.monotonic() if self.pending else None
+        return len(batch)
@@ -0,0 +1,218 @@
+"""
+Shadow Model Scoring
+Scores live readings with candidate models (config.SHADOW_MODELS) next to the
+serving model, to see how a retrained model would behave before promoting it:
+- Ingestion only hands each stored batch to a bounded queue; worker
+  processes score it with every candidate, so candidates never run on the
+  request path (nor compete with it for the GIL)
+- When the queue is full the batch is dropped and counted, never backlogged
+- Batches the serving side scored with the rule-based fallback (no model
+  loaded) are skipped and counted: they are no baseline to compare against
+- Per candidate: how often its verdict agrees with the serving model's, and
+  a t-digest of decision-score deltas (candidate - serving; negative means
+  the candidate finds the reading more anomalous)
+"""
+
+import multiprocessing
+import queue
+import threading
+import traceback
+
+import numpy as np
+
+import config
+from forest_scorer import load_scorer
+from quantiles import TDigest
+
+_DELTA_QUANTILES = (0.05, 0.5, 0.95)
+
+
+def load_candidate(spec):
+    """
+    A candidate model as a ForestScorer. spec: an exported .npz, a sklearn
+    model .pkl (with config.SCALER_FILE) or a (model .pkl, scaler .pkl) pair
+    """
+    if isinstance(spec, str) and spec.endswith('.npz'):
+        return load_scorer(None, None, export_path=spec)
+    model_path, scaler_path = (spec, config.SCALER_FILE) if isinstance(spec, str) else spec
+    return load_scorer(model_path, scaler_path, export_path=None)
+
+
+def _worker(models, max_rows, inbox, outbox):
+    """Worker process: score queued batches with every candidate, send back the comparisons"""
+    candidates = {}
+    for name, spec in models.items():
+        try:
+            candidates[name] = load_candidate(spec)
+            outbox.put(('loaded', name, None))
+        except Exception as e:
+            outbox.put(('error', name, f"failed to load {spec}: {e}"))
+
+    stopping = False
+    while not stopping:
+        item = inbox.get()
+        if item is None:
+            return
+        # Coalesce whatever else is waiting into one scoring pass
+        batches = [item]
+        rows = len(item[1])
+        while rows < max_rows:
+            try:
+                item = inbox.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                stopping = True  # exit after this pass
+                break
+            batches.append(item)
+            rows += len(item[1])
+        features = np.concatenate([b[0] for b in batches])
+        serving_anomaly = np.concatenate([b[1] for b in batches])
+        serving_decision = np.concatenate([b[2] for b in batches])
+
+        for name, candidate in candidates.items():
+            try:
+                result = candidate.score(features, explain=False)
+            except Exception:
+                outbox.put(('error', name, traceback.format_exc(limit=3)))
+                continue
+            anomaly = result['label'] == -1
+            deltas = result['decision'] - serving_decision
+            digest = TDigest()
+            for delta in deltas.tolist():
+                digest.add(delta)
+            outbox.put(('scored', name, {
+                'scored': len(anomaly),
+                'agree_normal': int((~anomaly & ~serving_anomaly).sum()),
+                'agree_anomaly': int((anomaly & serving_anomaly).sum()),
+                'candidate_only': int((anomaly & ~serving_anomaly).sum()),
+                'serving_only': int((~anomaly & serving_anomaly).sum()),
+                'delta_sum': float(deltas.sum()),
+                'abs_delta_sum': float(np.abs(deltas).sum()),
+                'digest': digest,
+            }))
+
+
+class ShadowScorer:
+    """Bounded hand-off to shadow worker processes, plus the comparison totals they report"""
+
+    def __init__(self, models=config.SHADOW_MODELS, workers=config.SHADOW_WORKERS,
+                 queue_size=config.SHADOW_QUEUE_SIZE, max_rows=config.SHADOW_MAX_ROWS,
+                 start_method=None):
+        self.models = dict(models)
+        context = multiprocessing.get_context(start_method)
+        self.inbox = context.Queue(maxsize=queue_size)
+        self.outbox = context.Queue()
+        self._lock = threading.Lock()
+        self.counts = {'submitted': 0, 'dropped': 0, 'skipped_no_model': 0}
+        self.candidates = {name: self._new_totals() for name in self.models}
+
+        self._workers = [
+            context.Process(target=_worker, args=(self.models, max_rows, self.inbox, self.outbox),
+                            name=f'shadow-{i}', daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+        self._collector = threading.Thread(target=self._collect, name='shadow-collector', daemon=True)
+        self._collector.start()
+
+    @staticmethod
+    def _new_totals():
+        return {'status': 'loading', 'error': None, 'scored': 0,
+                'agree_normal': 0, 'agree_anomaly': 0, 'candidate_only': 0, 'serving_only': 0,
+                'delta_sum': 0.0, 'abs_delta_sum': 0.0, 'digest': TDigest()}
+
+    # ------------------------------------------------------------------
+    # Ingestion side (must never block)
+    # ------------------------------------------------------------------
+
+    def submit(self, features, serving_anomaly, serving_decision):
+        """
+        Queue a stored batch for shadow scoring: (N, 3) raw features, the
+        serving model's verdicts and decision scores. Returns False if dropped.
+        """
+        with self._lock:
+            try:
+                self.inbox.put_nowait((np.asarray(features, dtype=np.float64),
+                                       np.asarray(serving_anomaly, dtype=bool),
+                                       np.asarray(serving_decision, dtype=np.float64)))
+            except queue.Full:
+                self.counts['dropped'] += len(serving_anomaly)
+                return False
+            self.counts['submitted'] += len(serving_anomaly)
+        return True
+
+    def skip(self, count):
+        """Count readings not submitted because no serving model scored them"""
+        with self._lock:
+            self.counts['skipped_no_model'] += count
+
+    # ------------------------------------------------------------------
+    # Results
+    # ------------------------------------------------------------------
+
+    def _collect(self):
+        while True:
+            try:
+                kind, name, payload = self.outbox.get()
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                totals = self.candidates[name]
+                if kind == 'loaded':
+                    totals['status'] = 'scoring'
+                elif kind == 'error':
+                    print(f"✗ Shadow model {name}: {payload}")
+                    if totals['status'] == 'loading':
+                        totals['status'] = 'failed'
+                    totals['error'] = payload
+                else:
+                    for key in ('scored', 'agree_normal', 'agree_anomaly', 'candidate_only',
+                                'serving_only', 'delta_sum', 'abs_delta_sum'):
+                        totals[key] += payload[key]
+                    totals['digest'] = TDigest.merged([totals['digest'], payload['digest']])
+
+    def stats(self):
+        with self._lock:
+            try:
+                pending = self.inbox.qsize()
+            except NotImplementedError:  # macOS
+                pending = None
+            candidates = {}
+            for name, totals in self.candidates.items():
+                scored = totals['scored']
+                disagree = totals['candidate_only'] + totals['serving_only']
+                p5, p50, p95 = totals['digest'].quantiles(_DELTA_QUANTILES)
+                candidates[name] = {
+                    'model': str(self.models[name]),
+                    'status': totals['status'],
+                    'error': totals['error'],
+                    'scored': scored,
+                    'agreement': round(1 - disagree / scored, 4) if scored else None,
+                    'agree_normal': totals['agree_normal'],
+                    'agree_anomaly': totals['agree_anomaly'],
+                    'candidate_only': totals['candidate_only'],
+                    'serving_only': totals['serving_only'],
+                    'score_delta': {
+                        'mean': round(totals['delta_sum'] / scored, 4) if scored else None,
+                        'mean_abs': round(totals['abs_delta_sum'] / scored, 4) if scored else None,
+                        'p5': round(p5, 4) if p5 is not None else None,
+                        'p50': round(p50, 4) if p50 is not None else None,
+                        'p95': round(p95, 4) if p95 is not None else None,
+                    },
+                }
+            return dict(self.counts, enabled=True, pending_batches=pending,
+                        workers=sum(w.is_alive() for w in self._workers), candidates=candidates)
+
+    def close(self, timeout=5):
+        """Stop the workers (queued batches are abandoned)"""
+        for _ in self._workers:
+            try:
+                self.inbox.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        for worker in self._workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
@@ -0,0 +1,197 @@
+"""
+Plant-Sharded Ingestion
+Spreads plants over worker processes so ingestion and scoring use every core:
+- Consistent hashing of plant_id onto shards (adding a shard moves ~1/N plants)
+- Each shard process owns its plants' buffers, rollups, detectors and model
+- The front process routes single-plant calls and fans out cross-plant ones
+With one shard the operations simply run in the calling process.
+"""
+
+import bisect
+import hashlib
+import multiprocessing
+import threading
+import traceback
+from contextlib import ExitStack
+
+
+class ShardError(RuntimeError):
+    """A shard operation failed or the worker process died"""
+
+
+def _hash(key):
+    """Stable 64-bit hash (same in every process, unlike hash())"""
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes per shard"""
+
+    def __init__(self, shard_count, replicas=160):
+        self.shard_count = shard_count
+        points = sorted(
+            (_hash(f"shard-{shard}-{replica}"), shard)
+            for shard in range(shard_count)
+            for replica in range(replicas)
+        )
+        self._hashes = [h for h, _ in points]
+        self._shards = [s for _, s in points]
+        self._cache = {}
+
+    def shard_for(self, plant_id):
+        shard = self._cache.get(plant_id)
+        if shard is None:
+            idx = bisect.bisect(self._hashes, _hash(str(plant_id))) % len(self._hashes)
+            shard = self._shards[idx]
+            if len(self._cache) < 100000:
+                self._cache[plant_id] = shard
+        return shard
+
+
+def serve(conn, ops):
+    """Worker loop: answer (op, args) requests with ('ok', result) or ('error', message)"""
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if request is None:
+            return
+        op, args = request
+        try:
+            conn.send(('ok', ops[op](*args)))
+        except Exception as e:
+            traceback.print_exc()
+            conn.send(('error', f"{op}: {e}"))
+
+
+class _LocalShard:
+    """Runs shard operations in the calling process"""
+
+    def __init__(self, ops):
+        self.ops = ops
+        self.lock = threading.Lock()
+        self._result = None
+
+    def send(self, op, *args):
+        try:
+            self._result = ('ok', self.ops[op](*args))
+        except Exception as e:
+            self._result = ('error', f"{op}: {e}")
+
+    def recv(self):
+        status, result = self._result
+        self._result = None
+        if status != 'ok':
+            raise ShardError(result)
+        return result
+
+    def close(self):
+        pass
+
+
+class _ProcessShard:
+    """One worker process and the pipe to it"""
+
+    def __init__(self, index, worker, context):
+        self.lock = threading.Lock()
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=worker, args=(index, child),
+                                       name=f'shard-{index}', daemon=True)
+        self.process.start()
+        child.close()
+
+    def send(self, op, *args):
+        try:
+            self.conn.send((op, args))
+        except (OSError, ValueError) as e:
+            raise ShardError(f"{self.process.name} unavailable: {e}")
+
+    def recv(self):
+        try:
+            status, result = self.conn.recv()
+        except (EOFError, OSError) as e:
+            raise ShardError(f"{self.process.name} died: {e!r}")
+        if status != 'ok':
+            raise ShardError(result)
+        return result
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class ShardPool:
+    """
+    shard_count worker processes, each running worker(index, conn), which is
+    expected to set up its state and call serve(conn, ops). A shard handles one
+    request at a time; callers hold its lock for the whole send/recv exchange.
+    """
+
+    def __init__(self, shard_count, worker, ops, start_method=None):
+        self.shard_count = max(1, int(shard_count))
+        self.ring = HashRing(self.shard_count)
+        if self.shard_count == 1:
+            self._shards = [_LocalShard(ops)]
+        else:
+            context = multiprocessing.get_context(start_method)
+            self._shards = [_ProcessShard(i, worker, context) for i in range(self.shard_count)]
+
+    @property
+    def in_process(self):
+        return self.shard_count == 1
+
+    def shard_for(self, plant_id):
+        return self.ring.shard_for(plant_id)
+
+    def locked(self, indexes):
+        """Hold the locks of several shards (always taken in index order)"""
+        stack = ExitStack()
+        for index in sorted(set(indexes)):
+            stack.enter_context(self._shards[index].lock)
+        return stack
+
+    def call(self, index, op, *args):
+        """Run one operation on one shard"""
+        with self._shards[index].lock:
+            return self.scatter({index: (op, args)})[index]
+
+    def scatter(self, requests):
+        """
+        Run {shard index: (op, args)} concurrently; caller holds those shards'
+        locks (see locked()). Returns {shard index: result}.
+        """
+        sent, error = [], None
+        for index, (op, args) in requests.items():
+            try:
+                self._shards[index].send(op, *args)
+                sent.append(index)
+            except ShardError as e:
+                error = error or e
+        # Drain every reply even after a failure so no pipe is left out of step
+        results = {}
+        for index in sent:
+            try:
+                results[index] = self._shards[index].recv()
+            except ShardError as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return results
+
+    def broadcast(self, op, *args):
+        """Run an operation on every shard concurrently; results in shard order"""
+        indexes = range(self.shard_count)
+        with self.locked(indexes):
+            results = self.scatter({index: (op, args) for index in indexes})
+        return [results[index] for index in indexes]
+
+    def close(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.close()
@@ -0,0 +1,353 @@
+"""
+Incremental Google Sheets Mirror
+Keeps a local columnar copy of the datasheet (sheet_mirror.npz) so readers
+don't download the whole sheet on every run:
+- Each sync fetches only the rows after the last synced row, plus a few
+  already-synced rows whose checksum must still match (catches inserted,
+  deleted or edited rows near the end); a mismatch triggers a full resync
+- A full resync also runs every SHEET_MIRROR_FULL_SYNC seconds, to pick up
+  edits further back
+- Numeric columns are stored as float64, the rest as strings (dataframe()
+  gives whole-number columns back as integers)
+- FakeWorksheet stands in for a gspread worksheet in tests and offline runs
+
+Usage:
+    python sheet_mirror.py sync [--full]           # sync from the Google Sheet
+    python sheet_mirror.py sync --fake data.csv    # sync from a CSV via FakeWorksheet
+    python sheet_mirror.py status
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+import config
+
+
+def _column_letter(index):
+    """1 -> 'A', 27 -> 'AA'"""
+    letters = ''
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord('A') + rem) + letters
+    return letters
+
+
+def _checksum(rows):
+    digest = hashlib.blake2b(digest_size=16)
+    for row in rows:
+        digest.update('\x1f'.join(row).encode('utf-8'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+def _to_column(values):
+    """float64 array if every non-empty value is numeric, else a string array"""
+    try:
+        return np.array([float(v) if v != '' else np.nan for v in values], dtype=np.float64)
+    except ValueError:
+        return np.array(values, dtype=np.str_)
+
+
+def _format_number(value):
+    return '' if np.isnan(value) else f"{value:.15g}"
+
+
+def _concat(old, new):
+    """Append a column chunk, falling back to strings when the types disagree"""
+    if old.dtype.kind == new.dtype.kind:
+        return np.concatenate([old, new])
+    if old.dtype.kind == 'f':
+        old = np.array([_format_number(v) for v in old], dtype=np.str_)
+    if new.dtype.kind == 'f':
+        new = np.array([_format_number(v) for v in new], dtype=np.str_)
+    return np.concatenate([old, new])
+
+
+class SheetMirror:
+    """Local columnar copy of a worksheet, brought up to date with sync()"""
+
+    def __init__(self, worksheet=None, path=config.SHEET_MIRROR_FILE,
+                 overlap=config.SHEET_MIRROR_OVERLAP, full_sync_interval=config.SHEET_MIRROR_FULL_SYNC):
+        self.worksheet = worksheet
+        self.path = path
+        self.overlap = overlap
+        self.full_sync_interval = full_sync_interval
+        self.header = []
+        self.columns = {}
+        self.row_count = 0
+        self.tail_checksum = None   # checksum of the last `overlap` synced rows
+        self.last_full_sync = 0.0
+        self.last_sync = 0.0
+        self.load()
+
+    # ------------------------------------------------------------------
+    # Cache file
+    # ------------------------------------------------------------------
+
+    def load(self):
+        """Read the cache file if there is one; returns True if it was loaded"""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                self.columns = {name: data[f'col{i}'] for i, name in enumerate(meta['header'])}
+        except Exception as e:
+            print(f"⚠ Ignoring unreadable sheet mirror {self.path}: {e}")
+            return False
+        self.header = meta['header']
+        self.row_count = meta['row_count']
+        self.tail_checksum = meta['tail_checksum']
+        self.last_full_sync = meta['last_full_sync']
+        self.last_sync = meta['last_sync']
+        return True
+
+    def save(self):
+        meta = {
+            'header': self.header,
+            'row_count': self.row_count,
+            'tail_checksum': self.tail_checksum,
+            'last_full_sync': self.last_full_sync,
+            'last_sync': self.last_sync,
+        }
+        arrays = {f'col{i}': self.columns[name] for i, name in enumerate(self.header)}
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, self.path)
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    def _pad(self, rows):
+        width = len(self.header)
+        return [[str(v) for v in row[:width]] + [''] * (width - len(row)) for row in rows]
+
+    def _tail_rows(self):
+        """Last `overlap` synced rows as strings, in the form _normalize() produces"""
+        start = max(self.row_count - self.overlap, 0)
+        rows = [[] for _ in range(start, self.row_count)]
+        for name in self.header:
+            column = self.columns[name][start:self.row_count]
+            values = ([_format_number(v) for v in column] if column.dtype.kind == 'f'
+                      else column.tolist())
+            for row, value in zip(rows, values):
+                row.append(value)
+        return rows
+
+    def _normalize(self, rows):
+        """Sheet values as they would read back from the cached columns ('33.40' -> '33.4')"""
+        numeric = [self.columns[name].dtype.kind == 'f' for name in self.header]
+        normalized = []
+        for row in rows:
+            out = []
+            for value, is_numeric in zip(row, numeric):
+                if is_numeric and value != '' and _is_number(value):
+                    value = _format_number(float(value))
+                out.append(value)
+            normalized.append(out)
+        return normalized
+
+    def sync(self, full=False):
+        """
+        Bring the mirror up to date with the worksheet.
+        Returns: number of rows added (all rows after a full resync)
+        """
+        if self.worksheet is None:
+            raise RuntimeError("No worksheet to sync from")
+        if (full or not self.header or self.tail_checksum is None
+                or time.time() - self.last_full_sync >= self.full_sync_interval):
+            return self._full_sync()
+
+        # Sheet rows are 1-based and row 1 is the header
+        overlap = min(self.overlap, self.row_count)
+        first = self.row_count - overlap + 2
+        fetched = self.worksheet.get(f"A{first}:{_column_letter(len(self.header))}")
+        header = self._pad([self.worksheet.row_values(1)])[0]
+        fetched = self._pad(fetched)
+        if (header != self.header
+                or _checksum(self._normalize(fetched[:overlap])) != self.tail_checksum):
+            print("⚠ Earlier sheet rows changed, resyncing the whole sheet")
+            return self._full_sync()
+
+        new_rows = fetched[overlap:]
+        self.last_sync = time.time()
+        if new_rows:
+            self._append(new_rows)
+            self.save()
+        return len(new_rows)
+
+    def _full_sync(self):
+        values = self.worksheet.get_all_values()
+        self.header = [str(h) for h in values[0]] if values else []
+        self.columns = {name: np.empty(0, dtype=np.float64) for name in self.header}
+        self.row_count = 0
+        rows = self._pad(values[1:])
+        self._append(rows)
+        self.last_full_sync = self.last_sync = time.time()
+        self.save()
+        return len(rows)
+
+    def _append(self, rows):
+        for i, name in enumerate(self.header):
+            chunk = _to_column([row[i] for row in rows])
+            self.columns[name] = _concat(self.columns[name], chunk) if self.row_count else chunk
+        self.row_count += len(rows)
+        # Checksum over the values as they read back from the columns, so the
+        # next incremental fetch compares like with like
+        self.tail_checksum = _checksum(self._tail_rows())
+
+    # ------------------------------------------------------------------
+    # Readers
+    # ------------------------------------------------------------------
+
+    def array(self, names, dtype=np.float64):
+        """(rows, len(names)) array of numeric columns (NaN where blank or text)"""
+        out = np.full((self.row_count, len(names)), np.nan, dtype=dtype)
+        for j, name in enumerate(names):
+            column = self.columns[name]
+            if column.dtype.kind == 'f':
+                out[:, j] = column
+            else:
+                out[:, j] = [float(v) if _is_number(v) else np.nan for v in column]
+        return out
+
+    def dataframe(self):
+        """
+        pandas DataFrame of the sheet; whole-number columns (Plant_ID, Growth
+        Days) come back as int64, as gspread's get_all_records() gives them
+        """
+        import pandas as pd
+        data = {}
+        for name in self.header:
+            column = self.columns[name]
+            if (column.dtype.kind == 'f' and len(column) and np.isfinite(column).all()
+                    and (column == np.round(column)).all()):
+                column = column.astype(np.int64)
+            data[name] = column
+        return pd.DataFrame(data)
+
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+class FakeWorksheet:
+    """
+    In-memory stand-in for a gspread worksheet, covering the calls the mirror
+    makes plus a few edits; `cells_read` counts the cells each call returned
+    """
+
+    def __init__(self, rows):
+        self.rows = [[str(v) for v in row] for row in rows]
+        self.cells_read = 0
+
+    @classmethod
+    def from_csv(cls, path, encoding='latin-1'):
+        with open(path, encoding=encoding, newline='') as f:
+            return cls(list(csv.reader(f)))
+
+    def _read(self, rows):
+        # Like the Sheets API: trailing empty cells are trimmed
+        result = []
+        for row in rows:
+            row = list(row)
+            while row and row[-1] == '':
+                row.pop()
+            result.append(row)
+        self.cells_read += sum(len(row) for row in result)
+        return result
+
+    def get_all_values(self):
+        width = max((len(row) for row in self.rows), default=0)
+        self.cells_read += width * len(self.rows)
+        return [row + [''] * (width - len(row)) for row in self.rows]
+
+    def row_values(self, row):
+        return self._read(self.rows[row - 1:row])[0] if row <= len(self.rows) else []
+
+    def get(self, range_name):
+        """Open-ended 'A10:F' ranges only"""
+        start = int(range_name.split(':')[0][1:])
+        return self._read(self.rows[start - 1:])
+
+    def append_row(self, values):
+        self.rows.append([str(v) for v in values])
+
+    def update_cell(self, row, col, value):
+        self.rows[row - 1][col - 1] = str(value)
+
+    def delete_rows(self, start, end=None):
+        del self.rows[start - 1:(end or start)]
+
+
+def open_worksheet(credentials_file=config.CREDENTIALS_FILE, spreadsheet=config.SPREADSHEET_NAME):
+    """First worksheet of the datasheet via gspread (network)"""
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+    scope = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+    creds = ServiceAccountCredentials.from_json_keyfile_name(credentials_file, scope)
+    return gspread.authorize(creds).open(spreadsheet).sheet1
+
+
+def synced_mirror(path=config.SHEET_MIRROR_FILE):
+    """
+    Mirror brought up to date with the Google Sheet. If the sheet can't be
+    reached the last synced copy is used; None if there is none.
+    """
+    mirror = SheetMirror(path=path)
+    try:
+        mirror.worksheet = open_worksheet()
+        started = time.perf_counter()
+        added = mirror.sync()
+        print(f"✓ Sheet mirror synced: {added} new rows, {mirror.row_count} total "
+              f"({time.perf_counter() - started:.2f}s)")
+    except Exception as e:
+        if not mirror.row_count:
+            print(f"✗ Error syncing Google Sheets mirror: {e}")
+            return None
+        age = (time.time() - mirror.last_sync) / 60
+        print(f"⚠ Google Sheets unreachable ({e}); using mirror from {age:.0f} min ago")
+    return mirror
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mirror of the Google datasheet")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sync = sub.add_parser('sync', help='fetch new rows')
+    sync.add_argument('--full', action='store_true', help='re-download the whole sheet')
+    sync.add_argument('--fake', metavar='CSV', help='sync from a CSV file instead of the sheet')
+    sub.add_parser('status', help='show what the mirror holds')
+    args = parser.parse_args()
+
+    mirror = SheetMirror()
+    if args.command == 'sync':
+        mirror.worksheet = FakeWorksheet.from_csv(args.fake) if args.fake else open_worksheet()
+        started = time.perf_counter()
+        added = mirror.sync(full=args.full)
+        print(f"✓ {added} rows fetched, {mirror.row_count} in mirror "
+              f"({time.perf_counter() - started:.2f}s)")
+    elif not mirror.row_count:
+        print(f"No mirror at {mirror.path}; run 'python sheet_mirror.py sync'")
+    else:
+        print(f"Mirror: {mirror.path} ({os.path.getsize(mirror.path) / 1024:.1f} KB)")
+        print(f"Rows: {mirror.row_count}")
+        print(f"Last sync: {time.ctime(mirror.last_sync)} (full: {time.ctime(mirror.last_full_sync)})")
+        for name in mirror.header:
+            kind = 'numeric' if mirror.columns[name].dtype.kind == 'f' else 'text'
+            print(f"  {name}: {kind}")
+
+
+if __name__ == '__main__':
+    main()
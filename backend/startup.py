@@ -0,0 +1,131 @@
+"""
+Startup Timing
+Tracks how quickly a service becomes usable:
+- Named startup phases (imports, app setup) with their durations
+- Components initialised in background threads (model, Google Sheets, ...)
+  and whether they are pending, ready or failed
+- Readiness summary for a /ready endpoint
+
+Import-cost report for any module (wraps python -X importtime):
+    python startup.py main [--top 15]
+"""
+
+import argparse
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupReport:
+    """Phase timings and background component states for one process"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.components = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """Time a synchronous startup step"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def mark(self, name):
+        """Record the time since the report was created (e.g. 'serving')"""
+        self.phases[name] = time.perf_counter() - self.started
+
+    def start_background(self, name, init):
+        """
+        Run init() in a daemon thread; its state is 'pending' until it returns
+        ('ready') or raises ('failed', the service keeps running without it)
+        """
+        with self._lock:
+            self.components[name] = {'state': 'pending', 'seconds': None, 'error': None}
+
+        def run():
+            started = time.perf_counter()
+            try:
+                init()
+                state, error = 'ready', None
+            except Exception as e:
+                state, error = 'failed', str(e)
+                print(f"⚠ WARNING: {name} unavailable. Error: {e}")
+            with self._lock:
+                self.components[name] = {'state': state, 'error': error,
+                                         'seconds': round(time.perf_counter() - started, 3)}
+
+        thread = threading.Thread(target=run, name=f'init-{name}', daemon=True)
+        thread.start()
+        return thread
+
+    def state(self, name):
+        """'pending', 'ready', 'failed' or None if never started"""
+        with self._lock:
+            component = self.components.get(name)
+            return component['state'] if component else None
+
+    def ready(self):
+        """True once no background component is still pending"""
+        with self._lock:
+            return all(c['state'] != 'pending' for c in self.components.values())
+
+    def as_dict(self):
+        with self._lock:
+            components = {name: dict(c) for name, c in self.components.items()}
+        return {
+            'ready': all(c['state'] != 'pending' for c in components.values()),
+            'degraded': sorted(n for n, c in components.items() if c['state'] == 'failed'),
+            'uptime_seconds': round(time.perf_counter() - self.started, 3),
+            'phases_seconds': {name: round(t, 3) for name, t in self.phases.items()},
+            'components': components,
+        }
+
+    def print_report(self):
+        print("Startup timing:")
+        for name, seconds in self.phases.items():
+            print(f"  {name:24s} {seconds * 1000:8.1f} ms")
+
+
+def import_report(module, top=15):
+    """
+    Import `module` in a fresh interpreter with -X importtime and return
+    (total seconds, [(cumulative seconds, package)] for the slowest top-level imports)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, int(cumulative_us) / 1e6, name.strip()))
+
+    total = next((seconds for depth, seconds, name in reversed(entries) if name == module), 0.0)
+    # Direct imports of the module (one level below it in the tree)
+    children = [(seconds, name) for depth, seconds, name in entries if depth == 1]
+    if not children:
+        children = [(seconds, name) for depth, seconds, name in entries if depth == 0 and name != module]
+    return total, sorted(children, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report what a module's import time is spent on")
+    parser.add_argument('module', nargs='?', default='main')
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    total, slowest = import_report(args.module, args.top)
+    print(f"import {args.module}: {total * 1000:.1f} ms")
+    for seconds, name in slowest:
+        print(f"  {seconds * 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Synthetic Sensor Data Generator
+Greenhouse-like readings at benchmark scale, shaped after lettuce_dataset_updated.csv:
+- Per plant: level and linear trend over the growing period, fitted from the CSV
+- Day-to-day variation fitted as a correlated AR(1) process (persistence and
+  cross-feature covariance of the residuals), run at the reading interval
+- A day/night cycle on top (the CSV has one reading per day, so its size is
+  set in config.SYNTH_*), plus sensor noise
+- Injected anomalies with per-reading labels: spikes, drifts and stuck sensors
+Whole chunks are generated with NumPy (millions of readings per second) and
+are either consumed as an iterator or written as .npz / CSV chunk files.
+The .npz records use the binary protocol's layout (sensor_protocol.record_dtype).
+
+Usage:
+    python synthetic.py --plants 1000 --days 7 --out synthetic               # .npz chunks
+    python synthetic.py --plants 70 --days 30 --format csv --out synthetic   # CSV (training columns)
+    python synthetic.py --plants 1000 --rows 20000000 --benchmark            # generation speed only
+"""
+
+import argparse
+import csv
+import glob
+import math
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+import config
+from forest_scorer import FEATURE_NAMES
+from sensor_protocol import record_dtype
+
+CSV_FILE = 'lettuce_dataset_updated.csv'
+DAY = 86400.0
+
+# Label codes
+NORMAL, SPIKE, DRIFT, STUCK = 0, 1, 2, 3
+LABELS = ('normal', 'spike', 'drift', 'stuck')
+
+_LIMITS = np.array([[-np.inf, np.inf], [0.0, 100.0], [0.0, 14.0]], dtype=np.float32)
+
+
+def _per_feature(setting):
+    return np.array([setting[name] for name in FEATURE_NAMES], dtype=np.float64)
+
+
+class PlantProfiles:
+    """Fitted per-plant levels and trends, and the shared day-to-day residual dynamics"""
+
+    def __init__(self, level, trend, phi, innovation_cov, scale):
+        self.level = level                    # (plants, features) value at day 0
+        self.trend = trend                    # (plants, features) change per day
+        self.phi = phi                        # (features,) day-to-day persistence
+        self.innovation_cov = innovation_cov  # (features, features) per day
+        self.scale = scale                    # (features,) overall standard deviation
+
+    @classmethod
+    def fit(cls, path=CSV_FILE):
+        """Least-squares line per plant and feature, then AR(1) on the pooled residuals"""
+        plants = {}
+        with open(path, encoding='latin-1', newline='') as f:
+            for row in csv.DictReader(f):
+                try:
+                    day = float(row['Growth Days'])
+                    values = [float(row[name]) for name in config.FEATURE_COLUMNS]
+                except (KeyError, ValueError):
+                    continue
+                plants.setdefault(row['Plant_ID'], []).append((day, *values))
+
+        levels, trends, current, previous, everything = [], [], [], [], []
+        for rows in plants.values():
+            if len(rows) < 3:
+                continue
+            data = np.array(sorted(rows))
+            days, values = data[:, 0], data[:, 1:]
+            design = np.column_stack([np.ones_like(days), days])
+            coef, *_ = np.linalg.lstsq(design, values, rcond=None)
+            levels.append(coef[0])
+            trends.append(coef[1])
+            residuals = values - design @ coef
+            consecutive = np.diff(days) == 1
+            current.append(residuals[1:][consecutive])
+            previous.append(residuals[:-1][consecutive])
+            everything.append(values)
+
+        current, previous = np.concatenate(current), np.concatenate(previous)
+        phi = np.clip((current * previous).sum(axis=0) / (previous ** 2).sum(axis=0), 0.05, 0.95)
+        innovations = current - phi * previous
+        return cls(np.array(levels), np.array(trends), phi, np.cov(innovations, rowvar=False),
+                   np.concatenate(everything).std(axis=0))
+
+    def sample(self, count, rng):
+        """(level, trend) for `count` plants: the fitted ones in turn, jittered after the first pass"""
+        fitted = len(self.level)
+        index = np.arange(count) % fitted
+        level, trend = self.level[index].copy(), self.trend[index].copy()
+        extra = np.arange(count) >= fitted
+        if extra.any():
+            level[extra] += rng.normal(0, 0.5, (extra.sum(), level.shape[1])) * self.level.std(axis=0)
+            trend[extra] += rng.normal(0, 0.5, (extra.sum(), trend.shape[1])) * self.trend.std(axis=0)
+        return level, trend
+
+
+class SyntheticGenerator:
+    """
+    Readings of `plants` plants every `interval` seconds from `start`, in
+    time order (all plants at one time step, then the next step).
+    chunks() yields dicts of columns:
+      'timestamp' (N,) unix seconds, 'plant' (N,) plant index, 'step' (N,)
+      time step, 'values' (N, 3) float32 temperature/humidity/pH,
+      'label' (N,) LABELS code, 'anomaly_feature' (N,) feature index or -1
+    """
+
+    def __init__(self, plants=100, interval=config.SYNTH_INTERVAL, start=None, seed=0,
+                 profiles=None, anomalies=config.SYNTH_ANOMALIES, chunk_rows=config.SYNTH_CHUNK_ROWS):
+        self.plants = plants
+        self.interval = float(interval)
+        self.start = start if start is not None else datetime(2023, 8, 3).timestamp()
+        start_date = datetime.fromtimestamp(self.start)
+        self.midnight = datetime(start_date.year, start_date.month, start_date.day).timestamp()
+        self.rng = np.random.default_rng(seed)
+        self.profiles = profiles or PlantProfiles.fit()
+        self.anomalies = anomalies
+        self.names = np.array([f"Plant-{i + 1}" for i in range(plants)], dtype='S16')
+        self.level, self.trend = self.profiles.sample(plants, self.rng)
+
+        # AR(1) at the reading interval with the same stationary spread as the daily fit
+        phi = self.profiles.phi
+        self.phi_step = phi ** (self.interval / DAY)
+        step_cov = self.profiles.innovation_cov * np.sqrt(
+            np.outer((1 - self.phi_step ** 2) / (1 - phi ** 2), (1 - self.phi_step ** 2) / (1 - phi ** 2)))
+        self.step_chol = np.linalg.cholesky(step_cov).astype(np.float32)
+        self.diurnal = _per_feature(config.SYNTH_DIURNAL).astype(np.float32)
+        self.noise = _per_feature(config.SYNTH_NOISE).astype(np.float32)
+        stationary = np.sqrt(np.diag(self.profiles.innovation_cov) / (1 - phi ** 2))
+        self.residual = (self.rng.standard_normal((plants, 3)) * stationary).astype(np.float32)
+
+        # Steps per chunk; at most a day, which keeps the AR(1) cumsum well conditioned
+        self.window = max(1, min(chunk_rows // plants, math.ceil(DAY / self.interval)))
+        self.step = 0
+        self._episodes = []  # [kind, plant, feature, first step, length, magnitude, stuck value]
+
+    # ------------------------------------------------------------------
+    # Generation
+    # ------------------------------------------------------------------
+
+    def chunks(self, rows=None, days=None):
+        """Generate `rows` readings, or `days` days of them (None = endless)"""
+        if days is not None:
+            rows = int(days * DAY / self.interval) * self.plants
+        produced = 0
+        while rows is None or produced < rows:
+            chunk = self._window()
+            if rows is not None and produced + len(chunk['label']) > rows:
+                keep = rows - produced
+                chunk = {key: column[:keep] for key, column in chunk.items()}
+            produced += len(chunk['label'])
+            yield chunk
+
+    def _window(self):
+        steps, plants, rng = self.window, self.plants, self.rng
+        first = self.step
+        step_index = np.arange(first, first + steps)
+        timestamps = self.start + step_index * self.interval
+        days = (step_index * self.interval / DAY).astype(np.float32)
+
+        # Correlated AR(1) residuals for every plant, all steps at once:
+        # r[i] = phi^(i+1) r0 + sum_j phi^(i-j) e[j]
+        innovations = rng.standard_normal((steps, plants, 3), dtype=np.float32) @ self.step_chol.T
+        powers = (self.phi_step[None, :] ** np.arange(1, steps + 1)[:, None]).astype(np.float32)
+        residual = powers[:, None, :] * (self.residual + np.cumsum(innovations / powers[:, None, :], axis=0))
+        self.residual = residual[-1]
+
+        hours = ((timestamps - self.midnight) % DAY) / 3600.0  # local time of day
+        cycle = np.cos(2 * np.pi * (hours - config.SYNTH_PEAK_HOUR) / 24).astype(np.float32)
+        values = (self.level.astype(np.float32)
+                  + days[:, None, None] * self.trend.astype(np.float32)
+                  + cycle[:, None, None] * self.diurnal
+                  + residual)
+        values += rng.standard_normal(values.shape, dtype=np.float32) * self.noise
+
+        label = np.zeros((steps, plants), dtype=np.int8)
+        feature = np.full((steps, plants), -1, dtype=np.int8)
+        self._start_episodes(first, steps)
+        self._apply_episodes(values, label, feature, first, steps, (DRIFT,))
+        self._inject_spikes(values, label, feature)
+        self._apply_episodes(values, label, feature, first, steps, (STUCK,))
+        np.clip(values, _LIMITS[:, 0], _LIMITS[:, 1], out=values)
+
+        self.step += steps
+        return {
+            'timestamp': np.repeat(timestamps, plants),
+            'plant': np.tile(np.arange(plants, dtype=np.int32), steps),
+            'step': np.repeat(step_index, plants),
+            'values': values.reshape(-1, 3),
+            'label': label.reshape(-1),
+            'anomaly_feature': feature.reshape(-1),
+        }
+
+    def _inject_spikes(self, values, label, feature):
+        count = self.rng.binomial(label.size, self.anomalies.get('spike', 0))
+        if not count:
+            return
+        position = self.rng.integers(0, label.size, count)
+        which = self.rng.integers(0, 3, count)
+        sign = self.rng.choice([-1.0, 1.0], count)
+        flat = values.reshape(-1, 3)
+        flat[position, which] += (sign * config.SYNTH_SPIKE_SIGMA * self.profiles.scale[which]).astype(np.float32)
+        label.reshape(-1)[position] = SPIKE
+        feature.reshape(-1)[position] = which
+
+    def _start_episodes(self, first, steps):
+        low, high = (max(1, int(seconds / self.interval)) for seconds in config.SYNTH_EPISODE)
+        for kind, name in ((DRIFT, 'drift'), (STUCK, 'stuck')):
+            count = self.rng.binomial(steps * self.plants, self.anomalies.get(name, 0))
+            for position in self.rng.integers(0, steps * self.plants, count).tolist():
+                which = int(self.rng.integers(0, 3))
+                magnitude = (float(self.rng.choice([-1.0, 1.0])) * config.SYNTH_DRIFT_SIGMA
+                             * self.profiles.scale[which])
+                self._episodes.append([kind, position % self.plants, which, first + position // self.plants,
+                                       int(self.rng.integers(low, high + 1)), magnitude, None])
+
+    def _apply_episodes(self, values, label, feature, first, steps, kinds):
+        """Apply the episodes of `kinds` overlapping this window (they may span windows)"""
+        remaining = []
+        for episode in self._episodes:
+            kind, plant, which, begin, length, magnitude, stuck = episode
+            if kind not in kinds:
+                remaining.append(episode)
+                continue
+            lo, hi = max(begin, first), min(begin + length, first + steps)
+            if lo < hi:
+                rows = slice(lo - first, hi - first)
+                if kind == DRIFT:
+                    ramp = (np.arange(lo, hi) - begin + 1) / length
+                    values[rows, plant, which] += (magnitude * ramp).astype(np.float32)
+                else:
+                    if stuck is None:
+                        stuck = episode[6] = float(values[lo - first, plant, which])
+                    values[rows, plant, which] = stuck
+                label[rows, plant] = kind
+                feature[rows, plant] = which
+            if begin + length > first + steps:
+                remaining.append(episode)
+        self._episodes = remaining
+
+    # ------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------
+
+    def records(self, chunk):
+        """A chunk as binary protocol records (seq = time step + 1, per plant)"""
+        records = np.empty(len(chunk['label']), dtype=record_dtype())
+        records['seq'] = chunk['step'] + 1
+        records['timestamp'] = chunk['timestamp']
+        for i, name in enumerate(FEATURE_NAMES):
+            records[name] = chunk['values'][:, i]
+        records['plant_id'] = self.names[chunk['plant']]
+        return records
+
+    def write(self, out_dir, rows=None, days=None, fmt='npz'):
+        """Write chunk files to out_dir; returns (files, readings)"""
+        os.makedirs(out_dir, exist_ok=True)
+        files, total = [], 0
+        for i, chunk in enumerate(self.chunks(rows, days)):
+            path = os.path.join(out_dir, f"chunk_{i:05d}.{fmt}")
+            if fmt == 'npz':
+                np.savez(path, records=self.records(chunk), label=chunk['label'],
+                         anomaly_feature=chunk['anomaly_feature'])
+            else:
+                self._write_csv(path, chunk)
+            files.append(path)
+            total += len(chunk['label'])
+        return files, total
+
+    def _write_csv(self, path, chunk):
+        """Training-compatible columns (config.FEATURE_COLUMNS), plus the labels"""
+        table = np.column_stack([chunk['timestamp'], chunk['plant'] + 1, chunk['values'],
+                                 chunk['label'], chunk['anomaly_feature']])
+        header = ','.join(['Timestamp', 'Plant_ID', *config.FEATURE_COLUMNS, 'Label', 'Anomaly_Feature'])
+        np.savetxt(path, table, fmt=['%.0f', '%d', '%.2f', '%.2f', '%.3f', '%d', '%d'],
+                   delimiter=',', header=header, comments='', encoding='latin-1')
+
+
+def load_chunks(out_dir):
+    """Read .npz chunks back: yields (records, label, anomaly_feature)"""
+    for path in sorted(glob.glob(os.path.join(out_dir, 'chunk_*.npz'))):
+        with np.load(path) as data:
+            yield data['records'], data['label'], data['anomaly_feature']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic greenhouse sensor data")
+    parser.add_argument('--plants', type=int, default=100)
+    parser.add_argument('--interval', type=float, default=config.SYNTH_INTERVAL,
+                        help="Seconds between readings of a plant")
+    parser.add_argument('--days', type=float, default=None)
+    parser.add_argument('--rows', type=int, default=None, help="Total readings (instead of --days)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='synthetic', help="Output directory")
+    parser.add_argument('--format', choices=['npz', 'csv'], default='npz')
+    parser.add_argument('--benchmark', action='store_true', help="Generate without writing, report speed")
+    args = parser.parse_args()
+    if args.days is None and args.rows is None:
+        args.days = 1
+
+    generator = SyntheticGenerator(args.plants, args.interval, seed=args.seed)
+    started = time.perf_counter()
+    if args.benchmark:
+        total, labels = 0, np.zeros(len(LABELS), dtype=np.int64)
+        for chunk in generator.chunks(args.rows, args.days):
+            total += len(chunk['label'])
+            labels += np.bincount(chunk['label'], minlength=len(LABELS))
+        files = []
+    else:
+        files, total = generator.write(args.out, args.rows, args.days, args.format)
+        labels = None
+    elapsed = time.perf_counter() - started
+
+    print(f"✓ {total:,} readings for {args.plants} plants in {elapsed:.2f}s "
+          f"({total / max(elapsed, 1e-9) / 1e6:.2f}M readings/s)")
+    if files:
+        print(f"✓ {len(files)} {args.format} chunk(s) in {args.out}/")
+    if labels is not None:
+        for name, count in zip(LABELS, labels.tolist()):
+            print(f"  {name:8s} {count:12,d} ({count / max(total, 1) * 100:.3f}%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Streaming Temporal Anomaly Detectors
+Per-plant detectors that look at how readings change over time:
+- Rolling z-score against an EWMA mean/variance (sudden outliers)
+- Rate of change between consecutive readings (sudden jumps)
+- Fast vs slow EWMA divergence (slow drift, e.g. pH creeping down)
+Each update is O(1) time and memory per plant; no history is kept.
+"""
+
+import math
+import threading
+
+import config
+
+METRICS = ('temperature', 'humidity', 'ph')
+
+
+class PlantState:
+    """Running statistics for one plant"""
+    __slots__ = ('count', 'last_ts', 'last', 'mean', 'var', 'slow_mean')
+
+    def __init__(self, values, timestamp):
+        self.count = 1
+        self.last_ts = timestamp
+        self.last = list(values)
+        self.mean = list(values)
+        self.var = [0.0] * len(values)
+        self.slow_mean = list(values)
+
+
+class TemporalDetector:
+    """
+    Runs all temporal checks for every plant.
+    update() returns (is_anomaly, reasons) for the reading just seen.
+    """
+
+    def __init__(self,
+                 alpha=config.TEMPORAL_ALPHA,
+                 slow_alpha=config.TEMPORAL_SLOW_ALPHA,
+                 z_threshold=config.TEMPORAL_Z_THRESHOLD,
+                 min_std=config.TEMPORAL_MIN_STD,
+                 max_rate=config.TEMPORAL_MAX_RATE,
+                 drift_limit=config.TEMPORAL_DRIFT_LIMIT,
+                 warmup=config.TEMPORAL_WARMUP):
+        self.alpha = alpha
+        self.slow_alpha = slow_alpha
+        self.z_threshold = z_threshold
+        self.min_std = [min_std[m] for m in METRICS]
+        self.max_rate = [max_rate[m] for m in METRICS]
+        self.drift_limit = [drift_limit[m] for m in METRICS]
+        self.warmup = warmup
+        self._plants = {}
+        self._lock = threading.Lock()
+
+    def update(self, plant_id, timestamp, values):
+        """
+        Score one reading and fold it into the plant's state.
+        values: (temperature, humidity, ph); timestamp: unix seconds
+        """
+        with self._lock:
+            state = self._plants.get(plant_id)
+            if state is None:
+                self._plants[plant_id] = PlantState(values, timestamp)
+                return False, []
+
+            reasons = []
+            warmed_up = state.count >= self.warmup
+            # Rates are per minute; readings closer than a minute apart are
+            # compared as single steps so sampling jitter does not inflate them
+            minutes = max(timestamp - state.last_ts, 60.0) / 60.0
+
+            for i, value in enumerate(values):
+                name = METRICS[i]
+                mean = state.mean[i]
+
+                if warmed_up:
+                    std = max(math.sqrt(state.var[i]), self.min_std[i])
+                    z = (value - mean) / std
+                    if abs(z) > self.z_threshold:
+                        reasons.append(f"{name} z-score {z:+.1f}")
+
+                    rate = (value - state.last[i]) / minutes
+                    if abs(rate) > self.max_rate[i]:
+                        reasons.append(f"{name} changing {rate:+.2f}/min")
+
+                # EWMA mean/variance (West's incremental form)
+                diff = value - mean
+                incr = self.alpha * diff
+                state.mean[i] = mean + incr
+                state.var[i] = (1.0 - self.alpha) * (state.var[i] + diff * incr)
+                state.slow_mean[i] += self.slow_alpha * (value - state.slow_mean[i])
+
+                if warmed_up:
+                    drift = state.mean[i] - state.slow_mean[i]
+                    if abs(drift) > self.drift_limit[i]:
+                        reasons.append(f"{name} drifting {drift:+.2f}")
+
+                state.last[i] = value
+
+            state.count += 1
+            state.last_ts = timestamp
+            return bool(reasons), reasons
+
+    def snapshot(self, plant_id):
+        """Current EWMA statistics for a plant (None if never seen)"""
+        with self._lock:
+            state = self._plants.get(plant_id)
+            if state is None:
+                return None
+            return {
+                name: {
+                    'mean': round(state.mean[i], 3),
+                    'std': round(math.sqrt(state.var[i]), 3),
+                    'baseline': round(state.slow_mean[i], 3),
+                }
+                for i, name in enumerate(METRICS)
+            }
+
+    def plant_count(self):
+        return len(self._plants)
+
+    def clear(self):
+        with self._lock:
+            self._plants.clear()
@@ -0,0 +1,43 @@
+"""
+Shared test setup: the backend modules are flat scripts that import each
+other by name and open their data files relative to the backend directory.
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+os.chdir(BACKEND)
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """The Flask app module with an empty buffer, fresh dedup/admission state and a scratch log"""
+    import app as server
+    from admission import AdmissionController
+    from dedup import DedupIndex
+    from sensor_log import SensorLogWriter
+
+    log = SensorLogWriter('readings', str(tmp_path))
+    monkeypatch.setattr(server, 'READING_LOG', log)
+    monkeypatch.setattr(server, 'DEDUP', DedupIndex())
+    monkeypatch.setattr(server, 'ADMISSION', AdmissionController())
+    server.app.test_client().post('/api/clear')
+    yield server
+    log.close()
+
+
+@pytest.fixture
+def live_server(server):
+    """The Flask app served over HTTP on a free local port: (app module, base URL)"""
+    from werkzeug.serving import make_server
+
+    httpd = make_server('127.0.0.1', 0, server.app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
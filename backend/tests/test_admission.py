@@ -0,0 +1,120 @@
+import time
+
+import pytest
+
+import replay
+import sensor_protocol
+from admission import AdmissionController, Rejected
+
+
+def controller(**overrides):
+    settings = dict(global_rate=1000, global_burst=100, client_rate=10, client_burst=20,
+                    max_in_flight=4, max_queued=0, queue_timeout=0.1, max_clients=100, exempt=())
+    settings.update(overrides)
+    return AdmissionController(**settings)
+
+
+def admit(admission, client, cost=1):
+    admission.admit(client, cost)
+    admission.release()
+
+
+def test_client_over_its_burst_gets_429_with_retry_after():
+    admission = controller()
+    admit(admission, '10.0.0.1', 20)
+    with pytest.raises(Rejected) as e:
+        admit(admission, '10.0.0.1', 5)
+    assert e.value.status == 429 and e.value.retry_after >= 1
+    admit(admission, '10.0.0.2', 5)  # other clients are unaffected
+
+
+def test_request_larger_than_any_burst_is_refused_not_admitted():
+    admission = controller()
+    with pytest.raises(Rejected) as e:
+        admit(admission, '10.0.0.1', 21)
+    assert e.value.status == 413 and e.value.retry_after == 0
+    assert admission.stats()['too_large'] == 1 and admission.stats()['admitted'] == 0
+
+
+def test_exempt_client_skips_the_client_bucket_but_not_the_global_one():
+    admission = controller(exempt=['10.0.0.9'])
+    for _ in range(5):
+        admit(admission, '10.0.0.9', 20)
+    with pytest.raises(Rejected) as e:
+        admit(admission, '10.0.0.9', 20)
+    assert e.value.status == 503
+    with pytest.raises(Rejected) as e:
+        admit(admission, '10.0.0.9', 101)
+    assert e.value.status == 413
+
+
+def test_saturated_server_answers_503():
+    admission = controller(max_in_flight=1)
+    admission.admit('10.0.0.1')
+    with pytest.raises(Rejected) as e:
+        admission.admit('10.0.0.2', wait=False)
+    assert e.value.status == 503
+    admission.release()
+
+
+def test_oversized_http_frame_gets_413_without_retry_after(server, monkeypatch):
+    monkeypatch.setattr(server, 'ADMISSION', controller(client_burst=10))
+    frame = sensor_protocol.encode_frame(
+        (i, 1_700_000_000 + i, 22.0, 60.0, 6.5, 'Plant-1') for i in range(11))
+    response = server.app.test_client().post('/api/sensor-data/binary', data=frame)
+    assert response.status_code == 413 and 'Retry-After' not in response.headers
+
+
+def test_binary_sender_splits_frames_the_server_refuses(server, monkeypatch):
+    monkeypatch.setattr(server, 'ADMISSION', controller(client_burst=10, client_rate=1000))
+    tcp = server.start_binary_server(0)
+    try:
+        sender = sensor_protocol.BinaryFrameSender('127.0.0.1', tcp.server_address[1])
+        for i in range(25):
+            sender.add(22.0, 60.0, 6.5, 'Plant-1', timestamp=1_700_000_000 + i)
+        sent = 0
+        while sender.pending:
+            try:
+                sent += sender.flush()
+            except sensor_protocol.ServerBusy:
+                time.sleep(0.05)  # the bucket refills in milliseconds at this rate
+        sender.close()
+    finally:
+        tcp.shutdown()
+        tcp.server_close()
+    assert sent == 25 and sender.frame_limit <= 10
+    assert server.app.test_client().get('/api/history').get_json()['count'] == 25
+
+
+def test_replay_waits_out_busy_answers(live_server, monkeypatch):
+    server, url = live_server
+    # The bucket never refills by itself: every 4th request is answered 429,
+    # and only the backoff (standing in for the wait) tops it up again
+    admission = controller(client_burst=3, client_rate=1e-6)
+    monkeypatch.setattr(server, 'ADMISSION', admission)
+    hints = []
+
+    def backoff_delay(attempt, retry_after=None):
+        hints.append(retry_after)
+        for bucket in admission._clients.values():
+            bucket.tokens = bucket.burst
+        return 0
+
+    monkeypatch.setattr(replay, 'backoff_delay', backoff_delay)
+    events = [(1_700_000_000.0 + i, 'Plant-1', 22.0, 60.0, 6.5) for i in range(10)]
+    stats, _ = replay.run(events, 'json', server=url, workers=1)
+    assert stats.sent == 10 and stats.errors == 0
+    assert admission.stats()['client_limited'] == len(hints) == 3
+    assert all(hint is not None and hint >= 1 for hint in hints)
+
+
+def test_readings_of_a_dead_lane_count_as_errors(monkeypatch):
+    def dies_halfway(lane, server, first_ts, started, speed, stats):
+        for event in lane[:len(lane) // 2]:
+            stats.record('NORMAL')
+        raise RuntimeError('lane crashed')
+
+    monkeypatch.setattr(replay, 'replay_json', dies_halfway)
+    events = [(1_700_000_000.0 + i, f'Plant-{i % 4}', 22.0, 60.0, 6.5) for i in range(40)]
+    stats, _ = replay.run(events, 'json', workers=2)
+    assert stats.sent + stats.errors == 40 and stats.errors >= 20
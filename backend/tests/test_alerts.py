@@ -0,0 +1,118 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import alerts
+from alerts import AlertDispatcher
+
+READING = {'plant_id': 'Plant-7', 'timestamp': '2026-03-01T12:00:00', 'temperature': 45.0,
+           'humidity': 20.0, 'ph': 3.5, 'anomaly_score': 0.9, 'is_anomaly': True,
+           'point_anomaly': True, 'temporal_reasons': []}
+
+
+@pytest.fixture
+def webhook():
+    """A local webhook endpoint collecting the JSON bodies posted to it"""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    httpd = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/anomaly", received
+    httpd.shutdown()
+
+
+def test_webhook_delivery_and_dedup(webhook):
+    url, received = webhook
+    dispatcher = AlertDispatcher(method='webhook', webhook_url=url, workers=1)
+    queued = [dispatcher.submit(dict(READING, temperature=45.0 + i)) for i in range(5)]
+    dispatcher.close(timeout=10)
+
+    assert queued == [True, False, False, False, False]
+    stats = dispatcher.stats()
+    assert stats['sent'] == 1 and stats['deduplicated'] == 4 and stats['failed'] == 0
+    assert len(received) == 1
+    assert received[0]['event'] == 'anomaly' and received[0]['reading']['plant_id'] == 'Plant-7'
+
+
+def test_different_problems_alert_separately(webhook):
+    url, received = webhook
+    dispatcher = AlertDispatcher(method='webhook', webhook_url=url, workers=1)
+    dispatcher.submit(READING)
+    dispatcher.submit(dict(READING, point_anomaly=False, temporal_reasons=['temperature rate 9.0']))
+    dispatcher.submit(dict(READING, plant_id='Plant-8'))
+    dispatcher.close(timeout=10)
+    assert dispatcher.stats()['sent'] == 3 and len(received) == 3
+
+
+def test_rate_limit_per_plant(webhook):
+    url, _ = webhook
+    dispatcher = AlertDispatcher(method='webhook', webhook_url=url, workers=1,
+                                 dedup_window=0, rate_limit=2, rate_period=3600)
+    queued = [dispatcher.submit(READING) for _ in range(4)]
+    dispatcher.close(timeout=10)
+    assert queued == [True, True, False, False]
+    assert dispatcher.stats()['rate_limited'] == 2
+
+
+def test_failed_delivery_is_retried_then_counted():
+    # Nothing listens on the discard port
+    dispatcher = AlertDispatcher(method='webhook', webhook_url='http://127.0.0.1:9/anomaly',
+                                 workers=1, max_retries=2, retry_delay=0)
+    dispatcher.submit(READING)
+    dispatcher.close(timeout=10)
+    assert dispatcher.stats()['failed'] == 1
+
+
+class FakeSMTP:
+    sessions = []
+
+    def __init__(self, host, port, timeout=None):
+        self.calls = []
+        FakeSMTP.sessions.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def starttls(self):
+        self.calls.append('starttls')
+
+    def login(self, user, password):
+        self.calls.append(('login', user, password))
+
+    def send_message(self, message):
+        self.calls.append(('send', message['To']))
+
+
+@pytest.mark.parametrize('password, expected_login', [
+    (None, None),
+    ('secret', ('login', 'alerts@example.com', 'secret')),
+])
+def test_email_logs_in_only_with_credentials(monkeypatch, password, expected_login):
+    monkeypatch.setattr(alerts.smtplib, 'SMTP', FakeSMTP)
+    FakeSMTP.sessions = []
+    email_config = {'sender': 'alerts@example.com', 'password': password,
+                    'recipients': ['ops@example.com'], 'smtp_server': 'localhost',
+                    'smtp_port': 25, 'use_tls': False}
+    dispatcher = AlertDispatcher(method='email', email_config=email_config, workers=1)
+    dispatcher.submit(READING)
+    dispatcher.close(timeout=10)
+
+    calls = FakeSMTP.sessions[0].calls
+    assert calls[-1] == ('send', 'ops@example.com')
+    logins = [c for c in calls if c[0] == 'login']
+    assert logins == ([expected_login] if expected_login else [])
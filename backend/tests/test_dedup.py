@@ -0,0 +1,64 @@
+import threading
+import time
+
+from dedup import DedupIndex, reading_key
+
+
+def test_claim_complete_replays_original_result():
+    index = DedupIndex(recent=10, bloom_capacity=100, false_positive_rate=0.01)
+    key = reading_key('Plant-1', 1_700_000_000)
+    assert index.claim([key]) == [None]
+    index.complete(key, {'status': 'Normal'})
+    assert index.claim([key]) == [{'status': 'Normal'}]
+    assert index.stats()['replayed'] == 1
+
+
+def test_repeat_within_batch_and_keyless_readings():
+    index = DedupIndex(recent=10, bloom_capacity=100, false_positive_rate=0.01)
+    key = reading_key('Plant-1', 1.5)
+    assert index.claim([key, None, key, None]) == [None, None, True, None]
+
+
+def test_release_lets_a_retry_store_the_reading():
+    index = DedupIndex(recent=10, bloom_capacity=100, false_positive_rate=0.01)
+    key = reading_key('Plant-2', 42)
+    index.claim([key])
+    index.release(key)
+    assert index.claim([key]) == [None]
+
+
+def test_evicted_keys_are_still_seen_via_bloom():
+    index = DedupIndex(recent=3, bloom_capacity=1000, false_positive_rate=0.001)
+    keys = [reading_key('Plant-1', t) for t in range(20)]
+    for key in keys:
+        index.claim([key])
+        index.complete(key, {'status': 'Normal'})
+    assert index.stats()['recent'] == 3
+    assert index.claim([keys[0]]) == [True]
+    assert index.claim([reading_key('Plant-1', 999)]) == [None]
+
+
+def test_concurrent_retry_waits_for_the_original():
+    index = DedupIndex(recent=10, bloom_capacity=100, false_positive_rate=0.01)
+    key = reading_key('Plant-1', 7)
+    index.claim([key])
+    answers = []
+    retry = threading.Thread(target=lambda: answers.append(index.claim([key])))
+    retry.start()
+    time.sleep(0.05)
+    index.complete(key, {'status': 'Anomaly'})
+    retry.join(2)
+    assert answers == [[{'status': 'Anomaly'}]]
+    assert index.stats()['waited'] == 1
+
+
+def test_retried_post_is_not_stored_twice(server):
+    client = server.app.test_client()
+    reading = {'temperature': 23.0, 'humidity': 61.0, 'ph': 6.4,
+               'plant_id': 'Plant-3', 'timestamp': 1_700_000_123.25}
+    first = client.post('/api/sensor-data', json=reading).get_json()
+    retry = client.post('/api/sensor-data', json=reading).get_json()
+    assert first['success'] and not first.get('duplicate')
+    assert retry['duplicate'] and retry['status'] == first['status']
+    assert retry['anomaly_score'] == first['anomaly_score']
+    assert client.get('/api/history').get_json()['count'] == 1
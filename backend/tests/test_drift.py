@@ -0,0 +1,113 @@
+import csv
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import config
+from drift import DriftBaseline, DriftMonitor, FeatureHistograms, write_retrain_data
+from sensor_log import SensorLogWriter
+
+MEAN, SCALE = np.array([22.0, 60.0, 6.5]), np.array([2.0, 5.0, 0.3])
+TRAINING = np.random.default_rng(0).normal(MEAN, SCALE, (2000, 3))
+
+
+def live_readings(shift, n=500):
+    return np.random.default_rng(1).normal(MEAN + shift, SCALE, (n, 3))
+
+
+def test_rebinding_the_same_baseline_keeps_the_histograms():
+    histograms = FeatureHistograms()
+    histograms.bind(DriftBaseline.from_data(TRAINING, MEAN, SCALE))
+    histograms.add(live_readings(0), ['Plant-1'] * 500, now=1000)
+    before = histograms.counts(now=1000)['Plant-1']
+
+    histograms.bind(DriftBaseline.from_data(TRAINING, MEAN, SCALE))
+    assert np.array_equal(histograms.counts(now=1000)['Plant-1'], before)
+
+
+def test_rebinding_a_retrained_scaler_moves_the_counts():
+    histograms = FeatureHistograms()
+    old = DriftBaseline.from_data(TRAINING, MEAN, SCALE)
+    histograms.bind(old)
+    shifted = live_readings(np.array([4.0, 0.0, 0.0]))
+    histograms.add(shifted, ['Plant-1'] * 500, now=1000)
+
+    new_mean = MEAN + np.array([4.0, 0.0, 0.0])
+    new = DriftBaseline.from_data(np.vstack([TRAINING, shifted]), new_mean, SCALE)
+    histograms.bind(new)
+    counts = histograms.counts(now=1000)['Plant-1']
+    assert np.allclose(counts.sum(axis=1), 500)
+    # The shifted readings sit around the new mean: close to an exact re-histogram
+    exact = new.histogram(shifted)
+    assert np.abs(counts - exact).sum(axis=1).max() < 0.2 * 500
+
+
+def write_log(log_dir, start, count):
+    writer = SensorLogWriter('readings', str(log_dir))
+    for i in range(count):
+        when = start + timedelta(minutes=i)
+        writer.write({'timestamp': when.isoformat(), 'temperature': 30.0, 'humidity': 70.0,
+                      'ph': 6.0, 'plant_id': 'Plant-1'}, when=when)
+    writer.close()
+
+
+def write_training_csv(path, rows=50):
+    with open(path, 'w', encoding='latin-1', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Plant_ID', 'Date'] + config.FEATURE_COLUMNS)
+        writer.writerows([1, '8/1/2023', 22.0, 60.0, 6.5] for _ in range(rows))
+
+
+def test_retrain_data_mixes_recent_live_and_training_rows(tmp_path):
+    now = datetime.now().replace(microsecond=0)
+    write_log(tmp_path / 'logs', now - timedelta(hours=2), 60)
+    write_training_csv(tmp_path / 'train.csv')
+
+    live = write_retrain_data(str(tmp_path / 'mix.csv'), (now - timedelta(hours=1, minutes=30)).timestamp(),
+                              str(tmp_path / 'train.csv'), log_dir=str(tmp_path / 'logs'))
+    with open(tmp_path / 'mix.csv', encoding='latin-1', newline='') as f:
+        rows = list(csv.reader(f))
+    assert live == 30
+    assert rows[0] == config.FEATURE_COLUMNS and len(rows) == 1 + 30 + 50
+    assert rows[1] == ['30.0', '70.0', '6.0']
+
+
+def monitor(tmp_path, min_count):
+    return DriftMonitor(baseline=DriftBaseline.from_data(TRAINING, MEAN, SCALE), min_count=min_count,
+                        retrain_command=[sys.executable, '-c',
+                                         'import shutil, sys; shutil.copy(sys.argv[1], sys.argv[1] + ".used")'],
+                        retrain_window=24 * 3600, retrain_data=str(tmp_path / 'mix.csv'),
+                        training_csv=str(tmp_path / 'train.csv'), log_dir=str(tmp_path / 'logs'))
+
+
+def test_retrain_runs_on_the_mixed_csv(tmp_path):
+    write_log(tmp_path / 'logs', datetime.now() - timedelta(hours=1), 40)
+    write_training_csv(tmp_path / 'train.csv')
+    retrained = []
+    drift = monitor(tmp_path, min_count=20)
+    drift.on_retrained = lambda: retrained.append(True)
+    assert drift.request_retrain()
+    drift._retraining.join(30)
+    assert retrained and (tmp_path / 'mix.csv.used').exists()
+
+
+def test_retrain_with_too_few_live_readings_only_alerts(tmp_path):
+    write_log(tmp_path / 'logs', datetime.now() - timedelta(hours=1), 5)
+    write_training_csv(tmp_path / 'train.csv')
+    drift = monitor(tmp_path, min_count=20)
+    assert drift.request_retrain()
+    drift._retraining.join(30)
+    assert not (tmp_path / 'mix.csv.used').exists()
+
+
+def test_reload_keeps_drift_state(tmp_path):
+    drift = monitor(tmp_path, min_count=100)
+    histograms = FeatureHistograms()
+    histograms.bind(drift.baseline)
+    histograms.add(live_readings(np.array([6.0, 0.0, 0.0])), ['Plant-1'] * 500, now=time.time())
+    drift.check(histograms.counts())
+    assert drift.drifted == {'Plant-1'}
+    drift.bind(DriftBaseline.from_data(TRAINING, MEAN, SCALE))
+    assert drift.drifted == {'Plant-1'} and drift.fleet['status'] == 'drift'
@@ -0,0 +1,74 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from forest_scorer import ForestScorer, export, load_scorer
+
+RNG = np.random.default_rng(0)
+DATA = RNG.normal([25.0, 65.0, 6.5], [2.0, 8.0, 0.3], (500, 3))
+
+
+def train(tmp_path, seed, name='model'):
+    scaler = StandardScaler().fit(DATA)
+    model = IsolationForest(n_estimators=20, random_state=seed).fit(scaler.transform(DATA))
+    model_path, scaler_path = tmp_path / f'{name}.pkl', tmp_path / f'{name}_scaler.pkl'
+    joblib.dump(model, model_path)
+    joblib.dump(scaler, scaler_path)
+    return model, scaler, str(model_path), str(scaler_path)
+
+
+def test_scores_match_sklearn(tmp_path):
+    model, scaler, model_path, scaler_path = train(tmp_path, 1)
+    scorer = load_scorer(model_path, scaler_path, export_path=None)
+    X = RNG.normal([25.0, 65.0, 6.5], [4.0, 15.0, 0.8], (300, 3))
+    result = scorer.score(X)
+    scaled = scaler.transform(X)
+    np.testing.assert_allclose(result['decision'], model.decision_function(scaled), atol=1e-12)
+    np.testing.assert_array_equal(result['label'], model.predict(scaled))
+    assert scorer.score_one(*X[0])['decision'] == pytest.approx(result['decision'][0])
+
+
+def test_export_is_used_only_for_its_own_pickles(tmp_path):
+    _, _, model_path, scaler_path = train(tmp_path, 1)
+    export_path = str(tmp_path / 'model.npz')
+    export(model_path, scaler_path, export_path)
+    assert load_scorer(model_path, scaler_path, export_path).source_hash
+
+    # Retrain; the old export keeps a newer mtime (e.g. after a checkout or copy)
+    retrained, scaler, _, _ = train(tmp_path, 2)
+    later = os.path.getmtime(model_path) + 100
+    os.utime(export_path, (later, later))
+    scorer = load_scorer(model_path, scaler_path, export_path)
+    assert scorer.source_hash == ''
+    X = DATA[:50]
+    np.testing.assert_allclose(scorer.score(X)['decision'],
+                               retrained.decision_function(scaler.transform(X)), atol=1e-12)
+
+
+def test_export_alone_loads_without_pickles(tmp_path):
+    _, _, model_path, scaler_path = train(tmp_path, 1)
+    export_path = str(tmp_path / 'model.npz')
+    expected = export(model_path, scaler_path, export_path).score(DATA[:20])['decision']
+    os.remove(model_path)
+    np.testing.assert_array_equal(load_scorer(model_path, scaler_path, export_path)
+                                  .score(DATA[:20])['decision'], expected)
+    np.testing.assert_array_equal(load_scorer(None, None, export_path)
+                                  .score(DATA[:20])['decision'], expected)
+
+
+def test_model_without_scaler_is_refused(tmp_path):
+    model, _, model_path, _ = train(tmp_path, 1)
+    with pytest.raises(FileNotFoundError):
+        load_scorer(model_path, str(tmp_path / 'missing.pkl'), export_path=None)
+    bare = str(tmp_path / 'bare.npz')
+    ForestScorer.from_sklearn(model).save(bare)
+    with pytest.raises(ValueError):
+        load_scorer(None, None, bare)
+
+
+def test_shipped_export_matches_shipped_pickles():
+    assert load_scorer().source_hash
@@ -0,0 +1,54 @@
+def post_readings(client, count, start=1_700_000_000):
+    for i in range(count):
+        response = client.post('/api/sensor-data', json={
+            'temperature': 22.0 + i % 5, 'humidity': 60.0, 'ph': 6.5,
+            'plant_id': f'Plant-{i % 3 + 1}', 'timestamp': start + i})
+        assert response.status_code == 200
+
+
+def test_small_pages_skip_no_reading(server):
+    client = server.app.test_client()
+    cursor = client.get('/api/history').get_json()['cursor']
+    post_readings(client, 25)
+
+    seen, pages = [], 0
+    while True:
+        page = client.get(f'/api/history?since={cursor}&limit=7').get_json()
+        seen += [r['seq'] for r in page['readings']]
+        cursor = page['cursor']
+        pages += 1
+        if not page['more']:
+            break
+    assert pages == 4
+    assert seen == list(range(seen[0], seen[0] + 25))
+    assert not page['truncated']
+
+
+def test_page_cursor_is_last_returned_seq(server):
+    client = server.app.test_client()
+    start = client.get('/api/history').get_json()['cursor']
+    post_readings(client, 10)
+
+    page = client.get(f'/api/history?since={start}&limit=3').get_json()
+    assert [r['seq'] for r in page['readings']] == [start + 1, start + 2, start + 3]
+    assert page['cursor'] == start + 3 and page['more']
+
+    last = client.get(f'/api/history?since={start}&limit=10').get_json()
+    assert last['count'] == 10 and not last['more']
+    assert last['cursor'] == start + 10
+
+
+def test_plant_filter_pages(server):
+    client = server.app.test_client()
+    cursor = client.get('/api/history').get_json()['cursor']
+    post_readings(client, 12)
+
+    seen = []
+    while True:
+        page = client.get(f'/api/history?since={cursor}&limit=2&plant_id=Plant-2').get_json()
+        seen += [r['seq'] for r in page['readings']]
+        assert all(r['plant_id'] == 'Plant-2' for r in page['readings'])
+        cursor = page['cursor']
+        if not page['more']:
+            break
+    assert len(seen) == 4 and seen == sorted(seen)
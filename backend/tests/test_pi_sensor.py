@@ -0,0 +1,129 @@
+import threading
+import time
+
+import raspberry_pi_sensor as pi
+
+
+def test_failed_send_is_folded_into_the_suppressed_summary():
+    deadband = pi.DeadbandFilter(deadband={'temperature': 0.3, 'humidity': 1.5, 'ph': 0.05},
+                                 heartbeat=300)
+    assert deadband.check(22.0, 60.0, 6.5, 1000.0)
+    deadband.sent(22.0, 60.0, 6.5, 1000.0)
+    assert not deadband.check(22.1, 60.5, 6.5, 1010.0)  # held back
+
+    # Out of band, but the server is unreachable
+    assert deadband.check(25.0, 60.0, 6.5, 1020.0)
+    deadband.failed(25.0, 60.0, 6.5, 1020.0)
+
+    meta = deadband.metadata()
+    assert meta['count'] == 2
+    assert meta['temperature']['max'] == 25.0 and meta['temperature']['min'] == 22.1
+    assert meta['temperature']['mean'] == round((22.1 + 25.0) / 2, 4)
+    assert meta['start'] == 1010.0 and meta['end'] == 1020.0
+
+    # The next reading that gets through carries both
+    assert deadband.check(25.1, 60.0, 6.5, 1030.0)
+    assert deadband.metadata()['count'] == 2
+    deadband.sent(25.1, 60.0, 6.5, 1030.0)
+    assert deadband.pending.count == 0
+
+
+def test_close_waits_for_the_sample_in_hand():
+    started, finished = threading.Event(), []
+
+    def transmit(*sample):
+        started.set()
+        time.sleep(0.2)
+        finished.append(sample)
+
+    stage = pi.SendStage(transmit, queue_size=10)
+    for i in range(5):
+        stage.put((i,))
+    started.wait(1)
+    stage.close(timeout=0.05)
+
+    assert not stage.thread.is_alive()
+    assert len(finished) == 1 and stage.dropped == 4
+
+
+def test_close_sends_everything_in_time():
+    sent = []
+    stage = pi.SendStage(lambda *sample: sent.append(sample), queue_size=10)
+    for i in range(5):
+        stage.put((i,))
+    stage.close(timeout=5)
+    assert sent == [(i,) for i in range(5)] and stage.dropped == 0
+
+
+class FakeClock:
+    """Stands in for the time module: monotonic() only moves when sleep() or advance() is called"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def test_scheduler_stays_on_its_grid_when_a_sample_overruns(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(pi, 'time', clock)
+    scheduler = pi.SampleScheduler(interval=10, fast_interval=2, hold=60)
+
+    ticks = []
+    for read_time in (3, 3, 25, 3, 9.5, 3):  # the third read stalls past two ticks
+        ticks.append(scheduler.wait())
+        clock.advance(read_time)
+    assert [t - 1000 for t in ticks] == [0, 10, 20, 40, 50, 60]
+    assert scheduler.skipped == 1  # the tick at 30 was skipped, not fired late
+    assert clock.slept == [7, 7, 2, 0.5]
+
+    # An anomaly switches to the fast interval, still counted from the last tick
+    scheduler.report(True)
+    assert scheduler.wait() - 1000 == 62
+    clock.advance(61)
+    assert scheduler.current_interval() == 10
+
+
+def test_slow_send_does_not_delay_sampling(monkeypatch):
+    clock = FakeClock()
+    started, release, sent = threading.Event(), threading.Event(), []
+
+    def transmit(*sample):
+        started.set()
+        release.wait(5)  # the network hangs
+        sent.append(sample)
+
+    stage = pi.SendStage(transmit, queue_size=3)
+    monkeypatch.setattr(pi, 'time', clock)
+    scheduler = pi.SampleScheduler(interval=10)
+    ticks = []
+    for i in range(8):
+        ticks.append(scheduler.wait())
+        stage.put((i,))
+        if i == 0:
+            assert started.wait(5)  # the send thread now holds sample 0
+        clock.advance(1)  # reading the sensors
+    assert [t - 1000 for t in ticks] == [i * 10 for i in range(8)]
+    assert scheduler.skipped == 0
+
+    # The send thread holds sample 0; the queue kept the newest three
+    assert list(stage.queue.queue) == [(5,), (6,), (7,)]
+    assert stage.dropped == 4
+
+    monkeypatch.undo()
+    release.set()
+    stage.close(timeout=5)
+    assert not stage.thread.is_alive()
+    assert sent[0] == (0,) and sent[-2:] == [(6,), (7,)]
@@ -0,0 +1,27 @@
+import numpy as np
+
+from plant_health import PlantHealthClassifier, labelled_images
+
+
+def test_fixtures_are_too_few_to_evaluate():
+    paths, labels = labelled_images('mock_images')
+    classifier = PlantHealthClassifier.from_fixtures('mock_images')
+    try:
+        assert classifier.leave_one_out(classifier.features(paths), labels) is None
+    finally:
+        classifier.close()
+
+
+def test_leave_one_out_holds_each_image_out():
+    rng = np.random.default_rng(0)
+    features = np.concatenate([rng.normal(0, 0.1, (5, 6)), rng.normal(3, 0.1, (5, 6))])
+    labels = ['Healthy'] * 5 + ['Leaf Spot Detected'] * 5
+    classifier = PlantHealthClassifier(workers=1)
+    try:
+        assert classifier.leave_one_out(features, labels) == 1.0
+        # A point sitting on the other cluster is only misclassified when held out
+        features[0] = 3.0
+        assert classifier.leave_one_out(features, labels) == 0.9
+        assert classifier.labels == ['Healthy', 'Leaf Spot Detected']
+    finally:
+        classifier.close()
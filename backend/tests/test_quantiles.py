@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from quantiles import QuantileStore, TDigest
+
+QS = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+def rank_errors(digest, values):
+    """How far each estimated quantile is from its target, in rank (0..1)"""
+    ordered = np.sort(values)
+    estimates = digest.quantiles(QS)
+    return [abs(np.searchsorted(ordered, v) / len(ordered) - q) for q, v in zip(QS, estimates)]
+
+
+@pytest.mark.parametrize('values', [
+    np.random.default_rng(0).normal(22.0, 2.0, 50000),
+    np.random.default_rng(1).lognormal(0.0, 1.0, 50000),
+])
+def test_digest_tracks_numpy_percentiles(values):
+    digest = TDigest()
+    for value in values.tolist():
+        digest.add(value)
+    assert max(rank_errors(digest, values)) < 0.005
+    assert digest.quantiles([0.5])[0] == pytest.approx(np.percentile(values, 50), rel=0.01)
+    assert digest.quantiles([0.0, 1.0]) == [values.min(), values.max()]
+    assert len(digest.means) < digest.compression
+
+
+def test_merged_shard_digests_match_one_digest():
+    values = np.random.default_rng(2).normal(60.0, 5.0, 40000)
+    shards = [TDigest() for _ in range(4)]
+    for i, value in enumerate(values.tolist()):
+        shards[i % 4].add(value)
+    merged = TDigest.merged(shards)
+    assert merged.count == len(values)
+    assert max(rank_errors(merged, values)) < 0.005
+    assert all(shard.count == 10000 for shard in shards)  # inputs untouched
+
+
+def test_merged_stores_cover_every_plant():
+    stores = [QuantileStore(retention={'1m': 20}) for _ in range(2)]
+    for i in range(200):
+        stores[i % 2].add(f'Plant-{i % 2}', 1_000_000 + i, [float(i), 60.0, 6.5])
+    parts = [store.digests(window=600, now=1_000_200) for store in stores]
+    merged = TDigest.merged([p['temperature'] for p in parts])
+    assert merged.count == 200 and (merged.min, merged.max) == (0.0, 199.0)
+
+
+def test_old_buckets_expire():
+    store = QuantileStore(retention={'1m': 3})
+    for minute in range(6):
+        store.add('Plant-1', minute * 60 + 1, [float(minute), 60.0, 6.5])
+    now = 5 * 60 + 30
+    assert store.digests(window=120, now=now)['temperature'].count == 3  # minutes 3, 4, 5
+    # A late reading older than every kept bucket only reaches the all-time sketch
+    store.add('Plant-1', 1, [100.0, 60.0, 6.5])
+    assert store.digests(window=120, now=now)['temperature'].max == 5.0
+    assert store.digests()['temperature'].count == 7
+
+
+def test_window_beyond_retention_is_refused():
+    store = QuantileStore(retention={'1m': 120, '1d': 365})
+    assert store.max_window() == 364 * 86400
+    store.digests(window=364 * 86400)
+    with pytest.raises(ValueError):
+        store.digests(window=400 * 86400)
+
+
+def test_stats_rejects_a_window_beyond_retention(server):
+    client = server.app.test_client()
+    client.post('/api/sensor-data', json={'temperature': 22.0, 'humidity': 60.0, 'ph': 6.5})
+    assert client.get('/api/stats?percentiles=50&window=400d').status_code == 400
+    response = client.get('/api/stats?percentiles=50&window=30d')
+    assert response.status_code == 200 and response.get_json()['window'] == '30d'
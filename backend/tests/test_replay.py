@@ -0,0 +1,23 @@
+from datetime import datetime
+
+import replay
+
+EVENTS = [(1_700_000_000.0 + i * 60, f'Plant-{i % 2 + 1}', 22.0 + i % 3, 60.0, 6.5) for i in range(20)]
+
+
+def test_json_replay_sends_recorded_timestamps(live_server):
+    server, url = live_server
+    stats, _ = replay.run(EVENTS, 'json', server=url, workers=2)
+    assert stats.sent == 20 and stats.errors == 0
+
+    history = server.app.test_client().get('/api/history?limit=100').get_json()['readings']
+    replayed = sorted((datetime.fromisoformat(r['timestamp']).timestamp(), r['plant_id'])
+                      for r in history)
+    assert replayed == sorted((e[0], e[1]) for e in EVENTS)
+
+
+def test_json_replay_twice_is_deduplicated(live_server):
+    server, url = live_server
+    replay.run(EVENTS, 'json', server=url, workers=2)
+    stats, _ = replay.run(EVENTS, 'json', server=url, workers=2)
+    assert stats.verdicts == {'DUPLICATE': 20}
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+
+class FrozenClock(datetime):
+    current = datetime(2026, 3, 1, 12, 0, 0)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+def test_default_rollup_window_moves_without_new_readings(server, monkeypatch):
+    monkeypatch.setattr(server, 'datetime', FrozenClock)
+    client = server.app.test_client()
+
+    first = client.get('/api/rollups?hours=1')
+    hits = server.RESPONSE_CACHE.hits
+    assert client.get('/api/rollups?hours=1').get_json() == first.get_json()
+    assert server.RESPONSE_CACHE.hits == hits + 1
+
+    FrozenClock.current = datetime(2026, 3, 1, 12, 5, 0)
+    moved = client.get('/api/rollups?hours=1').get_json()
+    assert moved['end'] == '2026-03-01T12:05:00'
+    assert moved['start'] == '2026-03-01T11:05:00'
+
+
+def test_explicit_rollup_window_is_cached(server):
+    client = server.app.test_client()
+    url = '/api/rollups?start=2026-03-01T00:00:00&end=2026-03-02T00:00:00'
+    first = client.get(url)
+    again = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_new_readings_invalidate(server):
+    client = server.app.test_client()
+    before = client.get('/api/history').get_json()
+    client.post('/api/sensor-data', json={'temperature': 22.0, 'humidity': 60.0, 'ph': 6.5})
+    after = client.get('/api/history').get_json()
+    assert after['count'] == before['count'] + 1
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from rollups import RESOLUTIONS, RollupStore, merge_buckets
+
+DAY = 1_700_006_400  # a UTC midnight
+BIG = {'1m': 10000, '1h': 1000, '1d': 100}
+
+
+def buckets(store, resolution, start=DAY - 86400, end=DAY + 3 * 86400, plant_id=None):
+    return store.query_buckets(start, end, 100000, plant_id, resolution)[1]
+
+
+def test_bucket_boundaries():
+    store = RollupStore(BIG)
+    store.add('Plant-1', DAY + 59.999, [20.0, 60.0, 6.5], False)
+    store.add('Plant-1', DAY + 60, [24.0, 60.0, 6.5], True)
+    store.add('Plant-1', DAY + 3599.5, [22.0, 60.0, 6.5], False)
+    minutes = buckets(store, '1m')
+    assert [(b[0], b[1], b[2]) for b in minutes] == [(DAY, 1, 0), (DAY + 60, 1, 1), (DAY + 3540, 1, 0)]
+    [hour] = buckets(store, '1h')
+    assert hour[0] == DAY and hour[1] == 3 and hour[2] == 1
+    point = RollupStore.to_points([hour])[0]
+    assert point['temperature'] == {'min': 20.0, 'max': 24.0, 'mean': 22.0}
+
+
+def assert_rolls_up(coarse, fine, width):
+    """Fine buckets re-aggregated to `width` equal the coarse ones (temperature stats)"""
+    expected = {}
+    for b in fine:
+        start = b[0] // width * width
+        count, anomalies, low, high, total = expected.get(start, (0, 0, np.inf, -np.inf, 0.0))
+        expected[start] = (count + b[1], anomalies + b[2], min(low, b[3]), max(high, b[4]), total + b[5])
+    assert sorted(expected) == [b[0] for b in coarse]
+    for b in coarse:
+        count, anomalies, low, high, total = expected[b[0]]
+        assert (b[1], b[2], b[3], b[4]) == (count, anomalies, low, high)
+        assert b[5] == pytest.approx(total)
+
+
+def test_resolutions_agree():
+    rng = np.random.default_rng(0)
+    store = RollupStore(BIG)
+    times = DAY + np.sort(rng.uniform(0, 2 * 86400, 5000))
+    for ts in times.tolist():
+        store.add('Plant-1', ts, [round(rng.normal(22, 2), 2), 60.0, 6.5], rng.random() < 0.1)
+    minutes, hours, days = (buckets(store, r) for r in RESOLUTIONS)
+    assert sum(b[1] for b in minutes) == sum(b[1] for b in hours) == sum(b[1] for b in days) == 5000
+    assert_rolls_up(hours, minutes, 3600)
+    assert_rolls_up(days, hours, 86400)
+    assert len(days) == 2
+
+
+def test_bounded_series_evict_the_oldest_buckets():
+    store = RollupStore({'1m': 3, '1h': 2, '1d': 2})
+    for minute in range(5):
+        store.add('Plant-1', DAY + minute * 60, [20.0 + minute, 60.0, 6.5], False)
+    assert [b[0] for b in buckets(store, '1m')] == [DAY + 120, DAY + 180, DAY + 240]
+    # Too late for the minute series, still counted by the hour
+    store.add('Plant-1', DAY + 5, [30.0, 60.0, 6.5], False)
+    assert [b[1] for b in buckets(store, '1m')] == [1, 1, 1]
+    assert buckets(store, '1h')[0][1] == 6
+    # A late reading inside the kept range lands in its own bucket, in order
+    store.add('Plant-1', DAY + 2 * 3600, [21.0, 60.0, 6.5], False)
+    store.add('Plant-1', DAY + 3 * 3600, [21.0, 60.0, 6.5], False)
+    store.add('Plant-1', DAY + 2 * 3600 + 30, [21.0, 60.0, 6.5], False)
+    assert [(b[0], b[1]) for b in buckets(store, '1h')] == [(DAY + 7200, 2), (DAY + 10800, 1)]
+
+
+def test_plants_merge_bucket_by_bucket():
+    store = RollupStore(BIG)
+    store.add('Plant-1', DAY + 10, [20.0, 60.0, 6.5], False)
+    store.add('Plant-2', DAY + 20, [26.0, 50.0, 6.0], True)
+    store.add('Plant-2', DAY + 70, [26.0, 50.0, 6.0], False)
+    merged = buckets(store, '1m')
+    assert [(b[0], b[1], b[2], b[3], b[4]) for b in merged] == [(DAY, 2, 1, 20.0, 26.0),
+                                                                (DAY + 60, 1, 0, 26.0, 26.0)]
+    assert merge_buckets([buckets(store, '1m', plant_id='Plant-1'),
+                          buckets(store, '1m', plant_id='Plant-2')]) == merged
+
+
+def test_edge_summary_counts_every_reading_it_stands_for():
+    store = RollupStore(BIG)
+    store.add_reading({'timestamp': '2023-11-15T00:30:00', 'plant_id': 'Plant-1', 'is_anomaly': False,
+                       'temperature': 22.0, 'humidity': 60.0, 'ph': 6.5,
+                       'summary': {'start': DAY, 'end': DAY + 300, 'count': 30, 'anomalies': 2,
+                                   'temperature': {'min': 21.0, 'max': 23.0, 'mean': 22.0},
+                                   'humidity': {'min': 59.0, 'max': 61.0, 'mean': 60.0},
+                                   'ph': {'min': 6.4, 'max': 6.6, 'mean': 6.5}}})
+    [hour] = buckets(store, '1h')
+    assert (hour[1], hour[2]) == (30, 2)
+    assert RollupStore.to_points([hour])[0]['temperature'] == {'min': 21.0, 'max': 23.0, 'mean': 22.0}
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from forest_scorer import load_scorer
+from score_cache import ScoreCache
+
+COARSE = {'temperature': 0.1, 'humidity': 0.5, 'ph': 0.02}
+
+
+@pytest.fixture(scope='module')
+def forest():
+    return load_scorer()
+
+
+def uniform_readings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(10, 45, n), rng.uniform(30, 100, n), rng.uniform(4.5, 8.5, n)])
+
+
+def assert_same(cached, exact):
+    np.testing.assert_array_equal(cached['label'], exact['label'])
+    np.testing.assert_array_equal(cached['decision'], exact['decision'])
+    np.testing.assert_array_equal(cached['raw'], exact['raw'])
+    np.testing.assert_array_equal(cached['attribution'], exact['attribution'])
+
+
+def test_on_grid_readings_match_exact_scoring(forest):
+    # What the Pi sends: round(t, 2), round(h, 2), round(ph, 4)
+    X = uniform_readings(5000)
+    X = np.column_stack([np.round(X[:, 0], 2), np.round(X[:, 1], 2), np.round(X[:, 2], 4)])
+    cache = ScoreCache(max_entries=100000)
+    cache.bind(forest)
+    first = cache.score(X)
+    assert_same(first, forest.score(X))
+    assert cache.stats()['bypassed'] == 0
+
+    # Second pass comes from the LRU and is still identical
+    assert_same(cache.score(X), first)
+    assert cache.hits == len(X)
+
+
+def test_off_grid_readings_are_not_snapped(forest):
+    X = uniform_readings(20000, seed=1)
+    cache = ScoreCache(COARSE)
+    cache.bind(forest)
+    assert_same(cache.score(X), forest.score(X))
+    assert cache.stats()['bypassed'] == len(X)
+
+
+def test_coarse_grid_lut_matches_exact_scoring(forest):
+    envelope = {'temperature': (20.0, 22.0), 'humidity': (60.0, 70.0), 'ph': (6.0, 6.5)}
+    cache = ScoreCache(COARSE)
+    cache.bind(forest)
+    assert cache.prewarm(envelope) == 21 * 21 * 26
+
+    grid = np.stack(np.meshgrid(np.arange(200, 221), np.arange(120, 141), np.arange(300, 326)),
+                    axis=-1).reshape(-1, 3)
+    X = cache.values(grid)
+    cached, exact = cache.score(X), forest.score(X)
+    assert cache.lut_hits == len(X)
+    np.testing.assert_array_equal(cached['label'], exact['label'])
+    np.testing.assert_allclose(cached['decision'], exact['decision'], atol=1e-6)
+    np.testing.assert_allclose(cached['attribution'], exact['attribution'], atol=1 / 255)
+
+
+def test_rebinding_discards_entries(forest):
+    cache = ScoreCache()
+    cache.bind(forest)
+    cache.score([[22.5, 65.0, 6.5]])
+    cache.bind(load_scorer())
+    assert cache.stats()['entries'] == 0
+
+
+def test_resolution_must_be_decimal():
+    with pytest.raises(ValueError):
+        ScoreCache({'temperature': 0.3, 'humidity': 0.01, 'ph': 0.0001})
@@ -0,0 +1,37 @@
+import pytest
+
+import sensor_protocol
+from sensor_protocol import BinaryFrameSender, ProtocolError, decode_frame, encode_frame
+
+
+def test_frame_round_trip_keeps_ids_intact():
+    ids = ['Plant-1', 'Plant-Greenhouse', 'Salat-Größe-1', 'Ж' * 8]  # 16, 15 and 16 bytes
+    frame = encode_frame((i, 1_700_000_000.5 + i, 22.5, 60.25, 6.5, plant_id)
+                         for i, plant_id in enumerate(ids))
+    records = decode_frame(frame)
+    assert [p.decode('utf-8') for p in records['plant_id'].tolist()] == ids
+    assert records['seq'].tolist() == [0, 1, 2, 3]
+    assert records['timestamp'][1] == 1_700_000_001.5
+
+
+@pytest.mark.parametrize('plant_id', ['Plant-Greenhouse-A-01', 'Ж' * 8 + 'x'])
+def test_ids_over_16_bytes_are_refused_not_truncated(plant_id):
+    with pytest.raises(ProtocolError):
+        encode_frame([(1, 1_700_000_000.0, 22.0, 60.0, 6.5, plant_id)])
+
+    sender = BinaryFrameSender('127.0.0.1', 9)
+    with pytest.raises(ProtocolError):
+        sender.add(22.0, 60.0, 6.5, plant_id)
+    assert sender.pending == [] and sender.next_seq == 1
+
+
+def test_pi_falls_back_to_json_for_a_long_id(monkeypatch):
+    import raspberry_pi_sensor as pi
+    monkeypatch.setattr(pi, 'PLANT_ID', 'Plant-Greenhouse-A-01')
+    assert pi.create_binary_sender() is None
+    monkeypatch.setattr(pi, 'PLANT_ID', 'Plant-1')
+    assert isinstance(pi.create_binary_sender(), BinaryFrameSender)
+
+
+def test_record_dtype_matches_the_packed_record():
+    assert sensor_protocol.record_dtype().itemsize == sensor_protocol.RECORD_SIZE
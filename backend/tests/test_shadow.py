@@ -0,0 +1,84 @@
+import os
+import signal
+import time
+
+import numpy as np
+
+from forest_scorer import load_scorer
+from shadow import ShadowScorer, load_candidate
+
+CANDIDATE = 'anomaly_model.npz'
+
+
+def batch(rows=50, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal([22.0, 60.0, 6.5], [4.0, 10.0, 0.6], (rows, 3))
+
+
+def wait_for(shadow, scored, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = shadow.stats()
+        if stats['candidates']['new']['scored'] >= scored:
+            return stats
+        time.sleep(0.02)
+    raise AssertionError(f"shadow scored {shadow.stats()['candidates']['new']['scored']} of {scored}")
+
+
+def test_full_queue_drops_and_counts_batches():
+    shadow = ShadowScorer({'new': CANDIDATE}, workers=1, queue_size=2, start_method='fork')
+    [worker] = shadow._workers
+    os.kill(worker.pid, signal.SIGSTOP)
+    try:
+        results = [shadow.submit(batch(10, i), np.zeros(10, bool), np.zeros(10)) for i in range(5)]
+        assert results == [True, True, False, False, False]
+        assert (shadow.counts['submitted'], shadow.counts['dropped']) == (20, 30)
+    finally:
+        os.kill(worker.pid, signal.SIGCONT)
+    assert wait_for(shadow, 20)['candidates']['new']['scored'] == 20
+    shadow.close()
+
+
+def test_agreement_and_deltas_against_a_known_candidate():
+    features = batch(400)
+    expected = load_candidate(CANDIDATE).score(features, explain=False)
+    candidate_anomaly = expected['label'] == -1
+    # A "serving model" that flags the first 100 rows and scores 0.1 higher than the candidate
+    serving_anomaly = np.arange(400) < 100
+    serving_decision = expected['decision'] + 0.1
+
+    shadow = ShadowScorer({'new': CANDIDATE}, workers=1, start_method='fork')
+    shadow.submit(features[:200], serving_anomaly[:200], serving_decision[:200])
+    shadow.submit(features[200:], serving_anomaly[200:], serving_decision[200:])
+    stats = wait_for(shadow, 400)['candidates']['new']
+    shadow.close()
+
+    assert stats['status'] == 'scoring'
+    assert stats['candidate_only'] == int((candidate_anomaly & ~serving_anomaly).sum())
+    assert stats['serving_only'] == int((~candidate_anomaly & serving_anomaly).sum())
+    assert stats['agree_anomaly'] == int((candidate_anomaly & serving_anomaly).sum())
+    assert stats['agreement'] == round(float((candidate_anomaly == serving_anomaly).mean()), 4)
+    assert stats['score_delta']['mean'] == -0.1 and stats['score_delta']['mean_abs'] == 0.1
+    assert stats['score_delta']['p50'] == -0.1
+
+
+def test_rule_based_serving_verdicts_are_not_shadowed(server, monkeypatch):
+    class Recorder:
+        def __init__(self):
+            self.submitted, self.skipped = 0, 0
+
+        def submit(self, features, serving_anomaly, serving_decision):
+            self.submitted += len(features)
+
+        def skip(self, count):
+            self.skipped += count
+
+    shadow = Recorder()
+    monkeypatch.setattr(server, 'SHADOW', shadow)
+    client = server.app.test_client()
+    reading = {'temperature': 22.0, 'humidity': 60.0, 'ph': 6.5}
+    monkeypatch.setattr(server, 'forest', load_scorer(server.MODEL_PATH, server.SCALER_PATH))
+    client.post('/api/sensor-data', json=dict(reading, timestamp=1_700_000_000))
+    monkeypatch.setattr(server, 'forest', None)
+    client.post('/api/sensor-data', json=dict(reading, timestamp=1_700_000_001))
+    assert (shadow.submitted, shadow.skipped) == (1, 1)
@@ -0,0 +1,94 @@
+import threading
+
+import numpy as np
+import pytest
+
+import sensor_protocol
+from shards import HashRing, ShardError, ShardPool
+
+PLANTS = [f'Plant-{i}' for i in range(10000)]
+
+
+def test_ring_is_stable_and_adding_a_shard_moves_about_one_in_n():
+    ring = HashRing(4)
+    four = [ring.shard_for(p) for p in PLANTS]
+    again = HashRing(4)  # a fresh ring (e.g. in another process) agrees
+    assert four == [again.shard_for(p) for p in PLANTS]
+    assert min(np.bincount(four)) > 0.15 * len(PLANTS)
+
+    ring = HashRing(5)
+    five = [ring.shard_for(p) for p in PLANTS]
+    moved = [(a, b) for a, b in zip(four, five) if a != b]
+    assert 0.12 < len(moved) / len(PLANTS) < 0.28
+    assert all(b == 4 for _, b in moved)  # only onto the new shard
+
+
+def test_single_shard_runs_in_process():
+    pool = ShardPool(1, None, {'echo': lambda x: x, 'fail': lambda: 1 / 0})
+    assert pool.in_process and pool.call(0, 'echo', 5) == 5
+    assert pool.broadcast('echo', 'x') == ['x']
+    with pytest.raises(ShardError):
+        pool.call(0, 'fail')
+
+
+@pytest.fixture
+def sharded(server, monkeypatch):
+    """The app with two forked shard processes"""
+    pool = ShardPool(2, server.run_shard, server.SHARD_OPS, start_method='fork')
+    monkeypatch.setattr(server, 'SHARDS', pool)
+    yield server, pool
+    pool.close()
+
+
+def test_ingest_history_and_stats_across_process_shards(sharded):
+    server, pool = sharded
+    client = server.app.test_client()
+    plants = [f'Plant-{i}' for i in range(8)]
+    assert len({pool.shard_for(p) for p in plants}) == 2
+
+    def post(plant, offset):
+        for i in range(10):
+            response = client.post('/api/sensor-data', json={
+                'temperature': 20.0 + offset + i * 0.1, 'humidity': 60.0 + i, 'ph': 6.5,
+                'plant_id': plant, 'timestamp': 1_700_000_000 + i})
+            assert response.status_code == 200
+
+    threads = [threading.Thread(target=post, args=(p, n)) for n, p in enumerate(plants)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # One frame whose readings land on both shards
+    frame = sensor_protocol.encode_frame((i, 1_700_000_100 + i, 25.0, 70.0, 6.0, plants[i % 8])
+                                         for i in range(16))
+    assert client.post('/api/sensor-data/binary', data=frame).get_json()['stored'] == 16
+
+    history = client.get('/api/history?limit=1000').get_json()['readings']
+    seqs = [r['seq'] for r in history]
+    assert seqs == list(range(seqs[0], seqs[0] + 96))
+    for plant in plants:
+        own = [r for r in history if r['plant_id'] == plant]
+        assert [r['temperature'] for r in own[:10]] == sorted(r['temperature'] for r in own[:10])
+
+    metrics = client.get('/api/metrics').get_json()
+    assert len({s['pid'] for s in metrics['shards']}) == 2
+    assert [s['buffered'] for s in metrics['shards']] == [
+        sum(pool.shard_for(r['plant_id']) == i for r in history) for i in range(2)]
+
+    stats = client.get('/api/stats').get_json()
+    temperatures = np.array([r['temperature'] for r in history])
+    assert stats['total_readings'] == 96
+    assert stats['temperature']['avg'] == round(temperatures.mean(), 2)
+    assert stats['temperature']['min'] == round(temperatures.min(), 2)
+    assert stats['temperature']['max'] == round(temperatures.max(), 2)
+    assert stats['last_reading_time'] == history[-1]['timestamp']
+
+
+def test_dead_worker_surfaces_as_shard_error(sharded):
+    server, pool = sharded
+    victim = pool._shards[1].process
+    victim.kill()
+    victim.join(5)
+    with pytest.raises(ShardError, match='shard-1'):
+        pool.broadcast('metrics')
+    assert pool.call(0, 'metrics')['pid'] != victim.pid  # the other shard still answers
@@ -0,0 +1,44 @@
+from sheet_mirror import FakeWorksheet, SheetMirror
+
+HEADER = ['Plant_ID', 'Date', 'Temperature (°C)', 'Humidity (%)', 'pH Level', 'Growth Days']
+
+
+def sheet(rows=30):
+    return FakeWorksheet([HEADER] + [[70 + i % 3, f'8/{i % 28 + 1}/2023', f'{22 + i * 0.1:.1f}',
+                                      f'{60 + i % 7}', f'{6.5 + i % 4 * 0.1:.2f}', i // 3 + 1]
+                                     for i in range(rows)])
+
+
+def test_incremental_sync_fetches_only_new_rows(tmp_path):
+    worksheet = sheet()
+    mirror = SheetMirror(worksheet, path=str(tmp_path / 'mirror.npz'), overlap=5)
+    assert mirror.sync() == 30
+    full_cost = worksheet.cells_read
+
+    worksheet.append_row([71, '9/1/2023', '30.0', '65', '6.40', 11])
+    worksheet.cells_read = 0
+    assert mirror.sync() == 1
+    assert worksheet.cells_read < full_cost / 4
+    assert mirror.row_count == 31
+
+    # A reopened mirror picks up from the cache file
+    assert SheetMirror(path=str(tmp_path / 'mirror.npz')).row_count == 31
+
+
+def test_edit_in_overlap_triggers_full_resync(tmp_path):
+    worksheet = sheet()
+    mirror = SheetMirror(worksheet, path=str(tmp_path / 'mirror.npz'), overlap=5)
+    mirror.sync()
+    worksheet.update_cell(29, 3, '99.9')
+    assert mirror.sync() == 30
+    assert mirror.array(['Temperature (°C)'])[27, 0] == 99.9
+
+
+def test_dataframe_keeps_whole_number_columns_integral(tmp_path):
+    mirror = SheetMirror(sheet(), path=str(tmp_path / 'mirror.npz'))
+    mirror.sync()
+    df = mirror.dataframe()
+    assert df['Plant_ID'].dtype.kind == 'i' and df['Growth Days'].dtype.kind == 'i'
+    assert str(df['Plant_ID'].iloc[0]) == '70'
+    assert df['Temperature (°C)'].dtype.kind == 'f'
+    assert df['Date'].iloc[0] == '8/1/2023'
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+import config
+import sensor_protocol
+from synthetic import DRIFT, NORMAL, SPIKE, STUCK, PlantProfiles, SyntheticGenerator, load_chunks
+
+PROFILES = PlantProfiles.fit()
+QUIET = {'spike': 0.0, 'drift': 0.0, 'stuck': 0.0}
+
+
+def generator(**kwargs):
+    settings = dict(plants=3, seed=7, profiles=PROFILES, anomalies=QUIET)
+    settings.update(kwargs)
+    return SyntheticGenerator(**settings)
+
+
+def concat(chunks):
+    chunks = list(chunks)
+    return {key: np.concatenate([c[key] for c in chunks]) for key in chunks[0]}
+
+
+def test_fixed_seed_reproduces_the_output():
+    busy = {'spike': 1e-3, 'drift': 1e-4, 'stuck': 1e-4}
+    first = concat(generator(anomalies=busy).chunks(days=2))
+    again = concat(generator(anomalies=busy).chunks(days=2))
+    for key in first:
+        assert np.array_equal(first[key], again[key])
+    other = concat(generator(anomalies=busy, seed=8).chunks(days=2))
+    assert not np.array_equal(first['values'], other['values'])
+
+
+def test_spike_labels_match_the_injected_values():
+    # Same seed: the first window is identical up to the spikes
+    plain = next(generator().chunks())
+    spiked = next(generator(anomalies={'spike': 0.01, 'drift': 0.0, 'stuck': 0.0}).chunks())
+    changed = plain['values'] != spiked['values']
+    rows = np.flatnonzero(changed.any(axis=1))
+    assert len(rows) > 10
+    assert (spiked['label'][rows] == SPIKE).all()
+    assert np.array_equal(np.flatnonzero(spiked['label'] == SPIKE), rows)
+    assert changed[rows, spiked['anomaly_feature'][rows]].all()
+    assert (plain['label'] == NORMAL).all() and (plain['anomaly_feature'] == -1).all()
+
+    which = spiked['anomaly_feature'][rows]
+    delta = np.abs(spiked['values'][rows, which] - plain['values'][rows, which])
+    expected = config.SYNTH_SPIKE_SIGMA * PROFILES.scale[which]
+    unclipped = (spiked['values'][rows, which] > 0) & (spiked['values'][rows, which] < 100)
+    assert np.allclose(delta[unclipped], expected[unclipped], rtol=1e-3)
+
+
+def test_episodes_carry_across_chunk_boundaries():
+    # 2 plants, 10 steps per chunk; episodes from step 5 for 30 steps span four chunks
+    plain = generator(plants=2, chunk_rows=20)
+    drifting = generator(plants=2, chunk_rows=20)
+    drifting._episodes = [[DRIFT, 1, 2, 5, 30, 0.5, None], [STUCK, 0, 0, 8, 15, 0.0, None]]
+    base = concat(plain.chunks(rows=100))
+    out = concat(drifting.chunks(rows=100))
+    assert len(base['label']) == 100
+
+    steps, plant = out['step'], out['plant']
+    drift_rows = (plant == 1) & (steps >= 5) & (steps < 35)
+    assert (out['label'][drift_rows] == DRIFT).all() and (out['anomaly_feature'][drift_rows] == 2).all()
+    ramp = (steps[drift_rows] - 5 + 1) / 30 * 0.5
+    assert np.allclose(out['values'][drift_rows, 2] - base['values'][drift_rows, 2], ramp, atol=1e-5)
+
+    stuck_rows = (plant == 0) & (steps >= 8) & (steps < 23)
+    assert (out['label'][stuck_rows] == STUCK).all()
+    assert len(set(out['values'][stuck_rows, 0].tolist())) == 1
+    assert (out['label'][~(drift_rows | stuck_rows)] == NORMAL).all()
+
+
+def test_npz_records_decode_with_the_protocol_dtype(tmp_path):
+    gen = generator(plants=2, chunk_rows=50)
+    files, total = gen.write(str(tmp_path), rows=120)
+    assert total == 120 and len(files) == 3
+    expected = concat(generator(plants=2, chunk_rows=50).chunks(rows=120))
+
+    records = np.concatenate([r for r, _, _ in load_chunks(str(tmp_path))])
+    assert records.dtype == sensor_protocol.record_dtype()
+    frame = sensor_protocol.HEADER.pack(sensor_protocol.MAGIC, sensor_protocol.VERSION, 0,
+                                        len(records)) + records.tobytes()
+    decoded = sensor_protocol.decode_frame(frame)
+    assert np.array_equal(decoded, records)
+    assert decoded['plant_id'][:2].tolist() == [b'Plant-1', b'Plant-2']
+    assert np.array_equal(decoded['seq'], expected['step'] + 1)
+    assert np.array_equal(decoded['temperature'], expected['values'][:, 0])
+    assert np.allclose(decoded['timestamp'], expected['timestamp'])
+
+
+def test_pi_mock_walks_a_synthetic_plant():
+    import raspberry_pi_sensor as pi
+    readings = [pi.read_mock_sensors() for _ in range(50)]
+    temperatures = np.array([r[0] for r in readings])
+    # Consecutive readings follow each other (unlike independent uniform draws,
+    # ~2.3 apart in the median); the median ignores an injected spike
+    assert np.median(np.abs(np.diff(temperatures))) < 0.5
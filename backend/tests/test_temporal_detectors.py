@@ -0,0 +1,72 @@
+import numpy as np
+
+from temporal_detectors import TemporalDetector
+
+NORMAL = (22.0, 60.0, 6.5)
+
+
+def feed(detector, values, start=1_700_000_000, step=10, plant='Plant-1'):
+    """Update with each (temperature, humidity, ph); returns every reading's reasons"""
+    return [detector.update(plant, start + i * step, v)[1] for i, v in enumerate(values)]
+
+
+def steady(count, seed=0):
+    noise = np.random.default_rng(seed).normal(0, 1, (count, 3)) * [0.05, 0.2, 0.005]
+    return [tuple(v) for v in np.array(NORMAL) + noise]
+
+
+def test_no_alerts_during_warmup():
+    detector = TemporalDetector(warmup=10)
+    wild = [(10.0 if i % 2 else 40.0, 60.0, 6.5) for i in range(10)]
+    assert feed(detector, wild) == [[]] * 10
+    assert feed(detector, [(10.0, 60.0, 6.5)], start=1_700_000_100)[0]  # the 11th is checked
+
+
+def test_steady_readings_raise_nothing():
+    assert not any(feed(TemporalDetector(), steady(500)))
+
+
+def test_step_change_is_a_z_score_outlier():
+    detector = TemporalDetector()
+    assert not any(feed(detector, steady(50)))
+    reasons = feed(detector, [(30.0, 60.0, 6.5)], start=1_700_000_500)[0]
+    assert any(r.startswith('temperature z-score +') for r in reasons)
+    assert not any(r.startswith(('humidity', 'ph')) for r in reasons)
+
+
+def test_ramp_faster_than_the_rate_limit():
+    detector = TemporalDetector(max_rate={'temperature': 5.0, 'humidity': 15.0, 'ph': 0.5})
+    feed(detector, steady(20), step=60)
+    # +6 degrees per minute at one reading a minute
+    ramp = [(22.0 + 6.0 * (i + 1), 60.0, 6.5) for i in range(5)]
+    reasons = feed(detector, ramp, start=1_700_000_000 + 20 * 60, step=60)
+    assert all(any(r.startswith('temperature changing +') for r in rs) for rs in reasons)
+
+    # The same rise spread over two minutes per step stays under the limit
+    slower = TemporalDetector(z_threshold=1e9)
+    feed(slower, steady(20), step=60)
+    reasons = feed(slower, [(22.0 + 6.0 * (i + 1), 60.0, 6.5) for i in range(5)],
+                   start=1_700_000_000 + 21 * 60, step=120)
+    assert not any('changing' in r for rs in reasons for r in rs)
+
+
+def test_slow_drift_is_caught_without_outliers():
+    detector = TemporalDetector()
+    feed(detector, steady(50))
+    # pH creeping down 0.001 per reading: never a jump, never an outlier
+    creep = [(22.0, 60.0, 6.5 - 0.001 * (i + 1)) for i in range(1500)]
+    reasons = feed(detector, creep, start=1_700_000_500)
+    flat = [r for rs in reasons for r in rs]
+    assert any(r.startswith('ph drifting -') for r in flat)
+    assert not any('z-score' in r or 'changing' in r for r in flat)
+    first = next(i for i, rs in enumerate(reasons) if rs)
+    assert first > 100  # needs a sustained trend, not a few readings
+    assert detector.snapshot('Plant-1')['ph']['baseline'] > detector.snapshot('Plant-1')['ph']['mean']
+
+
+def test_plants_are_independent():
+    detector = TemporalDetector()
+    feed(detector, steady(50), plant='Plant-1')
+    feed(detector, [(35.0, 60.0, 6.5)] * 50, plant='Plant-2')
+    assert feed(detector, [NORMAL], start=1_700_001_000, plant='Plant-1') == [[]]
+    assert detector.plant_count() == 2